@@ -0,0 +1,216 @@
+"""
+이벤트 루프 지연 감시 모듈 (에이전트용)
+
+루프 안의 하트비트 태스크가 주기적으로 깨어나며 지연(lag)을 측정하고,
+별도 감시 스레드가 하트비트가 임계값 이상 멈춘 것을 발견하면
+그 순간 루프 스레드의 스택을 캡처하여 막고 있는 라우트와 호출 위치를 기록합니다.
+차단 횟수와 시간은 라우트/호출 위치별로 /metrics에 노출합니다.
+
+backend/app/loop_monitor.py의 사본입니다. 서비스마다 빌드 컨텍스트가 달라 모듈을 공유할 수 없고,
+에이전트에는 지표 레지스트리가 없으므로 두 지표를 직접 Prometheus 텍스트 형식으로 출력합니다.
+
+표준 라이브러리만 사용하며, LOOP_MONITOR_ENABLED=true 일 때만 동작합니다.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import sysconfig
+import threading
+import traceback
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 감시 설정
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "false").lower() == "true"
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+LOOP_MONITOR_THRESHOLD_MS = float(os.getenv("LOOP_MONITOR_THRESHOLD_MS", "200"))
+
+
+# 호출 위치를 찾을 때 건너뛸 경로 (표준 라이브러리, 설치된 패키지)
+_LIBRARY_PATHS = tuple(
+    {path for key in ("stdlib", "platstdlib", "purelib", "platlib") if (path := sysconfig.get_paths().get(key))}
+)
+
+
+def _format_labels(key: Tuple[str, str]) -> str:
+    parts = []
+    for name, value in zip(("route", "call_site"), key):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _call_site(frames: List[traceback.FrameSummary]) -> Optional[str]:
+    """스택에서 애플리케이션 코드의 가장 안쪽 프레임"""
+    for frame in reversed(frames):
+        if not frame.filename.startswith(_LIBRARY_PATHS) and not frame.filename.startswith("<"):
+            return f"{frame.filename}:{frame.lineno} ({frame.name})"
+    return f"{frames[-1].filename}:{frames[-1].lineno} ({frames[-1].name})" if frames else None
+
+
+class LoopLagMonitor:
+    """이벤트 루프 응답성 측정 및 블로킹 호출 스택 캡처"""
+
+    def __init__(
+        self,
+        interval_ms: float = LOOP_MONITOR_INTERVAL_MS,
+        threshold_ms: float = LOOP_MONITOR_THRESHOLD_MS,
+        enabled: bool = LOOP_MONITOR_ENABLED,
+    ):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.enabled = enabled
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_beat = time.monotonic()
+        self._reported = False
+        # 태스크 -> 요청 scope (라우팅 후 scope["route"]로 라우트 템플릿을 알 수 있음)
+        self._labels: "weakref.WeakKeyDictionary[asyncio.Task, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked_events = 0
+        self.last_blocked_route: Optional[str] = None
+        self.last_blocked_call_site: Optional[str] = None
+        # (라우트, 호출 위치) -> 차단 횟수 / 가장 최근 차단 시간
+        # (라벨은 "메서드 라우트 템플릿"과 코드 위치라 종류가 제한적)
+        self._blocked_counts: Dict[Tuple[str, str], int] = {}
+        self._blocked_seconds: Dict[Tuple[str, str], float] = {}
+
+    def label_current_task(self, scope: Dict[str, Any]) -> None:
+        """현재 태스크를 처리 중인 요청 scope 기록 (블로킹 보고 시 라우트로 표시)"""
+        if not self.enabled:
+            return
+        task = asyncio.current_task()
+        if task is not None:
+            self._labels[task] = scope
+
+    def start(self) -> None:
+        """하트비트 태스크와 감시 스레드 시작 (실행 중인 루프에서 호출)"""
+        if not self.enabled or self._heartbeat is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"이벤트 루프 지연 감시 시작 (간격 {self.interval * 1000:.0f}ms, 임계값 {self.threshold * 1000:.0f}ms)"
+        )
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    async def _beat(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._last_beat = now
+            self._reported = False
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._last_beat - self.interval
+            if blocked > self.threshold and not self._reported:
+                self._reported = True
+                self._report(blocked)
+
+    def _report(self, blocked: float) -> None:
+        """루프 스레드의 현재 스택을 캡처하여 기록"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        frames = traceback.extract_stack(frame) if frame is not None else []
+
+        task = None
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            pass
+        scope = self._labels.get(task) if task is not None else None
+        if task is None:
+            route, path = "<callback>", None
+        elif scope is None:
+            route, path = "<background>", task.get_name()
+        else:
+            # 지표 라벨은 라우트 템플릿 (경로 매개변수마다 라벨이 늘지 않도록)
+            template = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            route = f"{scope.get('method', 'WS')} {template}"
+            path = scope.get("path")
+
+        call_site = _call_site(frames) or "<unknown>"
+        self.blocked_events += 1
+        self.last_blocked_route = route
+        self.last_blocked_call_site = call_site
+        key = (route, call_site)
+        self._blocked_counts[key] = self._blocked_counts.get(key, 0) + 1
+        self._blocked_seconds[key] = round(blocked, 6)
+        logger.warning(
+            f"이벤트 루프가 {blocked * 1000:.0f}ms 이상 차단됨 - 라우트: {route} ({path}), 호출 위치: {call_site}\n"
+            + "".join(traceback.format_list(frames))
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "lag_seconds": round(self.last_lag, 6),
+            "max_lag_seconds": round(self.max_lag, 6),
+            "blocked_events": self.blocked_events,
+            "last_blocked_route": self.last_blocked_route,
+            "last_blocked_call_site": self.last_blocked_call_site,
+        }
+
+    def render_metrics(self) -> str:
+        """차단 지표를 Prometheus 텍스트 형식으로 출력"""
+        lines = [
+            "# HELP event_loop_blocked_total 이벤트 루프가 임계값 이상 차단된 횟수",
+            "# TYPE event_loop_blocked_total counter",
+        ]
+        for key, count in list(self._blocked_counts.items()):
+            lines.append(f"event_loop_blocked_total{_format_labels(key)} {float(count)!r}")
+        lines += [
+            "# HELP event_loop_last_blocked_seconds 라우트/호출 위치별 가장 최근 차단이 감지된 시점까지의 차단 시간",
+            "# TYPE event_loop_last_blocked_seconds gauge",
+        ]
+        for key, seconds in list(self._blocked_seconds.items()):
+            lines.append(f"event_loop_last_blocked_seconds{_format_labels(key)} {float(seconds)!r}")
+        return "\n".join(lines) + "\n"
+
+
+class LoopMonitorMiddleware:
+    """요청을 처리하는 태스크에 요청 scope를 연결하는 ASGI 미들웨어"""
+
+    def __init__(self, app, monitor: "LoopLagMonitor"):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            self.monitor.label_current_task(scope)
+        await self.app(scope, receive, send)
+
+
+# 글로벌 감시기
+loop_monitor = LoopLagMonitor()
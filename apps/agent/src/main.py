@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Header
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import firebase_admin
@@ -12,6 +13,9 @@ import aiohttp
 import asyncio
 import uvicorn
 from typing import Dict, Any, List, Optional
+# uvicorn.run("main:app")처럼 src 디렉토리에서 최상위 모듈로 실행되므로 절대 import
+from loop_monitor import LoopMonitorMiddleware, loop_monitor
+from profiler import ProfilerMiddleware, is_authorized, profile_store, profiling_enabled
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -46,6 +50,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 이벤트 루프 차단 시 막고 있는 라우트를 알 수 있도록 요청 태스크에 scope 연결
+app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+
+# 요청 프로파일링 (PROFILER_TOKEN 또는 PROFILER_SAMPLE_RATE 설정 시)
+if profiling_enabled():
+    app.add_middleware(ProfilerMiddleware)
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    loop_monitor.start()
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await loop_monitor.stop()
+
 # 모델 정의
 class AiQuery(BaseModel):
     query: str
@@ -319,9 +338,27 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "firebase": "connected" if db is not None else "disconnected"
+        "firebase": "connected" if db is not None else "disconnected",
+        "event_loop": loop_monitor.get_stats()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 텍스트 형식 지표 (이벤트 루프 차단)"""
+    return PlainTextResponse(loop_monitor.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/profiles/{profile_id}", include_in_schema=False)
+async def get_request_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+    """
+    응답의 X-Profile-Id로 저장된 프로파일 (folded stack 형식, X-Profile 관리자 토큰 필요)
+    """
+    if not is_authorized(x_profile):
+        raise HTTPException(status_code=403, detail="프로파일 조회 권한이 없습니다")
+    folded = await asyncio.to_thread(profile_store.load, profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="해당 요청의 프로파일을 찾을 수 없습니다")
+    return PlainTextResponse(folded)
+
 # 서버 실행 코드 (직접 실행 시)
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
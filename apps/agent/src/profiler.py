@@ -0,0 +1,234 @@
+"""
+요청 단위 샘플링 프로파일러 (에이전트용)
+
+관리자 헤더(X-Profile: <PROFILER_TOKEN>)가 있거나 PROFILER_SAMPLE_RATE 비율로 선택된 요청을
+처리하는 동안 별도 스레드가 이벤트 루프 스레드의 스택을 주기적으로 샘플링하고,
+스택에 이 요청의 ProfilerMiddleware 프레임이 있는 샘플만 모읍니다.
+(같은 루프에서 동시에 실행된 다른 요청, 유휴 상태의 selector 대기는 포함되지 않음)
+
+결과는 flamegraph.pl / speedscope에서 바로 열 수 있는 folded stack 형식으로
+서버가 만든 프로파일 ID별 파일(<PROFILE_DIR>/<profile_id>.folded)에 저장되며,
+ID는 응답의 X-Profile-Id 헤더로 전달됩니다.
+
+backend/app/profiler.py의 루프 스레드 샘플링과 같은 방식이며, 서비스마다 빌드 컨텍스트가 달라
+사본으로 둡니다. 에이전트는 스레드 풀에서 요청을 처리하지 않으므로 스레드 풀 샘플링은 없습니다.
+
+표준 라이브러리만 사용합니다.
+"""
+
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 프로파일러 설정
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")  # 비어 있으면 헤더로 요청하는 프로파일링 비활성화
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))  # 0.0 ~ 1.0
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_CONCURRENT = int(os.getenv("PROFILER_MAX_CONCURRENT", "2"))
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_SUFFIX = ".folded"
+
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def profile_path(profile_id: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    """프로파일 ID에 해당하는 파일 경로 (형식이 잘못된 ID는 None)"""
+    if not _PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    return os.path.join(directory, profile_id + PROFILE_SUFFIX)
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """관리자 프로파일 토큰 확인"""
+    return bool(PROFILER_TOKEN) and bool(token) and hmac.compare_digest(token, PROFILER_TOKEN)
+
+
+def profiling_enabled() -> bool:
+    """헤더 토큰 또는 샘플링 비율 중 하나라도 설정되어 있는지"""
+    return bool(PROFILER_TOKEN) or PROFILER_SAMPLE_RATE > 0
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """이벤트 루프 스레드를 주기적으로 샘플링하여 한 요청의 작업만 folded stack으로 집계"""
+
+    def __init__(self, profile_id: str, loop_thread_id: int, interval_ms: float = PROFILER_INTERVAL_MS):
+        self.profile_id = profile_id
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval_ms / 1000
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        """샘플링 중지 (스레드 종료 대기는 join()에서)"""
+        self._stop.set()
+        self.duration = time.perf_counter() - self.started
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.loop_thread_id)
+            try:
+                self._sample(frame)
+            except Exception:
+                # 샘플링 중 스택이 바뀌는 경우 등은 해당 샘플만 건너뜀
+                continue
+
+    def _sample(self, frame) -> None:
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()  # 바깥쪽 → 안쪽
+        if self._owns_loop_stack(frames):
+            self.samples[";".join(_frame_name(f.f_code) for f in frames)] += 1
+
+    def _owns_loop_stack(self, frames) -> bool:
+        """루프 스레드가 지금 이 요청의 코루틴을 실행 중인지 (요청의 미들웨어 프레임이 스택에 있음)"""
+        for frame in frames:
+            if frame.f_code is ProfilerMiddleware.__call__.__code__:
+                return frame.f_locals.get("profile_id") == self.profile_id
+        return False
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """프로파일 ID별 파일 저장소 (오래된 파일부터 정리)"""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILER_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(self, profile_id: str, folded: str) -> Optional[str]:
+        path = profile_path(profile_id, self.directory)
+        if path is None:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(folded)
+        self._prune()
+        return path
+
+    def load(self, profile_id: str) -> Optional[str]:
+        path = profile_path(profile_id, self.directory)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def _prune(self) -> None:
+        entries = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(PROFILE_SUFFIX)
+        ]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[: len(entries) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ProfilerMiddleware:
+    """
+    선택된 요청을 샘플링 프로파일링하는 ASGI 미들웨어
+
+    요청마다 샘플링 스레드를 하나씩 쓰므로 동시에 프로파일링하는 요청 수를
+    PROFILER_MAX_CONCURRENT로 제한합니다.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: Optional[ProfileStore] = None,
+        sample_rate: float = PROFILER_SAMPLE_RATE,
+        max_concurrent: int = PROFILER_MAX_CONCURRENT,
+    ):
+        self.app = app
+        self.store = store or ProfileStore()
+        self.sample_rate = sample_rate
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def _should_profile(self, headers: Dict[bytes, bytes]) -> bool:
+        token = headers.get(PROFILE_HEADER)
+        if token is not None and is_authorized(token.decode("latin-1")):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        if not self._should_profile(headers) or not self._slots.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        # 파일 이름은 클라이언트 값이 아닌 서버에서 만든 ID
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode())],
+                }
+            await send(message)
+
+        sampler = StackSampler(profile_id, threading.get_ident())
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            self._slots.release()
+            try:
+                await asyncio.to_thread(self._save, profile_id, sampler)
+                logger.info(
+                    f"요청 프로파일 저장: {profile_id} ({scope.get('method')} {scope.get('path')}, "
+                    f"{sampler.duration * 1000:.0f}ms, 샘플 {sum(sampler.samples.values())}개)"
+                )
+            except Exception as e:
+                logger.warning(f"요청 프로파일 저장 오류 ({profile_id}): {e}")
+
+    def _save(self, profile_id: str, sampler: StackSampler) -> None:
+        sampler.join()
+        self.store.save(profile_id, sampler.folded())
+
+
+# 글로벌 프로파일 저장소
+profile_store = ProfileStore()
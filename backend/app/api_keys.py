@@ -0,0 +1,194 @@
+"""
+API 키 인증 인덱스 모듈
+
+기기 요청마다 api_keys / users 컬렉션을 조회하지 않도록
+API 키의 SHA-256 해시를 키로 하는 인메모리 인덱스를 유지합니다.
+
+- 주기적(TTL) 전체 갱신 (변경 스트림이 없으면 더 짧은 주기로)
+- 변경 스트림(replica set 환경)을 통한 변경 즉시 갱신
+- 인덱스에 없는 키는 DB를 한 번 조회하고, 존재하지 않는 키는 짧게 음성 캐싱
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from .cache import CacheManager
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 인덱스 설정
+API_KEY_INDEX_TTL_SECONDS = int(os.getenv("API_KEY_INDEX_TTL_SECONDS", "300"))
+# 변경 스트림을 쓸 수 없을 때 (단일 노드 등) 폐기/삭제된 키가 유효하게 남는 최대 시간
+API_KEY_INDEX_FALLBACK_TTL_SECONDS = int(os.getenv("API_KEY_INDEX_FALLBACK_TTL_SECONDS", "30"))
+API_KEY_NEGATIVE_TTL_SECONDS = int(os.getenv("API_KEY_NEGATIVE_TTL_SECONDS", "10"))
+API_KEY_USER_TTL_SECONDS = int(os.getenv("API_KEY_USER_TTL_SECONDS", "5"))
+
+_KEY_PROJECTION = {"key": 1, "key_hash": 1, "user_id": 1, "expires_at": 1}
+
+
+def hash_api_key(api_key: str) -> str:
+    """API 키의 SHA-256 해시 (인덱스에는 평문 키를 보관하지 않음)"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _index_entry(doc: Dict[str, Any]) -> Optional[tuple]:
+    key_hash = doc.get("key_hash") or (hash_api_key(doc["key"]) if doc.get("key") else None)
+    if key_hash is None:
+        return None
+    return key_hash, {"user_id": doc.get("user_id"), "expires_at": doc.get("expires_at")}
+
+
+class ApiKeyIndex:
+    """해시된 API 키 → (사용자 ID, 만료 시각) 인메모리 인덱스"""
+
+    def __init__(
+        self,
+        ttl_seconds: int = API_KEY_INDEX_TTL_SECONDS,
+        fallback_ttl_seconds: int = API_KEY_INDEX_FALLBACK_TTL_SECONDS,
+        negative_ttl_seconds: int = API_KEY_NEGATIVE_TTL_SECONDS,
+        user_ttl_seconds: int = API_KEY_USER_TTL_SECONDS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.user_ttl_seconds = user_ttl_seconds
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        # 변경 스트림이 열려 있는 동안만 긴 TTL 사용
+        self.watching = False
+        # 변경 스트림을 열지 못한 환경(단일 노드 등)에서는 갱신 때마다 감시 태스크를 다시 만들지 않음
+        self.change_streams_supported = True
+        self._misses = CacheManager(max_entries=10000, shared_path=None)
+        self._users = CacheManager(max_entries=10000, shared_path=None)
+
+    @property
+    def effective_ttl_seconds(self) -> int:
+        return self.ttl_seconds if self.watching else min(self.ttl_seconds, self.fallback_ttl_seconds)
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.effective_ttl_seconds
+
+    async def refresh(self, db: AsyncIOMotorDatabase, only_if_stale: bool = False) -> None:
+        """api_keys 컬렉션 전체를 다시 읽어 인덱스 교체"""
+        async with self._refresh_lock:
+            # 동시에 대기하던 요청은 먼저 끝난 갱신 결과를 그대로 사용
+            if only_if_stale and not self.is_stale:
+                return
+            keys = {}
+            async for doc in db.api_keys.find({}, _KEY_PROJECTION):
+                entry = _index_entry(doc)
+                if entry is not None:
+                    keys[entry[0]] = entry[1]
+            self._keys = keys
+            self._loaded_at = time.monotonic()
+            self._misses.clear()
+            logger.info(f"API 키 인덱스 갱신: {len(keys)}개")
+
+    def start_watching(self, db: AsyncIOMotorDatabase) -> None:
+        """변경 스트림 감시 시작 (지원하지 않는 환경에서는 TTL 갱신만 사용)"""
+        if not self.change_streams_supported:
+            return
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(db))
+
+    async def stop_watching(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self, db: AsyncIOMotorDatabase) -> None:
+        try:
+            async with db.api_keys.watch(full_document="updateLookup") as stream:
+                self.watching = True
+                async for change in stream:
+                    self._apply_change(change)
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            if self.watching:
+                logger.warning(f"API 키 변경 스트림이 끊겼습니다. 다음 조회 때 다시 엽니다: {e}")
+            else:
+                # 스트림을 한 번도 열지 못함 (replica set이 아님 등) - 이후로는 다시 시도하지 않음
+                self.change_streams_supported = False
+                logger.info(
+                    f"API 키 변경 스트림을 사용할 수 없어 {self.effective_ttl_seconds}초 주기 갱신만 사용합니다: {e}"
+                )
+        finally:
+            # 스트림이 끊긴 동안 놓친 변경이 있을 수 있으므로 다음 조회 때 전체 갱신
+            if self.watching:
+                self._loaded_at = None
+            self.watching = False
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        """변경 이벤트를 인덱스에 반영"""
+        if change.get("operationType") in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            entry = _index_entry(doc) if doc else None
+            if entry is not None:
+                self._keys[entry[0]] = entry[1]
+                self._misses.delete(entry[0])
+                return
+        # 삭제 등 해시를 알 수 없는 변경은 다음 조회 때 전체 갱신
+        self._loaded_at = None
+
+    async def lookup(self, api_key: str, db: AsyncIOMotorDatabase) -> Optional[Dict[str, Any]]:
+        """API 키 정보 조회 (대부분 로컬 딕셔너리 조회로 끝남)"""
+        if self.is_stale:
+            await self.refresh(db, only_if_stale=True)
+            self.start_watching(db)
+
+        key_hash = hash_api_key(api_key)
+        entry = self._keys.get(key_hash)
+        if entry is not None:
+            return entry
+
+        if self._misses.get(key_hash):
+            return None
+
+        # 인덱스 갱신 이후 추가된 키일 수 있으므로 DB를 한 번 조회
+        doc = await db.api_keys.find_one(
+            {"$or": [{"key_hash": key_hash}, {"key": api_key}]}, _KEY_PROJECTION
+        )
+        if doc is None:
+            self._misses.set(key_hash, True, self.negative_ttl_seconds)
+            return None
+
+        entry = _index_entry(doc)[1]
+        self._keys[key_hash] = entry
+        return entry
+
+    async def get_user(self, user_id: str, db: AsyncIOMotorDatabase) -> Optional[Dict[str, Any]]:
+        """API 키에 연결된 사용자 조회 (짧은 TTL 캐시)"""
+        user = self._users.get(user_id)
+        if user is None:
+            user = await db.users.find_one({"id": user_id})
+            if user is None:
+                return None
+            # MongoDB _id 필드 제거
+            user.pop("_id", None)
+            self._users.set(user_id, user, self.user_ttl_seconds)
+        return dict(user)
+
+    def invalidate(self) -> None:
+        """다음 조회 때 인덱스 전체를 다시 읽도록 표시"""
+        self._loaded_at = None
+        self._users.clear()
+
+
+# 글로벌 API 키 인덱스
+api_key_index = ApiKeyIndex()
@@ -0,0 +1,334 @@
+"""
+애플리케이션 캐시 모듈
+
+크기 제한이 있는 LRU/TTL 캐시와 같은 호스트의 워커끼리 공유하는 선택적 SQLite 계층을 제공합니다.
+"""
+
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 캐시 설정
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_SHARED_PATH = os.getenv("CACHE_SHARED_PATH", "")  # 예: /dev/shm/nottoday-cache.sqlite
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """캐시 값의 대략적인 크기(바이트) 추정"""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class SharedCacheTier:
+    """
+    같은 호스트의 uvicorn 워커들이 공유하는 SQLite 기반 캐시 계층
+
+    tmpfs(/dev/shm)에 두면 디스크 I/O 없이 워커 간에 값을 공유할 수 있습니다.
+    값은 pickle로 직렬화되므로 신뢰할 수 있는 프로세스끼리만 공유해야 합니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Tuple[Any, Optional[float]]:
+        """(값, 만료 시각(epoch)) 반환, 없으면 (_MISSING, None)"""
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return _MISSING, None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return _MISSING, None
+        return pickle.loads(value), expires_at
+
+    def set(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at),
+        )
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache")
+
+    def purge_expired(self) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+
+class CacheManager:
+    """
+    크기 제한 LRU/TTL 캐시
+
+    - 항목 수와 대략적인 총 바이트 수로 제한하며, 초과 시 가장 오래 사용되지 않은 항목부터 제거
+    - 만료 시각은 time.monotonic() 기준으로 저장하고, 조회 시와 purge_expired()에서 만료 항목을 정리
+    - get_or_set()은 같은 키에 대한 동시 미스를 한 번의 계산으로 합침 (single-flight)
+    - shared_path를 지정하면 같은 호스트의 워커끼리 값을 공유하는 2차 계층 사용
+      (이벤트 루프에서는 SQLite I/O를 스레드 풀에서 하는 aget/aset/adelete 사용)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        shared_path: Optional[str] = CACHE_SHARED_PATH or None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (값, 만료 시각(monotonic) 또는 None, 크기)
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.RLock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "shared_hits": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "coalesced": 0,
+        }
+
+        self.shared: Optional[SharedCacheTier] = None
+        if shared_path:
+            try:
+                self.shared = SharedCacheTier(shared_path)
+            except Exception as e:
+                logger.warning(f"공유 캐시 계층을 열 수 없습니다 ({shared_path}): {e}")
+
+    def _lookup_local(self, key: str) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at is None or now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                self._remove(key)
+                self.stats["expirations"] += 1
+        return _MISSING
+
+    def _lookup_shared(self, key: str) -> Any:
+        """공유 계층 조회 (블로킹 SQLite I/O - 이벤트 루프에서는 스레드 풀에서 호출)"""
+        try:
+            value, expires_at = self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"공유 캐시 조회 오류: {e}")
+            return _MISSING
+        if value is not _MISSING:
+            ttl = None if expires_at is None else expires_at - time.time()
+            self._store(key, value, ttl)
+            self.stats["shared_hits"] += 1
+        return value
+
+    def _lookup(self, key: str) -> Any:
+        value = self._lookup_local(key)
+        if value is _MISSING and self.shared is not None:
+            value = self._lookup_shared(key)
+        if value is _MISSING:
+            self.stats["misses"] += 1
+        return value
+
+    async def _alookup(self, key: str) -> Any:
+        value = self._lookup_local(key)
+        if value is _MISSING and self.shared is not None:
+            value = await asyncio.to_thread(self._lookup_shared, key)
+        if value is _MISSING:
+            self.stats["misses"] += 1
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        값 조회 (동기)
+
+        공유 계층이 있으면 SQLite를 직접 읽으므로, 이벤트 루프에서는 aget()을 사용합니다.
+        """
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """값 조회 (공유 계층 I/O는 스레드 풀에서)"""
+        value = await self._alookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any, ttl_seconds: int = 3600):
+        """값 저장 (ttl_seconds <= 0 이면 만료 없음, 공유 계층은 동기 기록)"""
+        ttl = ttl_seconds if ttl_seconds > 0 else None
+        self._store(key, value, ttl)
+        if self.shared is not None:
+            self._set_shared(key, value, ttl)
+
+    async def aset(self, key: str, value: Any, ttl_seconds: int = 3600):
+        """값 저장 (공유 계층 I/O는 스레드 풀에서)"""
+        ttl = ttl_seconds if ttl_seconds > 0 else None
+        self._store(key, value, ttl)
+        if self.shared is not None:
+            await asyncio.to_thread(self._set_shared, key, value, ttl)
+
+    def _set_shared(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        try:
+            self.shared.set(key, value, None if ttl is None else time.time() + ttl)
+        except Exception as e:
+            logger.warning(f"공유 캐시 저장 오류: {e}")
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            expires_at = None if ttl is None else time.monotonic() + ttl
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        """한도를 넘으면 LRU 순으로 제거 (만료 항목은 조회 시점이나 purge_expired()에서 정리)"""
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.stats["evictions"] += 1
+
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl_seconds: int = 3600,
+    ) -> Any:
+        """
+        캐시된 값을 반환하거나, 없으면 factory()로 계산해 저장
+
+        같은 키에 대한 동시 요청은 진행 중인 한 번의 계산 결과를 함께 기다립니다.
+        계산은 별도 태스크에서 실행되므로 처음 요청한 쪽이 취소되어도 다른 대기자는 결과를 받습니다.
+        """
+        value = self._lookup_local(key)
+        if value is not _MISSING:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, factory, ttl_seconds))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, factory: Callable[[], Awaitable[Any]], ttl_seconds: int) -> Any:
+        value = await self._alookup(key)
+        if value is not _MISSING:
+            return value
+        value = await factory()
+        await self.aset(key, value, ttl_seconds)
+        return value
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 대기자가 모두 떠난 뒤 실패한 경우 "예외를 꺼내지 않음" 경고 방지
+        if not task.cancelled():
+            task.exception()
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                logger.warning(f"공유 캐시 삭제 오류: {e}")
+
+    async def adelete(self, key: str):
+        """항목 삭제 (공유 계층 I/O는 스레드 풀에서)"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.shared is not None:
+            try:
+                await asyncio.to_thread(self.shared.delete, key)
+            except Exception as e:
+                logger.warning(f"공유 캐시 삭제 오류: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.shared is not None:
+            try:
+                self.shared.clear()
+            except Exception as e:
+                logger.warning(f"공유 캐시 초기화 오류: {e}")
+
+    def purge_expired(self) -> int:
+        """만료된 항목을 즉시 정리하고 제거한 개수 반환"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, exp, _) in self._entries.items() if exp is not None and exp <= now]
+            for key in expired:
+                self._remove(key)
+            self.stats["expirations"] += len(expired)
+        if self.shared is not None:
+            try:
+                self.shared.purge_expired()
+            except Exception as e:
+                logger.warning(f"공유 캐시 정리 오류: {e}")
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """적중/미스/제거 통계와 현재 사용량"""
+        lookups = self.stats["hits"] + self.stats["shared_hits"] + self.stats["misses"]
+        hits = self.stats["hits"] + self.stats["shared_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "shared": self.shared is not None,
+        }
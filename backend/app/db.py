@@ -0,0 +1,247 @@
+"""
+MongoDB 연결 관리 모듈
+
+프로세스당 하나의 비동기(Motor) 클라이언트와, 아직 동기 드라이버를 쓰는 코드를 위한
+하나의 동기(pymongo) 클라이언트를 같은 설정으로 관리합니다.
+연결 풀 이벤트를 수집하여 체크아웃 대기 시간과 사용 중인 연결 수를 제공합니다.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, monitoring
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from .metrics import registry, record_phase
+
+# 환경 변수 로드
+load_dotenv()
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# MongoDB 연결 설정
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "nottoday")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+# 체크아웃 대기 시간 히스토그램 경계 (초)
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# 연결 풀 / 명령 지표
+checkout_wait_histogram = registry.histogram(
+    "mongodb_pool_checkout_wait_seconds",
+    "MongoDB 연결 풀 체크아웃 대기 시간",
+    ("pool",),
+    buckets=CHECKOUT_WAIT_BUCKETS,
+)
+command_histogram = registry.histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB 명령 실행 시간",
+    ("command", "outcome"),
+)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """연결 풀 이벤트로 사용 중 연결 수와 체크아웃 대기 시간 집계"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open_connections = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_wait_seconds_sum": round(self.wait_sum, 6),
+                "checkout_wait_seconds_max": round(self.wait_max, 6),
+            }
+
+    def _record_wait(self) -> None:
+        started = getattr(self._local, "checkout_started", None)
+        if started is None:
+            return
+        self._local.checkout_started = None
+        wait = time.perf_counter() - started
+        self.wait_sum += wait
+        self.wait_max = max(self.wait_max, wait)
+        checkout_wait_histogram.observe(wait, pool=self.name)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        # 체크아웃은 같은 스레드에서 시작되고 끝남 (Motor도 내부 스레드 풀에서 동기 드라이버 사용)
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+            self._record_wait()
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self._record_wait()
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """
+    명령 실행 시간을 명령별 히스토그램과 현재 요청의 "db" 구간에 기록
+
+    Motor는 호출한 코루틴의 contextvars를 복사해 스레드 풀에서 드라이버를 실행하므로
+    요청 단위 구간 시간이 올바른 요청에 합산됩니다.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "success")
+
+    def failed(self, event):
+        self._record(event, "failure")
+
+    def _record(self, event, outcome: str) -> None:
+        seconds = event.duration_micros / 1_000_000
+        command_histogram.observe(seconds, command=event.command_name, outcome=outcome)
+        record_phase("db", seconds)
+
+
+class MongoConnectionManager:
+    """
+    프로세스 전체에서 공유하는 MongoDB 클라이언트 관리자
+
+    클라이언트는 처음 사용할 때 생성되며, 앱 lifespan에서 connect()/close()를 호출합니다.
+    """
+
+    def __init__(self, uri: str = MONGODB_URI, db_name: str = DB_NAME):
+        self.uri = uri
+        self.db_name = db_name
+        self.async_pool = PoolMetricsListener("async")
+        self.sync_pool = PoolMetricsListener("sync")
+        self.command_listener = CommandTimingListener()
+        self._async_client: Optional[AsyncIOMotorClient] = None
+        self._sync_client: Optional[MongoClient] = None
+        self._lock = threading.Lock()
+
+    def _client_options(self, listener: PoolMetricsListener) -> Dict[str, Any]:
+        return {
+            "maxPoolSize": MONGO_MAX_POOL_SIZE,
+            "minPoolSize": MONGO_MIN_POOL_SIZE,
+            "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "readPreference": MONGO_READ_PREFERENCE,
+            "event_listeners": [listener, self.command_listener],
+        }
+
+    @property
+    def async_client(self) -> AsyncIOMotorClient:
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = AsyncIOMotorClient(self.uri, **self._client_options(self.async_pool))
+            return self._async_client
+
+    @property
+    def sync_client(self) -> MongoClient:
+        """동기 드라이버가 필요한 코드(백그라운드 스크립트 등) 전용"""
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = MongoClient(self.uri, **self._client_options(self.sync_pool))
+            return self._sync_client
+
+    @property
+    def async_db(self) -> AsyncIOMotorDatabase:
+        return self.async_client[self.db_name]
+
+    @property
+    def sync_db(self):
+        return self.sync_client[self.db_name]
+
+    async def connect(self) -> None:
+        """연결 확인 (앱 시작 시 호출)"""
+        await self.async_client.admin.command("ping")
+        logger.info("MongoDB에 성공적으로 연결되었습니다.")
+
+    async def ping(self) -> bool:
+        try:
+            await self.async_client.admin.command("ping")
+            return True
+        except Exception as e:
+            logger.warning(f"MongoDB ping 실패: {e}")
+            return False
+
+    def close(self) -> None:
+        """모든 클라이언트 종료 (앱 종료 시 호출)"""
+        with self._lock:
+            if self._async_client is not None:
+                self._async_client.close()
+                self._async_client = None
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+        logger.info("MongoDB 연결을 종료했습니다.")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """풀 설정과 비동기/동기 풀별 지표"""
+        return {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "read_preference": MONGO_READ_PREFERENCE,
+            "async": self.async_pool.stats(),
+            "sync": self.sync_pool.stats(),
+        }
+
+
+# 글로벌 연결 관리자
+mongo = MongoConnectionManager()
+
+
+def get_mongo_manager() -> MongoConnectionManager:
+    return mongo
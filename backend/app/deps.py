@@ -4,28 +4,30 @@ from typing import Optional, Dict, Any, Generator
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 import os
-from pymongo import MongoClient
 from dotenv import load_dotenv
 import logging
-from functools import lru_cache
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import ValidationError, BaseModel
 
 from .models.user import User, TokenData, UserInDB
 from .core.config import settings
+from .cache import CacheManager
+from .api_keys import api_key_index
+from .db import mongo
 
 # 환경 변수 로드
 load_dotenv()
 
-# MongoDB 연결 설정
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-DB_NAME = os.getenv("DB_NAME", "nottoday")
-
 # JWT 설정
 SECRET_KEY = os.getenv("SECRET_KEY", "이것은매우안전한시크릿키입니다변경하세요")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# 인증 사용자 캐시 설정 (워커별)
+# 사용자 비활성화/권한 변경은 명시적으로 무효화하지 않으므로 TTL이 반영 지연의 상한
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "5"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "5000"))
+
 # 보안 스키마 설정
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
@@ -36,42 +38,27 @@ security = HTTPBearer()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# MongoDB 클라이언트 싱글톤
-@lru_cache
+# MongoDB 클라이언트 (연결 관리자는 app.db에서 lifespan으로 관리)
 def get_mongo_client():
-    try:
-        client = MongoClient(MONGODB_URI)
-        # 연결 테스트
-        client.admin.command('ping')
-        logger.info("MongoDB에 성공적으로 연결되었습니다.")
-        return client
-    except Exception as e:
-        logger.error(f"MongoDB 연결 오류: {e}")
-        raise Exception(f"데이터베이스 연결 실패: {e}")
+    return mongo.sync_client
 
 # 데이터베이스 의존성
 def get_db() -> Generator:
     """
     요청당 동기식 MongoDB 연결을 제공하는 의존성
+    
+    비동기 라우트에서는 이벤트 루프를 막지 않도록 get_async_db를 사용해야 합니다.
     """
-    try:
-        yield get_mongo_client()[DB_NAME]
-    finally:
-        pass  # 연결 풀을 사용하므로 명시적 닫기 불필요
+    yield mongo.sync_db
 
-# 데이터베이스 클라이언트
-mongo_client = MongoClient(MONGODB_URI)
-async_mongo_client = AsyncIOMotorClient(MONGODB_URI)
-
-# 데이터베이스 객체
-db = mongo_client[DB_NAME]
-async_db = async_mongo_client[DB_NAME]
-
-async def get_async_db():
+async def get_async_db() -> AsyncIOMotorDatabase:
     """
     요청당 비동기식 MongoDB 연결을 제공하는 의존성
     """
-    return async_db
+    return mongo.async_db
+
+# 기존 코드 호환용 별칭
+get_database = get_async_db
 
 # 인증 관련 모델
 class TokenData(BaseModel):
@@ -86,6 +73,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# 인증된 사용자 캐시 (username -> User)
+principal_cache = CacheManager(max_entries=PRINCIPAL_CACHE_MAX_ENTRIES, shared_path=None)
+
+def _principal_cache_key(username: str) -> str:
+    return f"principal:{username}"
+
 # 현재 인증된 사용자 가져오기 (JWT 토큰 기반)
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -120,6 +113,12 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # 캐시된 사용자 확인 (토큰 검증은 매 요청 수행)
+    cache_key = _principal_cache_key(token_data.username)
+    cached_user = principal_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user.model_copy()
+    
     # 사용자 조회
     user = await db.users.find_one({"username": token_data.username})
     if user is None:
@@ -129,18 +128,21 @@ async def get_current_user(
     user["id"] = str(user["_id"])
     del user["_id"]
     
-    return User(**user)
+    current_user = User(**user)
+    principal_cache.set(cache_key, current_user, PRINCIPAL_CACHE_TTL_SECONDS)
+    
+    return current_user.model_copy()
 
 # API 키 인증
-async def get_api_key_user(api_key: str = Header(..., alias="X-API-Key"), db = Depends(get_db)):
+async def get_api_key_user(api_key: str = Header(..., alias="X-API-Key"), db = Depends(get_async_db)):
     if not api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API 키가 필요합니다",
         )
     
-    # API 키로 사용자 조회
-    api_key_info = db.api_keys.find_one({"key": api_key})
+    # 해시된 API 키 인덱스에서 조회
+    api_key_info = await api_key_index.lookup(api_key, db)
     if not api_key_info:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -148,29 +150,26 @@ async def get_api_key_user(api_key: str = Header(..., alias="X-API-Key"), db = D
         )
     
     # 만료 확인
-    if "expires_at" in api_key_info and api_key_info["expires_at"] < datetime.now():
+    if api_key_info.get("expires_at") and api_key_info["expires_at"] < datetime.now():
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API 키가 만료되었습니다",
         )
     
     # 사용자 정보 조회
-    user = db.users.find_one({"id": api_key_info["user_id"]})
+    user = await api_key_index.get_user(api_key_info["user_id"], db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API 키에 연결된 사용자를 찾을 수 없습니다",
         )
     
-    # MongoDB _id 필드 제거
-    user.pop("_id", None)
-    
     return user
 
 # 선택적 인증 (API 키 또는 JWT 토큰)
 async def get_optional_user(
     request: Request,
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ) -> Optional[Dict[str, Any]]:
     # 헤더에서 토큰 또는 API 키 확인
     authorization = request.headers.get("Authorization")
@@ -252,33 +251,6 @@ async def get_ai_service():
     from .services.ai_service import AIService
     return AIService()
 
-# 캐싱 의존성
-class CacheManager:
-    def __init__(self):
-        self.cache = {}
-        self.ttl = {}
-    
-    def get(self, key: str) -> Any:
-        now = datetime.utcnow()
-        if key in self.cache and (key not in self.ttl or now < self.ttl[key]):
-            return self.cache[key]
-        return None
-    
-    def set(self, key: str, value: Any, ttl_seconds: int = 3600):
-        self.cache[key] = value
-        if ttl_seconds > 0:
-            self.ttl[key] = datetime.utcnow() + timedelta(seconds=ttl_seconds)
-    
-    def delete(self, key: str):
-        if key in self.cache:
-            del self.cache[key]
-        if key in self.ttl:
-            del self.ttl[key]
-    
-    def clear(self):
-        self.cache.clear()
-        self.ttl.clear()
-
 # 글로벌 캐시 인스턴스
 cache_manager = CacheManager()
 
@@ -0,0 +1,336 @@
+"""
+LLM 업스트림 클라이언트
+
+/ask가 사용하는 생성 백엔드입니다. LLM_BACKEND로 선택합니다.
+- medllama: HuggingFace 추론 API의 MedLlama (기본)
+- llamacpp: 로컬 llama.cpp 서버의 /completion (CPU 서빙, 토큰 스트리밍)
+
+공통 동작
+- 요청마다 새 연결을 맺지 않도록 프로세스당 하나의 httpx 클라이언트(keep-alive)를 앱 수명 동안 재사용
+- 동시 생성 수를 슬롯(세마포어)으로 제한하고, 자리를 기다리는 요청은 대기열에서 기다림
+- 같은 프롬프트가 처리 중이면 새 요청을 보내지 않고 그 결과를 함께 받음 (스트리밍 제외)
+- 업스트림 지연 시간, 첫 토큰 시간, 대기 시간, 처리 중/대기 중 요청 수를 /metrics로 노출
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from .metrics import registry
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "medllama")  # medllama | llamacpp
+
+# MedLlama 설정 (테스트에서는 MEDLLAMA_URL을 로컬 대역 서버로 지정)
+HF_TOKEN = os.getenv("HF_TOKEN")
+MEDLLAMA_URL = os.getenv(
+    "MEDLLAMA_URL", "https://api-inference.huggingface.co/models/johnsnowlabs/JSL-MedLlama-3-8B-v2.0"
+)
+MEDLLAMA_TIMEOUT_SECONDS = float(os.getenv("MEDLLAMA_TIMEOUT_SECONDS", "60"))
+MEDLLAMA_MAX_CONCURRENCY = int(os.getenv("MEDLLAMA_MAX_CONCURRENCY", "8"))
+MEDLLAMA_MAX_CONNECTIONS = int(os.getenv("MEDLLAMA_MAX_CONNECTIONS", "20"))
+MEDLLAMA_KEEPALIVE_SECONDS = float(os.getenv("MEDLLAMA_KEEPALIVE_SECONDS", "30"))
+MEDLLAMA_HTTP2 = os.getenv("MEDLLAMA_HTTP2", "true").lower() == "true"
+
+# llama.cpp 서버 설정 (에이전트 Dockerfile의 LLAMA 변수와 같은 이름)
+LLAMA_URL = os.getenv("LLAMA", "http://localhost:7000/completion")
+# 서버의 --parallel 값과 맞춤 (CPU 서빙에서 동시 생성을 늘리면 모든 요청이 느려짐)
+LLAMA_CPP_SLOTS = int(os.getenv("LLAMA_CPP_SLOTS", "1"))
+LLAMA_CPP_N_PREDICT = int(os.getenv("LLAMA_CPP_N_PREDICT", "512"))
+LLAMA_CPP_TIMEOUT_SECONDS = float(os.getenv("LLAMA_CPP_TIMEOUT_SECONDS", "300"))
+
+# 생성 요청은 수 초 ~ 수십 초 걸리므로 기본 경계보다 넓게 (초)
+UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# 업스트림 지표
+upstream_duration = registry.histogram(
+    "llm_upstream_duration_seconds",
+    "LLM 업스트림 요청 시간",
+    ("backend", "outcome"),
+    buckets=UPSTREAM_BUCKETS,
+)
+upstream_first_token = registry.histogram(
+    "llm_upstream_first_token_seconds",
+    "LLM 스트리밍 첫 토큰까지 걸린 시간 (슬롯 대기 제외)",
+    ("backend",),
+    buckets=UPSTREAM_BUCKETS,
+)
+upstream_queue_wait = registry.histogram(
+    "llm_upstream_queue_wait_seconds",
+    "LLM 업스트림 동시 요청 자리를 기다린 시간",
+    ("backend",),
+    buckets=UPSTREAM_BUCKETS,
+)
+upstream_in_flight = registry.gauge(
+    "llm_upstream_in_flight",
+    "처리 중인 LLM 업스트림 요청 수",
+    ("backend",),
+)
+upstream_queued = registry.gauge(
+    "llm_upstream_queued",
+    "동시 요청 자리를 기다리는 LLM 요청 수",
+    ("backend",),
+)
+
+
+def _http2_available() -> bool:
+    """httpx의 HTTP/2 지원에는 h2 패키지가 필요함"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LLMBackend(ABC):
+    """생성 백엔드 공통 부분 (하위 클래스는 _complete와 필요하면 _stream을 구현)"""
+
+    name = "base"
+
+    def __init__(
+        self,
+        url: str,
+        max_concurrency: int,
+        timeout: float,
+        http2: bool = False,
+        headers: Optional[Dict[str, str]] = None,
+        max_connections: Optional[int] = None,
+        keepalive_seconds: float = 30.0,
+    ):
+        self.url = url
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.http2 = http2
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.max_connections = max_connections or self.max_concurrency * 2
+        self.keepalive_seconds = keepalive_seconds
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._available_slots = self.max_concurrency
+        # 프롬프트 -> 처리 중인 업스트림 요청
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"requests": 0, "streams": 0, "upstream_requests": 0, "coalesced": 0, "errors": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # 수명 주기 밖(스크립트 등)에서 호출되면 처음 사용할 때 생성
+        if self._client is None:
+            self.start()
+        return self._client
+
+    def start(self) -> None:
+        """연결 풀 생성 (앱 시작 시)"""
+        if self._client is not None:
+            return
+        http2 = self.http2 and _http2_available()
+        if self.http2 and not http2:
+            logger.warning(f"h2 패키지가 없어 {self.name} 업스트림에 HTTP/1.1 사용")
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            headers=self.headers,
+            timeout=httpx.Timeout(self.timeout, connect=min(10.0, self.timeout)),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_seconds,
+            ),
+        )
+        logger.info(f"LLM 백엔드 시작 ({self.name}): {self.url} (HTTP/2: {http2}, 생성 슬롯 {self.max_concurrency})")
+
+    async def close(self) -> None:
+        """처리 중인 요청을 취소하고 연결 풀 종료 (앱 종료 시)"""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def generate(self, prompt: str) -> str:
+        """
+        프롬프트로 답변 생성
+
+        같은 프롬프트가 이미 처리 중이면 업스트림 요청을 새로 보내지 않고 그 결과를 함께 받습니다.
+        요청한 클라이언트가 연결을 끊어도 업스트림 요청은 다른 대기자를 위해 계속 진행됩니다.
+        """
+        self.stats["requests"] += 1
+        task = self._inflight.get(prompt)
+        if task is None:
+            task = asyncio.create_task(self._request(prompt))
+            self._inflight[prompt] = task
+            task.add_done_callback(lambda done: self._finish(prompt, done))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """생성되는 대로 답변 조각 반환 (슬롯은 스트림이 끝날 때까지 점유)"""
+        self.stats["streams"] += 1
+        async with self._slot():
+            started = time.perf_counter()
+            first = True
+            tokens = self._stream(prompt)
+            try:
+                async for token in tokens:
+                    if first:
+                        upstream_first_token.observe(time.perf_counter() - started, backend=self.name)
+                        first = False
+                    yield token
+            finally:
+                # 중간에 끊겨도 업스트림 응답을 바로 닫아 llama.cpp 슬롯을 돌려줌
+                await tokens.aclose()
+
+    def _finish(self, prompt: str, task: asyncio.Task) -> None:
+        if self._inflight.get(prompt) is task:
+            del self._inflight[prompt]
+        # 대기자가 모두 떠난 뒤 실패한 경우 "예외를 꺼내지 않음" 경고 방지
+        if not task.cancelled():
+            task.exception()
+
+    @asynccontextmanager
+    async def _slot(self):
+        """생성 슬롯을 얻어 업스트림 요청 하나를 처리하는 구간 (대기/처리 지표 기록)"""
+        queued_at = time.perf_counter()
+        upstream_queued.inc(backend=self.name)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            upstream_queued.dec(backend=self.name)
+        self._available_slots -= 1
+        upstream_queue_wait.observe(time.perf_counter() - queued_at, backend=self.name)
+
+        started = time.perf_counter()
+        outcome = "error"
+        upstream_in_flight.inc(backend=self.name)
+        self.stats["upstream_requests"] += 1
+        try:
+            yield
+            outcome = "success"
+        except (asyncio.CancelledError, GeneratorExit):
+            # 스트리밍 중 클라이언트가 연결을 끊은 경우 포함
+            outcome = "cancelled"
+            raise
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            upstream_in_flight.dec(backend=self.name)
+            upstream_duration.observe(time.perf_counter() - started, backend=self.name, outcome=outcome)
+            self._available_slots += 1
+            self._semaphore.release()
+
+    async def _request(self, prompt: str) -> str:
+        async with self._slot():
+            return await self._complete(prompt)
+
+    @abstractmethod
+    async def _complete(self, prompt: str) -> str:
+        """프롬프트 하나에 대한 전체 답변 (슬롯 안에서 호출)"""
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        # 스트리밍을 지원하지 않는 백엔드는 전체 답변을 한 번에 반환
+        yield await self._complete(prompt)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_flight_prompts": len(self._inflight),
+            "available_slots": self._available_slots,
+        }
+
+
+class MedLlamaClient(LLMBackend):
+    """HuggingFace 추론 API로 MedLlama를 호출하는 백엔드"""
+
+    name = "medllama"
+
+    def __init__(
+        self,
+        url: str = MEDLLAMA_URL,
+        token: Optional[str] = HF_TOKEN,
+        max_concurrency: int = MEDLLAMA_MAX_CONCURRENCY,
+        timeout: float = MEDLLAMA_TIMEOUT_SECONDS,
+        http2: bool = MEDLLAMA_HTTP2,
+    ):
+        super().__init__(
+            url,
+            max_concurrency,
+            timeout,
+            http2=http2,
+            headers={"Authorization": f"Bearer {token}"} if token else None,
+            max_connections=MEDLLAMA_MAX_CONNECTIONS,
+            keepalive_seconds=MEDLLAMA_KEEPALIVE_SECONDS,
+        )
+
+    async def _complete(self, prompt: str) -> str:
+        resp = await self.client.post(self.url, json={"inputs": prompt})
+        resp.raise_for_status()
+        data = resp.json()
+        if isinstance(data, list) and len(data) > 0 and "generated_text" in data[0]:
+            return data[0]["generated_text"]
+        return "No answer generated."
+
+
+class LlamaCppClient(LLMBackend):
+    """로컬 llama.cpp 서버의 /completion을 호출하는 백엔드"""
+
+    name = "llamacpp"
+
+    def __init__(
+        self,
+        url: str = LLAMA_URL,
+        slots: int = LLAMA_CPP_SLOTS,
+        n_predict: int = LLAMA_CPP_N_PREDICT,
+        timeout: float = LLAMA_CPP_TIMEOUT_SECONDS,
+    ):
+        # llama.cpp 서버는 HTTP/1.1만 지원
+        super().__init__(url, slots, timeout)
+        self.n_predict = n_predict
+
+    def _payload(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        # cache_prompt: 같은 슬롯에서 공통 접두사(프롬프트 템플릿)의 KV 캐시 재사용
+        return {"prompt": prompt, "n_predict": self.n_predict, "stream": stream, "cache_prompt": True}
+
+    async def _complete(self, prompt: str) -> str:
+        resp = await self.client.post(self.url, json=self._payload(prompt, stream=False))
+        resp.raise_for_status()
+        return resp.json().get("content", "").strip() or "No answer generated."
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        async with self.client.stream("POST", self.url, json=self._payload(prompt, stream=True)) as resp:
+            resp.raise_for_status()
+            # 응답은 "data: {...}" 줄 단위 SSE
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = json.loads(line[len("data:"):])
+                if chunk.get("content"):
+                    yield chunk["content"]
+                if chunk.get("stop"):
+                    break
+
+
+def create_llm_backend(backend: str = LLM_BACKEND) -> LLMBackend:
+    """설정에 맞는 생성 백엔드 생성"""
+    if backend == "llamacpp":
+        return LlamaCppClient()
+    if backend != "medllama":
+        logger.warning(f"알 수 없는 LLM_BACKEND: {backend}, medllama 사용")
+    return MedLlamaClient()
+
+
+# 글로벌 백엔드 (앱 수명 주기에서 시작/종료)
+llm_backend = create_llm_backend()
+
+
+def get_llm_backend() -> LLMBackend:
+    return llm_backend
@@ -1,11 +1,23 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
-from .routers import auth, users, health, ecg
+from fastapi.concurrency import run_in_threadpool
+from .routers import auth, users, health, ecg, rag, ai
 from .core.config import settings
-from .deps import get_database
+from .deps import get_database, cache_manager, principal_cache, get_current_active_superuser
+from .db import mongo
+from .metrics import registry
+from .middleware import RequestTimingMiddleware, TimedJSONResponse
+from .loop_monitor import LoopMonitorMiddleware, loop_monitor
+from .profiler import ProfilerMiddleware, profile_store, profiling_enabled
+from .warmup import check_readiness, warmup_state
+from .api_keys import api_key_index
+from .rag import rag_registry
+from .llm_client import llm_backend
+from .ml.ecg_cache import get_ecg_result_cache
 
 # 로거 설정
 logging.basicConfig(
@@ -18,12 +30,39 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """앱 시작/종료 시 공유 자원 관리"""
+    # 이벤트 루프 차단 감시 (LOOP_MONITOR_ENABLED=true 일 때만)
+    loop_monitor.start()
+    
+    # DB 연결 풀, 분석기, 캐시 워밍업 (백그라운드, 완료 전까지 readiness는 503)
+    warmup_state.start()
+    
+    # RAG 컬렉션 사전 로드 (RAG_WARM_COLLECTIONS 설정 시, 백그라운드)
+    # langchain/임베딩 모델/LLM 클라이언트는 워밍업 또는 첫 RAG 요청에서 로드
+    rag_registry.start_warmup(mongo.async_db)
+    
+    # LLM 백엔드 연결 풀 (/ask 요청 간 keep-alive 연결 재사용)
+    llm_backend.start()
+    
+    yield
+    
+    await llm_backend.close()
+    await rag_registry.close()
+    await warmup_state.stop()
+    await api_key_index.stop_watching()
+    await loop_monitor.stop()
+    mongo.close()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="NotToday 헬스케어 백엔드 API",
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
 )
 
 # CORS 미들웨어 설정
@@ -33,13 +72,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
 
+# 요청 프로파일링 (PROFILER_TOKEN 또는 PROFILER_SAMPLE_RATE 설정 시, 요청 ID를 받도록 타이밍 미들웨어 안쪽)
+if profiling_enabled():
+    app.add_middleware(ProfilerMiddleware)
+
+# 이벤트 루프를 차단한 요청을 라우트로 보고하기 위한 태스크 라벨링
+if loop_monitor.enabled:
+    app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+
+# 요청 ID / 지연 시간 / Server-Timing 미들웨어
+# add_middleware는 나중에 추가한 것이 바깥쪽이므로 마지막에 등록하여 전체 처리 시간 측정
+app.add_middleware(RequestTimingMiddleware)
+
+# /metrics에 함께 노출할 통계
+registry.register_stats("mongodb_pool", mongo.get_stats)
+registry.register_stats("app_cache", cache_manager.get_stats)
+registry.register_stats("principal_cache", principal_cache.get_stats)
+registry.register_stats("ecg_result_cache", lambda: get_ecg_result_cache().get_stats())
+registry.register_stats("event_loop", loop_monitor.get_stats)
+registry.register_stats("rag_registry", rag_registry.get_stats)
+registry.register_stats("llm_backend", llm_backend.get_stats)
+
 # 라우터 등록
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(health.router)
 app.include_router(ecg.router)
+app.include_router(rag.router)
+app.include_router(ai.router)
 
 # 요청 유효성 검사 오류 처리
 @app.exception_handler(RequestValidationError)
@@ -66,10 +129,43 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "서버 내부 오류가 발생했습니다."},
     )
 
+@app.get("/api/health/live")
+async def liveness_check():
+    """프로세스가 살아 있고 이벤트 루프가 응답하는지 확인 (의존성은 확인하지 않음)"""
+    return {"status": "alive"}
+
+@app.get("/api/health/ready")
+async def readiness_check():
+    """워밍업이 끝나고 의존성이 정상일 때만 200, 아니면 503"""
+    readiness = await check_readiness(warmup_state)
+    status_code = 200 if readiness["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=readiness)
+
 @app.get("/api/health")
 async def health_check():
-    """서버 상태 확인 엔드포인트"""
-    return {"status": "healthy"}
+    """서버 상태 확인 엔드포인트 (기존 로드 밸런서 설정 호환용, readiness와 동일)"""
+    return await readiness_check()
+
+@app.get("/api/health/db")
+async def db_health_check():
+    """MongoDB 연결 상태와 연결 풀 지표"""
+    return {
+        "status": "healthy" if await mongo.ping() else "unhealthy",
+        "pool": mongo.get_stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 텍스트 형식 지표"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/profiles/{profile_id}", include_in_schema=False)
+async def get_request_profile(profile_id: str, current_user = Depends(get_current_active_superuser)):
+    """응답의 X-Profile-Id로 저장된 프로파일 (folded stack 형식, flamegraph.pl / speedscope 호환)"""
+    folded = await run_in_threadpool(profile_store.load, profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="해당 요청의 프로파일을 찾을 수 없습니다.")
+    return PlainTextResponse(folded)
 
 @app.get("/api")
 async def root():
@@ -0,0 +1,140 @@
+"""
+요청 타이밍 미들웨어
+
+요청마다 ID를 부여하고, 라우트별 지연 시간 히스토그램과 처리 중 요청 게이지를 기록합니다.
+응답에는 DB / 분석 / 직렬화 구간 시간을 담은 Server-Timing 헤더를 추가하고,
+임계값을 넘는 요청은 구조화된 로그로 남깁니다.
+"""
+
+import os
+import json
+import time
+import logging
+import contextvars
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse
+
+from .deps import get_request_id
+from .metrics import registry, request_phases, timed_phase
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 느린 요청 로그 임계값 (밀리초)
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "1000"))
+REQUEST_ID_HEADER = "x-request-id"
+
+# Server-Timing 헤더에 항상 포함하는 구간
+SERVER_TIMING_PHASES = ("db", "analysis", "serialize")
+
+# 라우트 템플릿에 매칭되지 않은 요청 (404 등)의 라벨 - 원본 경로를 라벨로 쓰지 않음
+UNMATCHED_ROUTE = "<unmatched>"
+
+# 현재 요청 ID
+current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_request_id", default=None
+)
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP 요청 처리 시간",
+    ("method", "route", "status"),
+)
+requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "처리 중인 HTTP 요청 수",
+    ("method",),
+)
+
+
+def get_current_request_id() -> Optional[str]:
+    """현재 처리 중인 요청의 ID (요청 밖에서는 None)"""
+    return current_request_id.get()
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSON 직렬화 시간을 "serialize" 구간으로 기록하는 응답 클래스"""
+
+    def render(self, content: Any) -> bytes:
+        with timed_phase("serialize"):
+            return super().render(content)
+
+
+def format_server_timing(phases: Dict[str, float], total: float) -> str:
+    """구간 시간(초)을 Server-Timing 헤더 값으로 변환"""
+    names = list(SERVER_TIMING_PHASES) + [name for name in phases if name not in SERVER_TIMING_PHASES]
+    parts = [f"{name};dur={phases.get(name, 0.0) * 1000:.1f}" for name in names]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class RequestTimingMiddleware:
+    """
+    순수 ASGI 미들웨어
+
+    BaseHTTPMiddleware와 달리 엔드포인트와 같은 컨텍스트에서 실행되므로
+    엔드포인트와 DB 드라이버가 기록한 구간 시간을 그대로 읽을 수 있습니다.
+    """
+
+    def __init__(self, app, slow_threshold_ms: float = SLOW_REQUEST_THRESHOLD_MS):
+        self.app = app
+        self.slow_threshold_ms = slow_threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or get_request_id()
+        # 안쪽 미들웨어(프로파일러 등)와 엔드포인트가 같은 ID를 쓰도록 공유
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        phases: Dict[str, float] = {}
+        phases_token = request_phases.set(phases)
+        id_token = current_request_id.set(request_id)
+        method = scope["method"]
+        started = time.perf_counter()
+        status_code = 500
+        requests_in_flight.inc(method=method)
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode("latin-1")))
+                headers.append((
+                    b"server-timing",
+                    format_server_timing(phases, time.perf_counter() - started).encode("latin-1"),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            duration = time.perf_counter() - started
+            requests_in_flight.dec(method=method)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            request_duration.observe(duration, method=method, route=route, status=status_code)
+
+            if duration * 1000 >= self.slow_threshold_ms:
+                logger.warning(json.dumps({
+                    "event": "slow_request",
+                    "request_id": request_id,
+                    "method": method,
+                    "route": route,
+                    "path": scope.get("path"),
+                    "status": status_code,
+                    "duration_ms": round(duration * 1000, 1),
+                    "phases_ms": {name: round(value * 1000, 1) for name, value in phases.items()},
+                }, ensure_ascii=False))
+
+            current_request_id.reset(id_token)
+            request_phases.reset(phases_token)
@@ -0,0 +1,106 @@
+"""
+기존 ECG 문서의 분석 배열을 압축 바이너리로 변환하는 마이그레이션
+
+사용법 (backend 디렉토리에서):
+    python -m app.migrations.pack_ecg_arrays --dry-run
+    python -m app.migrations.pack_ecg_arrays --collection ecg_records --batch-size 200
+
+이미 변환된 필드는 건너뛰므로 여러 번 실행해도 안전합니다.
+변환 전후의 평균 문서 크기를 출력합니다.
+"""
+
+import argparse
+import logging
+from typing import Dict, Iterable
+
+import bson
+from pymongo import UpdateOne
+
+from ..db import mongo
+from ..models.packed import ECG_ANALYSIS_PACKED_FIELDS, ECG_RECORD_PACKED_FIELDS, encode_document
+
+# 로거 설정
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+COLLECTION_FIELDS = {
+    "ecg_records": ECG_RECORD_PACKED_FIELDS,
+    "ecg_analysis": ECG_ANALYSIS_PACKED_FIELDS,
+}
+
+
+def _changed_fields(original: Dict, encoded: Dict, fields: Iterable[str]) -> Dict:
+    """변경된 최상위 필드만 $set 대상으로 선택"""
+    top_level = {path.split(".")[0] for path in fields}
+    return {key: encoded[key] for key in top_level if key in encoded and encoded[key] != original.get(key)}
+
+
+def migrate_collection(db, name: str, batch_size: int = 200, dry_run: bool = False) -> Dict[str, float]:
+    """
+    컬렉션의 대상 배열 필드를 패킹
+
+    Returns:
+        처리 문서 수, 변환 문서 수, 변환 전후 평균 크기(바이트)
+    """
+    fields = COLLECTION_FIELDS[name]
+    collection = db[name]
+    top_level = sorted({path.split(".")[0] for path in fields})
+    query = {"$or": [{field: {"$type": ["array", "object"]}} for field in top_level]}
+
+    stats = {"documents": 0, "converted": 0, "bytes_before": 0, "bytes_after": 0}
+    updates = []
+
+    for doc in collection.find(query, batch_size=batch_size):
+        encoded = encode_document(doc, fields)
+        before = len(bson.encode(doc))
+        after = len(bson.encode(encoded))
+        stats["documents"] += 1
+        stats["bytes_before"] += before
+        stats["bytes_after"] += after
+
+        changes = _changed_fields(doc, encoded, fields)
+        if not changes:
+            continue
+        stats["converted"] += 1
+        updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+
+        if len(updates) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(updates, ordered=False)
+            updates = []
+
+    if updates and not dry_run:
+        collection.bulk_write(updates, ordered=False)
+
+    count = stats["documents"] or 1
+    stats["avg_bytes_before"] = round(stats["bytes_before"] / count, 1)
+    stats["avg_bytes_after"] = round(stats["bytes_after"] / count, 1)
+    stats["reduction_percent"] = (
+        round(100 * (1 - stats["bytes_after"] / stats["bytes_before"]), 1) if stats["bytes_before"] else 0.0
+    )
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ECG 분석 배열 압축 마이그레이션")
+    parser.add_argument("--collection", choices=[*COLLECTION_FIELDS, "all"], default="all")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="변경 없이 크기 감소량만 측정")
+    args = parser.parse_args()
+
+    names = list(COLLECTION_FIELDS) if args.collection == "all" else [args.collection]
+    try:
+        for name in names:
+            stats = migrate_collection(mongo.sync_db, name, args.batch_size, args.dry_run)
+            logger.info(
+                f"{name}{' (dry-run)' if args.dry_run else ''}: "
+                f"문서 {stats['documents']}개 중 {stats['converted']}개 변환, "
+                f"평균 크기 {stats['avg_bytes_before']:.0f}B → {stats['avg_bytes_after']:.0f}B "
+                f"({stats['reduction_percent']}% 감소)"
+            )
+    finally:
+        mongo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ from scipy import signal
 from scipy.stats import zscore
 import neurokit2 as nk
 
+from ..models.packed import PackedIntList
+
 # 로거 설정
 logger = logging.getLogger(__name__)
 
@@ -50,7 +52,7 @@ class ECGResult(BaseModel):
     avg_rr_interval: float
     signal_quality: float
     num_beats: int
-    irregular_beats: List[int] = Field(default_factory=list)
+    irregular_beats: PackedIntList = Field(default_factory=list)
     intervals: ECGInterval
     hrv_metrics: HRVMetrics
     anomaly_score: float = 0.0
@@ -0,0 +1,200 @@
+"""
+ECG 분석 결과 캐시 모듈
+
+동일한 ECG 레코딩이 재전송되었을 때 전체 분석 파이프라인을 다시 실행하지 않도록
+디코딩된 샘플, 샘플링 레이트, 분석기 버전의 해시를 키로 결과를 캐싱합니다.
+
+캐시는 두 계층으로 구성됩니다.
+1. 프로세스 내 LRU 캐시 (가장 빠름, 워커별)
+2. MongoDB TTL 컬렉션 (워커 간 공유, 재시작 후에도 유지)
+"""
+
+import os
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 분석 파이프라인이 결과에 영향을 주도록 변경되면 반드시 올려야 하는 버전
+ANALYZER_VERSION = "1.0.0"
+
+# 캐시 설정
+ECG_CACHE_MAX_ENTRIES = int(os.getenv("ECG_CACHE_MAX_ENTRIES", "1024"))
+ECG_CACHE_TTL_SECONDS = int(os.getenv("ECG_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+ECG_CACHE_COLLECTION = os.getenv("ECG_CACHE_COLLECTION", "ecg_result_cache")
+ECG_MODEL_PATH = os.getenv("ECG_MODEL_PATH", "models/ecg_net.onnx")
+
+
+def model_fingerprint(model_path: Optional[str] = ECG_MODEL_PATH) -> str:
+    """
+    모델 파일의 크기와 수정 시각으로 모델 버전 지문 생성
+
+    모델 파일이 교체되면 지문이 바뀌어 기존 캐시 항목이 더 이상 조회되지 않습니다.
+    """
+    if not model_path or not os.path.exists(model_path):
+        return "no-model"
+    stat = os.stat(model_path)
+    return f"{stat.st_size:x}-{int(stat.st_mtime):x}"
+
+
+def current_analyzer_version() -> str:
+    """분석기 버전과 모델 지문을 합친 캐시 버전 문자열"""
+    return f"{os.getenv('ECG_ANALYZER_VERSION', ANALYZER_VERSION)}+{model_fingerprint()}"
+
+
+def ecg_cache_key(ecg_signal: np.ndarray, sampling_rate: int, version: str, pipeline: str = "default") -> str:
+    """
+    ECG 신호의 내용 기반 캐시 키 생성
+
+    Args:
+        ecg_signal: 디코딩된 ECG 샘플
+        sampling_rate: 샘플링 레이트 (Hz)
+        version: 분석기 버전 문자열
+        pipeline: 결과 형식이 다른 분석 경로를 구분하기 위한 이름
+
+    Returns:
+        SHA-256 16진수 문자열
+    """
+    samples = np.ascontiguousarray(ecg_signal, dtype=np.float64)
+    digest = hashlib.sha256()
+    digest.update(f"{pipeline}|{version}|{int(sampling_rate)}|{samples.shape[0]}|".encode())
+    digest.update(samples.tobytes())
+    return digest.hexdigest()
+
+
+class ECGResultCache:
+    """프로세스 내 LRU와 MongoDB TTL 컬렉션으로 구성된 2계층 ECG 분석 결과 캐시"""
+
+    def __init__(
+        self,
+        db: Optional[AsyncIOMotorDatabase] = None,
+        max_entries: int = ECG_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = ECG_CACHE_TTL_SECONDS,
+        collection_name: str = ECG_CACHE_COLLECTION,
+    ):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.collection_name = collection_name
+        self.version = current_analyzer_version()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._indexes_ready = False
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name] if self.db is not None else None
+
+    async def _ensure_indexes(self) -> None:
+        """TTL 인덱스 생성 및 이전 버전 항목 정리 (최초 1회)"""
+        if self._indexes_ready or self.collection is None:
+            return
+        self._indexes_ready = True
+        try:
+            await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+            result = await self.collection.delete_many({"version": {"$ne": self.version}})
+            if result.deleted_count:
+                logger.info(f"이전 분석기 버전의 ECG 캐시 항목 {result.deleted_count}건 삭제")
+        except Exception as e:
+            logger.warning(f"ECG 캐시 인덱스 준비 오류: {str(e)}")
+
+    async def warm(self) -> None:
+        """인덱스 준비와 이전 버전 정리를 미리 수행 (앱 시작 시 호출)"""
+        self._check_version()
+        await self._ensure_indexes()
+
+    def _check_version(self) -> None:
+        """분석기 또는 모델 버전이 바뀌었으면 메모리 계층을 비우고 정리를 다시 예약"""
+        version = current_analyzer_version()
+        if version != self.version:
+            logger.info(f"ECG 분석기 버전 변경 감지: {self.version} -> {version}")
+            self.version = version
+            self._memory.clear()
+            self._indexes_ready = False
+
+    def key_for(self, ecg_signal: np.ndarray, sampling_rate: int, pipeline: str = "default") -> str:
+        self._check_version()
+        return ecg_cache_key(ecg_signal, sampling_rate, self.version, pipeline)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """캐시된 분석 결과 조회 (메모리 → MongoDB 순)"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return dict(self._memory[key])
+
+        if self.collection is not None:
+            await self._ensure_indexes()
+            try:
+                doc = await self.collection.find_one({"_id": key, "version": self.version})
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"ECG 캐시 조회 오류: {str(e)}")
+                doc = None
+            if doc is not None:
+                self.stats["mongo_hits"] += 1
+                self._remember(key, doc["result"])
+                return dict(doc["result"])
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, result: Dict[str, Any]) -> None:
+        """분석 결과를 두 계층 모두에 저장"""
+        self._remember(key, result)
+        self.stats["stores"] += 1
+
+        if self.collection is None:
+            return
+        await self._ensure_indexes()
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {"_id": key, "version": self.version, "result": result, "created_at": datetime.utcnow()},
+                upsert=True,
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"ECG 캐시 저장 오류: {str(e)}")
+
+    def _remember(self, key: str, result: Dict[str, Any]) -> None:
+        self._memory[key] = dict(result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def clear(self) -> None:
+        """모든 캐시 항목 삭제"""
+        self._memory.clear()
+        if self.collection is not None:
+            await self.collection.delete_many({})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """캐시 적중/미스 통계 반환"""
+        hits = self.stats["memory_hits"] + self.stats["mongo_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "version": self.version,
+        }
+
+
+# 글로벌 캐시 인스턴스 (get_ecg_result_cache에서 생성)
+ecg_result_cache: Optional[ECGResultCache] = None
+
+
+def get_ecg_result_cache() -> ECGResultCache:
+    global ecg_result_cache
+    if ecg_result_cache is None:
+        from ..db import mongo
+        ecg_result_cache = ECGResultCache(mongo.async_db)
+    return ecg_result_cache
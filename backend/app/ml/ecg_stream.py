@@ -0,0 +1,182 @@
+"""
+실시간 ECG 스트리밍 분석 모듈
+
+WebSocket 등으로 조금씩 도착하는 ECG 샘플 프레임을 연결별 상태로 누적하며
+Pan-Tompkins 방식으로 R 피크를 점진적으로 검출합니다.
+프레임마다 전체 신호를 다시 분석하지 않고, 필터 상태와 짧은 꼬리 버퍼만 유지합니다.
+"""
+
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import signal
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 리듬/경보 판정 기준 (routers/ecg.py의 위험 요소 이름과 동일하게 유지)
+TACHYCARDIA_BPM = 100
+BRADYCARDIA_BPM = 50
+IRREGULAR_RR_CV = 0.15
+PAUSE_SECONDS = 1.8
+
+
+class StreamingECGAnalyzer:
+    """
+    연결별 스트리밍 ECG 분석기
+
+    push()로 새 샘플을 전달하면 심박수, 리듬, 경보 상태를 갱신하고
+    이전에 보고한 상태와 달라졌을 때만 업데이트를 반환합니다.
+    """
+
+    def __init__(self, sampling_rate: int = 250, rr_window: int = 8, learning_seconds: float = 2.0):
+        """
+        Args:
+            sampling_rate: ECG 신호의 샘플링 레이트 (Hz)
+            rr_window: 심박수 계산에 사용할 최근 RR 간격 개수
+            learning_seconds: 초기 임계값 학습 구간 (초)
+        """
+        self.sampling_rate = sampling_rate
+
+        # 5-15Hz 대역 통과 필터 (QRS 에너지 대역), 프레임 간 필터 상태 유지
+        self._sos = signal.butter(2, [5, 15], btype="bandpass", fs=sampling_rate, output="sos")
+        self._zi = np.zeros((self._sos.shape[0], 2))
+        self._prev_filtered = 0.0
+
+        # 이동 평균 적분 (150ms)
+        self._integration_len = max(1, int(0.15 * sampling_rate))
+        self._tail = np.zeros(self._integration_len - 1)
+        self._kernel = np.ones(self._integration_len) / self._integration_len
+
+        # 피크 확정 전까지 보관하는 적분 신호 버퍼
+        self._refractory = int(0.25 * sampling_rate)
+        self._energy = np.empty(0)
+        self._energy_start = 0
+        self._last_checked = -1
+
+        # 적응형 임계값 (신호/잡음 피크 레벨)
+        self._learning_samples = int(learning_seconds * sampling_rate)
+        self._learning_max = 0.0
+        self._signal_level = 0.0
+        self._noise_level = 0.0
+
+        self._sample_count = 0
+        self._last_peak: Optional[int] = None
+        self._rr_intervals: deque = deque(maxlen=rr_window)
+        self.beats = 0
+        self._last_reported: Optional[Dict[str, Any]] = None
+
+    @property
+    def threshold(self) -> float:
+        return self._noise_level + 0.25 * (self._signal_level - self._noise_level)
+
+    def push(self, samples: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        새 샘플 프레임 처리
+
+        Args:
+            samples: 새로 도착한 ECG 샘플 (1차원)
+
+        Returns:
+            심박수, 리듬 또는 경보가 바뀐 경우 업데이트 딕셔너리, 아니면 None
+        """
+        samples = np.nan_to_num(np.asarray(samples, dtype=np.float64).ravel())
+        if samples.size == 0:
+            return None
+
+        filtered, self._zi = signal.sosfilt(self._sos, samples, zi=self._zi)
+        derivative = np.diff(filtered, prepend=self._prev_filtered)
+        self._prev_filtered = filtered[-1]
+
+        squared = np.concatenate([self._tail, derivative * derivative])
+        integrated = np.convolve(squared, self._kernel, mode="valid")
+        self._tail = squared[len(squared) - (self._integration_len - 1):]
+
+        self._energy = np.concatenate([self._energy, integrated])
+        self._sample_count += samples.size
+
+        if self._sample_count <= self._learning_samples:
+            self._learning_max = max(self._learning_max, float(integrated.max()))
+        else:
+            if self._signal_level == 0.0:
+                self._signal_level = 0.5 * self._learning_max
+                self._noise_level = 0.125 * self._learning_max
+            self._detect_peaks()
+
+        self._trim_energy()
+        return self._build_update()
+
+    def _detect_peaks(self) -> None:
+        """불응기만큼 지난 구간에서 R 피크 확정"""
+        confirm_until = len(self._energy) - self._refractory
+        if confirm_until <= 0:
+            return
+
+        peaks, _ = signal.find_peaks(self._energy, distance=self._refractory)
+        for p in peaks:
+            if p >= confirm_until:
+                break
+            index = self._energy_start + int(p)
+            if index <= self._last_checked:
+                continue
+            self._last_checked = index
+
+            value = float(self._energy[p])
+            if value > self.threshold and (self._last_peak is None or index - self._last_peak >= self._refractory):
+                self._signal_level = 0.125 * value + 0.875 * self._signal_level
+                if self._last_peak is not None:
+                    self._rr_intervals.append((index - self._last_peak) / self.sampling_rate)
+                self._last_peak = index
+                self.beats += 1
+            else:
+                self._noise_level = 0.125 * value + 0.875 * self._noise_level
+
+    def _trim_energy(self) -> None:
+        """확정이 끝난 적분 신호 앞부분 제거 (메모리 사용량 고정)"""
+        keep = 2 * self._refractory
+        if len(self._energy) > keep:
+            drop = len(self._energy) - keep
+            self._energy = self._energy[drop:]
+            self._energy_start += drop
+
+    def current_state(self) -> Dict[str, Any]:
+        """현재 심박수, 리듬, 경보 상태"""
+        heart_rate = None
+        rhythm = "분석 중"
+        alerts: List[str] = []
+
+        if len(self._rr_intervals) >= 2:
+            rr = np.array(self._rr_intervals)
+            heart_rate = int(round(60 / np.mean(rr)))
+            rr_cv = np.std(rr) / np.mean(rr)
+
+            if rr_cv > IRREGULAR_RR_CV:
+                rhythm = "불규칙"
+                alerts.append("불규칙한 심박")
+            else:
+                rhythm = "규칙"
+            if heart_rate > TACHYCARDIA_BPM:
+                alerts.append("빈맥")
+            elif heart_rate < BRADYCARDIA_BPM:
+                alerts.append("서맥")
+
+        if self._last_peak is not None:
+            since_last_peak = (self._sample_count - self._last_peak) / self.sampling_rate
+            if since_last_peak > PAUSE_SECONDS:
+                alerts.append("심장 일시 정지 의심")
+
+        return {"heart_rate": heart_rate, "rhythm": rhythm, "alerts": alerts}
+
+    def _build_update(self) -> Optional[Dict[str, Any]]:
+        state = self.current_state()
+        if state == self._last_reported:
+            return None
+        self._last_reported = state
+        return {
+            "type": "update",
+            **state,
+            "beats": self.beats,
+            "elapsed": round(self._sample_count / self.sampling_rate, 3),
+        }
@@ -0,0 +1,163 @@
+"""
+ECG 파형 다중 해상도 피라미드 모듈
+
+긴 레코딩(예: 24시간 홀터)을 클라이언트가 전체 다운로드 없이 그릴 수 있도록
+분석 시점에 1:10, 1:100, 1:1000 최소/최대 엔벨로프를 미리 계산해 저장합니다.
+각 레벨은 메모리 맵 가능한 .npy 파일로 저장되어, 요청 구간만 디스크에서 읽습니다.
+"""
+
+import os
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 피라미드 레벨 (원본 대비 다운샘플링 비율)
+PYRAMID_FACTORS = (10, 100, 1000)
+RAW_FILENAME = "raw.npy"
+
+# 응답 크기를 줄이기 위한 값 반올림 자릿수
+RESPONSE_DECIMALS = 4
+
+
+def _level_filename(factor: int) -> str:
+    return f"L{factor}.npy"
+
+
+def minmax_reduce(mins: np.ndarray, maxs: np.ndarray, factor: int):
+    """
+    연속된 factor개 구간을 하나로 합쳐 최소/최대 엔벨로프 생성
+
+    마지막 불완전 구간도 별도 버킷으로 포함합니다.
+    """
+    n = len(mins)
+    full = (n // factor) * factor
+    out_min = mins[:full].reshape(-1, factor).min(axis=1)
+    out_max = maxs[:full].reshape(-1, factor).max(axis=1)
+    if full < n:
+        out_min = np.append(out_min, mins[full:].min())
+        out_max = np.append(out_max, maxs[full:].max())
+    return out_min, out_max
+
+
+def build_pyramid(ecg_signal: np.ndarray, factors: Sequence[int] = PYRAMID_FACTORS) -> Dict[int, np.ndarray]:
+    """
+    최소/최대 엔벨로프 피라미드 생성
+
+    각 레벨은 바로 아래 레벨에서 계산하므로 전체 비용은 원본 길이에 비례합니다.
+
+    Args:
+        ecg_signal: 원본 ECG 신호 (1차원)
+        factors: 오름차순 다운샘플링 비율 (각 비율은 이전 비율의 배수)
+
+    Returns:
+        {비율: (버킷 수, 2) float32 배열 [최소, 최대]}
+    """
+    values = np.asarray(ecg_signal, dtype=np.float32).ravel()
+    mins, maxs, current = values, values, 1
+    pyramid = {}
+
+    for factor in factors:
+        if factor % current:
+            raise ValueError(f"피라미드 비율은 이전 비율의 배수여야 합니다: {current} -> {factor}")
+        mins, maxs = minmax_reduce(mins, maxs, factor // current)
+        pyramid[factor] = np.stack([mins, maxs], axis=1).astype(np.float32)
+        current = factor
+
+    return pyramid
+
+
+def save_waveform(directory: str, ecg_signal: np.ndarray, factors: Sequence[int] = PYRAMID_FACTORS) -> Dict[str, Any]:
+    """
+    원본 신호와 피라미드 레벨을 디렉터리에 저장
+
+    Returns:
+        레코드 문서에 저장할 파형 메타데이터
+    """
+    os.makedirs(directory, exist_ok=True)
+    values = np.asarray(ecg_signal, dtype=np.float32).ravel()
+    np.save(os.path.join(directory, RAW_FILENAME), values)
+
+    pyramid = build_pyramid(values, factors)
+    for factor, level in pyramid.items():
+        np.save(os.path.join(directory, _level_filename(factor)), level)
+
+    return {
+        "path": directory,
+        "num_samples": int(values.size),
+        "levels": [1, *factors],
+    }
+
+
+def select_level(num_samples: int, pixel_width: int, levels: Sequence[int]) -> int:
+    """
+    요청 구간과 화면 너비에 맞는 가장 거친 레벨 선택
+
+    선택된 레벨의 버킷 수는 픽셀 수 이상이어서 화면 해상도보다 거칠어지지 않습니다.
+    """
+    chosen = 1
+    for factor in sorted(levels):
+        if num_samples / factor >= pixel_width:
+            chosen = factor
+    return chosen
+
+
+def read_waveform_range(
+    directory: str,
+    start_sample: int,
+    end_sample: int,
+    pixel_width: int,
+    levels: Sequence[int] = (1, *PYRAMID_FACTORS),
+) -> Dict[str, Any]:
+    """
+    저장된 파형에서 요청 구간을 화면 너비에 맞게 읽기
+
+    Args:
+        directory: save_waveform으로 저장한 디렉터리
+        start_sample: 구간 시작 샘플 인덱스
+        end_sample: 구간 끝 샘플 인덱스 (미포함)
+        pixel_width: 클라이언트 플롯 너비 (픽셀)
+        levels: 저장된 레벨 목록
+
+    Returns:
+        선택된 레벨, 포인트당 샘플 수와 최소/최대 (또는 원본 값) 배열
+    """
+    factor = select_level(end_sample - start_sample, pixel_width, levels)
+
+    if factor == 1:
+        raw = np.load(os.path.join(directory, RAW_FILENAME), mmap_mode="r")
+        values = np.asarray(raw[start_sample:end_sample])
+        if len(values) <= 2 * pixel_width:
+            return {"level": 1, "samples_per_point": 1, "values": np.round(values, RESPONSE_DECIMALS).tolist()}
+        mins, maxs = values, values
+    else:
+        level = np.load(os.path.join(directory, _level_filename(factor)), mmap_mode="r")
+        window = np.asarray(level[start_sample // factor:-(-end_sample // factor)])
+        mins, maxs = window[:, 0], window[:, 1]
+
+    # 선택된 레벨이 화면보다 촘촘하면 픽셀 단위로 한 번 더 축소
+    group = max(1, -(-len(mins) // pixel_width))
+    if group > 1:
+        mins, maxs = minmax_reduce(mins, maxs, group)
+
+    return {
+        "level": factor,
+        "samples_per_point": factor * group,
+        "min": np.round(mins, RESPONSE_DECIMALS).tolist(),
+        "max": np.round(maxs, RESPONSE_DECIMALS).tolist(),
+    }
+
+
+def as_signal(data: Any) -> Optional[np.ndarray]:
+    """업로드된 데이터(배열, 리스트, JSON 객체)를 1차원 신호로 변환"""
+    if isinstance(data, dict):
+        data = data.get("ecg_data", data.get("data"))
+    if data is None:
+        return None
+    values = np.asarray(data, dtype=np.float64)
+    if values.ndim > 1:
+        values = values[:, 0]
+    return values
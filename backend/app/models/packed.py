@@ -0,0 +1,244 @@
+"""
+분석 배열의 압축 BSON 인코딩
+
+긴 레코딩의 RR 간격, 불규칙 박동 인덱스, 이상 징후 목록이 BSON double/int 배열로 저장되면
+문서가 16MB 한도에 가까워지고 이력 조회가 무거워집니다.
+숫자 배열을 BSON Binary(사용자 정의 subtype 0x80)로 묶어 저장하고, 읽을 때 원래 리스트로 되돌립니다.
+
+- 정수 배열: 델타 인코딩 int32 (정렬된 인덱스는 작은 값이 반복되어 압축이 잘 됨)
+- 실수 배열: 모든 값이 float32로 정확히 복원되면 float32, 아니면 float64 (압축 시 바이트 셔플)
+- 압축은 결과가 더 작아질 때만 zlib 사용
+- 딕셔너리 리스트(이상 징후 등)는 필드별 열로 나누어 숫자 열은 패킹, 문자열 열은 사전 인코딩
+"""
+
+import os
+import zlib
+import struct
+from typing import Annotated, Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from bson.binary import Binary
+from pydantic import BeforeValidator
+
+# 패킹 설정
+PACKED_SUBTYPE = 0x80
+PACK_MIN_LENGTH = int(os.getenv("PACK_MIN_LENGTH", "16"))  # 이보다 짧은 배열은 그대로 저장
+PACK_COMPRESS_MIN_BYTES = int(os.getenv("PACK_COMPRESS_MIN_BYTES", "128"))
+
+_MAGIC = b"PK"
+_HEADER = struct.Struct("<2sBBI")  # 매직, 종류, 플래그, 원소 수
+_KIND_DELTA_INT32 = ord("i")
+_KIND_FLOAT32 = ord("f")
+_KIND_FLOAT64 = ord("d")
+_FLAG_ZLIB = 0x01
+_FLAG_SHUFFLE = 0x02
+_INT32_MAX = 2 ** 31 - 1
+
+# 딕셔너리 리스트를 열 단위로 저장할 때의 표식
+RECORDS_MARKER = "__packed_records__"
+
+# 컬렉션별 패킹 대상 필드 (점으로 구분한 경로)
+ECG_RECORD_PACKED_FIELDS = (
+    "anomalies",
+    "analysis_results.rr_intervals",
+    "analysis_results.irregular_beats",
+    "analysis_results.r_peaks",
+)
+ECG_ANALYSIS_PACKED_FIELDS = (
+    "rr_intervals",
+    "irregular_beats",
+    "analysis_result.rr_intervals",
+    "analysis_result.irregular_beats",
+)
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_))
+
+
+def _is_number(value: Any) -> bool:
+    return _is_int(value) or (isinstance(value, (float, np.floating)))
+
+
+def _float32_list(array: np.ndarray) -> List[float]:
+    """float32 값의 최단 표현 (0.812 → 0.8119999766... 같은 잡음 없이)"""
+    return [float(str(v)) for v in array]
+
+
+def _finish(kind: int, count: int, payload: bytes, itemsize: int, shuffle: bool) -> Binary:
+    flags = 0
+    if len(payload) >= PACK_COMPRESS_MIN_BYTES:
+        data = payload
+        if shuffle:
+            data = np.frombuffer(payload, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(payload):
+            payload = compressed
+            flags = _FLAG_ZLIB | (_FLAG_SHUFFLE if shuffle else 0)
+    return Binary(_HEADER.pack(_MAGIC, kind, flags, count) + payload, PACKED_SUBTYPE)
+
+
+def pack_array(values: Iterable[Any]) -> Optional[Binary]:
+    """
+    숫자 배열을 압축 Binary로 변환
+
+    Returns:
+        패킹된 Binary, 숫자가 아닌 값이 섞여 있거나 int32 델타 범위를 벗어나면 None
+    """
+    if isinstance(values, np.ndarray):
+        array = values.ravel()
+        if array.dtype.kind in "iu":
+            items = array.astype(np.int64)
+            is_int = True
+        elif array.dtype.kind == "f":
+            items = array
+            is_int = False
+        else:
+            return None
+    else:
+        values = list(values)
+        if not all(_is_number(v) for v in values):
+            return None
+        is_int = all(_is_int(v) for v in values)
+        items = np.asarray(values, dtype=np.int64 if is_int else np.float64)
+
+    if is_int:
+        deltas = np.diff(items, prepend=0) if items.size else items
+        if deltas.size and np.abs(deltas).max() > _INT32_MAX:
+            return None
+        return _finish(_KIND_DELTA_INT32, items.size, deltas.astype("<i4").tobytes(), 4, shuffle=False)
+
+    # float32로 줄여도 값이 그대로 복원될 때만 float32 사용 (측정값이 손실되지 않도록)
+    as_float32 = items.astype("<f4")
+    if _float32_list(as_float32) == items.tolist():
+        return _finish(_KIND_FLOAT32, items.size, as_float32.tobytes(), 4, shuffle=True)
+    return _finish(_KIND_FLOAT64, items.size, items.astype("<f8").tobytes(), 8, shuffle=True)
+
+
+def is_packed(value: Any) -> bool:
+    return isinstance(value, Binary) and value.subtype == PACKED_SUBTYPE and value[:2] == _MAGIC
+
+
+def unpack_array(value: Binary) -> np.ndarray:
+    """pack_array()로 만든 Binary를 NumPy 배열로 복원"""
+    _, kind, flags, count = _HEADER.unpack_from(value)
+    dtype = {_KIND_DELTA_INT32: "<i4", _KIND_FLOAT32: "<f4", _KIND_FLOAT64: "<f8"}.get(kind)
+    if dtype is None:
+        raise ValueError(f"알 수 없는 패킹 형식: {kind}")
+
+    payload = bytes(value[_HEADER.size:])
+    if flags & _FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+        if flags & _FLAG_SHUFFLE:
+            itemsize = np.dtype(dtype).itemsize
+            payload = np.frombuffer(payload, dtype=np.uint8).reshape(itemsize, count).T.tobytes()
+
+    array = np.frombuffer(payload, dtype=dtype, count=count)
+    if kind == _KIND_DELTA_INT32:
+        return np.cumsum(array, dtype=np.int64)
+    return array
+
+
+def unpack_list(value: Binary) -> List[Any]:
+    """Binary를 JSON 응답에 쓸 수 있는 파이썬 리스트로 복원"""
+    array = unpack_array(value)
+    if array.dtype == np.float32:
+        return _float32_list(array)
+    return array.tolist()
+
+
+def _pack_column(values: List[Any]) -> Any:
+    packed = pack_array(values)
+    if packed is not None:
+        return packed
+    if all(isinstance(v, str) for v in values):
+        categories = list(dict.fromkeys(values))
+        index = {v: i for i, v in enumerate(categories)}
+        return {"categories": categories, "codes": pack_array([index[v] for v in values])}
+    return values
+
+
+def _unpack_column(column: Any) -> List[Any]:
+    if is_packed(column):
+        return unpack_list(column)
+    if isinstance(column, dict) and "categories" in column:
+        categories = column["categories"]
+        return [categories[i] for i in unpack_array(column["codes"])]
+    return column
+
+
+def pack_value(value: Any) -> Any:
+    """
+    필드 값 패킹
+
+    - 숫자 리스트 → Binary
+    - 같은 키를 가진 딕셔너리 리스트 → 열 단위 패킹
+    - 그 외 또는 짧은 리스트 → 그대로
+    """
+    if is_packed(value):
+        return value
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if not isinstance(value, list) or len(value) < PACK_MIN_LENGTH:
+        return value
+
+    if all(isinstance(item, dict) for item in value):
+        keys = list(value[0].keys())
+        if not keys or any(list(item.keys()) != keys for item in value):
+            return value
+        return {
+            RECORDS_MARKER: 1,
+            "n": len(value),
+            "columns": {key: _pack_column([item[key] for item in value]) for key in keys},
+        }
+
+    packed = pack_array(value)
+    return value if packed is None else packed
+
+
+def unpack_value(value: Any) -> Any:
+    if is_packed(value):
+        return unpack_list(value)
+    if isinstance(value, dict) and value.get(RECORDS_MARKER):
+        columns = {key: _unpack_column(column) for key, column in value["columns"].items()}
+        return [
+            {key: columns[key][i] for key in columns}
+            for i in range(value["n"])
+        ]
+    return value
+
+
+def encode_document(doc: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """지정한 경로의 배열을 패킹한 문서 반환 (원본은 변경하지 않음)"""
+    doc = dict(doc)
+    for path in fields:
+        parts = path.split(".")
+        target = doc
+        for part in parts[:-1]:
+            child = target.get(part)
+            if not isinstance(child, dict):
+                target = None
+                break
+            # 중첩 딕셔너리도 복사하여 원본 보존
+            target[part] = child = dict(child)
+            target = child
+        if target is not None and parts[-1] in target:
+            target[parts[-1]] = pack_value(target[parts[-1]])
+    return doc
+
+
+def decode_document(doc: Any) -> Any:
+    """문서 안의 모든 패킹 값을 원래 리스트로 복원 (패킹되지 않은 이전 문서도 그대로 동작)"""
+    if isinstance(doc, dict):
+        value = unpack_value(doc)
+        if value is not doc:
+            return value
+        return {key: decode_document(item) for key, item in doc.items()}
+    if isinstance(doc, list):
+        return [decode_document(item) for item in doc]
+    return unpack_value(doc)
+
+
+# Mongo 문서에서 바로 모델을 만들 때 패킹된 값을 리스트로 받는 필드 타입
+PackedIntList = Annotated[List[int], BeforeValidator(unpack_value)]
+PackedFloatList = Annotated[List[float], BeforeValidator(unpack_value)]
@@ -0,0 +1,307 @@
+"""
+요청 단위 샘플링 프로파일러 모듈
+
+관리자 헤더(X-Profile: <PROFILER_TOKEN>)가 있거나 PROFILER_SAMPLE_RATE 비율로 선택된 요청을
+처리하는 동안 별도 스레드가 프로세스의 모든 스레드 스택을 주기적으로 샘플링하고,
+그중 이 요청의 작업인 샘플만 모읍니다.
+
+- 이벤트 루프 스레드: 스택에 이 요청의 ProfilerMiddleware 프레임이 있을 때
+  (요청 태스크가 만든 별도 태스크의 작업은 포함되지 않음)
+- 스레드 풀(run_in_threadpool, asyncio.to_thread): 작업에 복사된 컨텍스트의 프로파일 ID가 이 요청일 때
+  (스레드 풀 스택은 "thread:<스레드 이름>" 아래에 표시)
+- 프로세스 풀(ECG 일괄 분석 등)의 작업은 다른 프로세스라 포함되지 않음
+
+결과는 flamegraph.pl / speedscope에서 바로 열 수 있는 folded stack 형식으로
+서버가 만든 프로파일 ID별 파일(<PROFILE_DIR>/<profile_id>.folded)에 저장되며,
+ID는 응답의 X-Profile-Id 헤더로 전달됩니다.
+
+표준 라이브러리만 사용합니다.
+"""
+
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+import functools
+import contextvars
+from collections import Counter
+from typing import Dict, Optional
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 프로파일러 설정
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")  # 비어 있으면 헤더로 요청하는 프로파일링 비활성화
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))  # 0.0 ~ 1.0
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_CONCURRENT = int(os.getenv("PROFILER_MAX_CONCURRENT", "2"))
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+REQUEST_ID_HEADER = b"x-request-id"
+PROFILE_SUFFIX = ".folded"
+
+_PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+_UNSAFE_ID_CHARS = re.compile(r"[^A-Za-z0-9_-]")
+
+# 현재 프로파일링 중인 요청의 프로파일 ID (스레드 풀 작업에도 컨텍스트와 함께 복사됨)
+current_profile_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_profile_id", default=None
+)
+
+
+def profile_path(profile_id: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    """프로파일 ID에 해당하는 파일 경로 (형식이 잘못된 ID는 None)"""
+    if not _PROFILE_ID_PATTERN.match(profile_id) or profile_id.startswith("."):
+        return None
+    return os.path.join(directory, profile_id + PROFILE_SUFFIX)
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """관리자 프로파일 토큰 확인"""
+    return bool(PROFILER_TOKEN) and bool(token) and hmac.compare_digest(token, PROFILER_TOKEN)
+
+
+def profiling_enabled() -> bool:
+    """헤더 토큰 또는 샘플링 비율 중 하나라도 설정되어 있는지"""
+    return bool(PROFILER_TOKEN) or PROFILER_SAMPLE_RATE > 0
+
+
+def new_profile_id(request_id: Optional[str] = None) -> str:
+    """
+    서버에서 만드는 프로파일 ID
+
+    요청 ID(클라이언트가 보낼 수 있음)는 추적용 접두사로만 쓰고 임의 접미사를 붙여,
+    클라이언트가 다른 요청의 프로파일 파일을 덮어쓸 수 없게 합니다.
+    """
+    suffix = uuid.uuid4().hex[:16]
+    prefix = _UNSAFE_ID_CHARS.sub("", request_id or "")[:64]
+    return f"{prefix}-{suffix}" if prefix else suffix
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _context_of(frame) -> Optional[contextvars.Context]:
+    """
+    스레드 풀 작업 프레임에서 작업과 함께 전달된 컨텍스트 찾기
+
+    - anyio(run_in_threadpool) 워커: run() 프레임의 context 지역 변수
+    - concurrent.futures 워커(asyncio.to_thread): _WorkItem.fn = partial(Context.run, ...)
+    """
+    f_locals = frame.f_locals
+    context = f_locals.get("context")
+    if isinstance(context, contextvars.Context):
+        return context
+    fn = getattr(f_locals.get("self"), "fn", None)
+    if isinstance(fn, functools.partial):
+        owner = getattr(fn.func, "__self__", None)
+        if isinstance(owner, contextvars.Context):
+            return owner
+    return None
+
+
+# 스레드 풀 작업 프레임은 스택 바닥 근처(스레드 부트스트랩 프레임 바로 위)에 있음
+_CONTEXT_SEARCH_DEPTH = 8
+
+
+class StackSampler:
+    """프로세스의 모든 스레드를 주기적으로 샘플링하여 한 요청의 작업만 folded stack으로 집계"""
+
+    def __init__(self, profile_id: str, loop_thread_id: int, interval_ms: float = PROFILER_INTERVAL_MS):
+        self.profile_id = profile_id
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval_ms / 1000
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        """샘플링 중지 (스레드 종료 대기는 join()에서)"""
+        self._stop.set()
+        self.duration = time.perf_counter() - self.started
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            threads = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                name = threads.get(thread_id, str(thread_id))
+                if name.startswith("request-profiler"):
+                    continue
+                try:
+                    self._sample(thread_id, name, frame)
+                except Exception:
+                    # 샘플링 중 스레드 상태가 바뀌는 경우 등은 해당 샘플만 건너뜀
+                    continue
+
+    def _sample(self, thread_id: int, thread_name: str, frame) -> None:
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()  # 바깥쪽 → 안쪽
+
+        if thread_id == self.loop_thread_id:
+            if not self._owns_loop_stack(frames):
+                return
+            root = []
+        else:
+            if not self._owns_thread_stack(frames):
+                return
+            root = [f"thread:{thread_name}".replace(";", ":")]
+        self.samples[";".join(root + [_frame_name(f.f_code) for f in frames])] += 1
+
+    def _owns_loop_stack(self, frames) -> bool:
+        """루프 스레드가 지금 이 요청의 코루틴을 실행 중인지 (요청의 미들웨어 프레임이 스택에 있음)"""
+        for frame in frames:
+            if frame.f_code is ProfilerMiddleware.__call__.__code__:
+                return frame.f_locals.get("profile_id") == self.profile_id
+        return False
+
+    def _owns_thread_stack(self, frames) -> bool:
+        """스레드 풀 작업이 이 요청에서 제출된 것인지"""
+        for frame in frames[:_CONTEXT_SEARCH_DEPTH]:
+            context = _context_of(frame)
+            if context is not None:
+                return context.get(current_profile_id) == self.profile_id
+        return False
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """프로파일 ID별 프로파일 파일 저장소 (오래된 파일부터 정리)"""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILER_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(self, profile_id: str, folded: str) -> Optional[str]:
+        path = profile_path(profile_id, self.directory)
+        if path is None:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(folded)
+        self._prune()
+        return path
+
+    def load(self, profile_id: str) -> Optional[str]:
+        path = profile_path(profile_id, self.directory)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def _prune(self) -> None:
+        entries = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(PROFILE_SUFFIX)
+        ]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[: len(entries) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ProfilerMiddleware:
+    """
+    선택된 요청을 샘플링 프로파일링하는 ASGI 미들웨어
+
+    샘플링 스레드 하나가 모든 스레드를 훑으므로 오버헤드를 제한하기 위해
+    동시에 프로파일링하는 요청 수를 PROFILER_MAX_CONCURRENT로 제한합니다.
+    동시에 실행된 다른 요청의 작업은 해당 요청의 프로파일에 섞이지 않습니다.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: Optional[ProfileStore] = None,
+        sample_rate: float = PROFILER_SAMPLE_RATE,
+        max_concurrent: int = PROFILER_MAX_CONCURRENT,
+    ):
+        self.app = app
+        self.store = store or ProfileStore()
+        self.sample_rate = sample_rate
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def _should_profile(self, headers: Dict[bytes, bytes]) -> bool:
+        token = headers.get(PROFILE_HEADER)
+        if token is not None and is_authorized(token.decode("latin-1")):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        if not self._should_profile(headers) or not self._slots.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        # 파일 이름은 서버에서 만든 ID (요청 ID는 로그 추적용 접두사로만 사용)
+        request_id = (
+            scope.get("state", {}).get("request_id")
+            or headers.get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        )
+        profile_id = new_profile_id(request_id)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode())],
+                }
+            await send(message)
+
+        sampler = StackSampler(profile_id, threading.get_ident())
+        token = current_profile_id.set(profile_id)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            current_profile_id.reset(token)
+            self._slots.release()
+            try:
+                await asyncio.to_thread(self._save, profile_id, sampler)
+                logger.info(
+                    f"요청 프로파일 저장: {profile_id} (요청 {request_id}, {scope.get('method')} {scope.get('path')}, "
+                    f"{sampler.duration * 1000:.0f}ms, 샘플 {sum(sampler.samples.values())}개)"
+                )
+            except Exception as e:
+                logger.warning(f"요청 프로파일 저장 오류 ({profile_id}): {e}")
+
+    def _save(self, profile_id: str, sampler: StackSampler) -> None:
+        sampler.join()
+        self.store.save(profile_id, sampler.folded())
+
+
+# 글로벌 프로파일 저장소
+profile_store = ProfileStore()
@@ -6,56 +6,54 @@ RAG 시스템은 쿼리에 관련된 문서를 검색하고, 이를 컨텍스트
 """
 
 import os
-from typing import List, Dict, Any, Optional, Tuple
-import json
-import numpy as np
-from dotenv import load_dotenv
+import time
+import hashlib
+import asyncio
 import logging
-import httpx
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import pandas as pd
-from pymongo import MongoClient
-from fastapi import HTTPException, status, Depends
-from openai import OpenAI
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
-from pymongo.errors import PyMongoError
-from .core.config import settings
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import RetrievalQA
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import TextLoader, PyPDFLoader, CSVLoader
-from langchain.schema import Document
-from pydantic import BaseModel
-from .deps import get_database
 from datetime import datetime
+from typing import TYPE_CHECKING, List, Dict, Any, AsyncIterator, Optional, Tuple
+
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel
+from pymongo import UpdateOne
+
+from .deps import get_async_db
+from .rag_answer_cache import SemanticAnswerCache
+from .rag_loader import CollectionDocumentLoader
+from .rag_snapshot import SNAPSHOT_EXTENSION, SnapshotError, close_vectorstore, export_snapshot, install_snapshot
+
+# langchain, 임베딩 모델, LLM 클라이언트는 처음 사용할 때 불러옴 (임포트만 하는 프로세스는 비용 없음)
+if TYPE_CHECKING:
+    from langchain.chat_models import ChatOpenAI
+    from langchain.schema import Document
+    from langchain.vectorstores.base import VectorStore
+    from .rag_embeddings import CachedEmbeddings
 
 # 환경 변수 로드
 load_dotenv()
 
 # 로깅 설정
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # API 키 및 설정
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-DB_NAME = os.getenv("DB_NAME", "nottoday")
 COLLECTION_NAME = os.getenv("KNOWLEDGE_COLLECTION", "knowledge_base")
 CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
-
-# OpenAI 클라이언트 설정
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-# 임베딩 모델 로드 (한국어 지원 모델)
-try:
-    embedding_model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-    logger.info("임베딩 모델이 성공적으로 로드되었습니다.")
-except Exception as e:
-    logger.error(f"임베딩 모델 로드 실패: {e}")
-    embedding_model = None
+RAG_COMPLETION_MODEL = os.getenv("RAG_COMPLETION_MODEL", "gpt-4-turbo-preview")
+RAG_RETRIEVER_K = int(os.getenv("RAG_RETRIEVER_K", "4"))
+# 벡터 스토어 백엔드: chroma / mmap (내장 메모리 맵 인덱스)
+RAG_VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma")
+RAG_MMAP_INDEX_DIRECTORY = os.getenv("RAG_MMAP_INDEX_DIRECTORY", "./rag_index")
+# 새 노드가 컬렉션을 처음 열 때 찾는 스냅샷 디렉토리 (<컬렉션>.ragsnap)
+RAG_SNAPSHOT_DIRECTORY = os.getenv("RAG_SNAPSHOT_DIRECTORY", "")
+RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "1000"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "100"))
+# 시작 시 백그라운드에서 미리 로드할 컬렉션 (쉼표 구분)
+RAG_WARM_COLLECTIONS = [name.strip() for name in os.getenv("RAG_WARM_COLLECTIONS", "").split(",") if name.strip()]
 
 # 문서 및 청크 모델
 class DocumentChunk(BaseModel):
@@ -74,156 +72,516 @@ class RAGResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
     query: str
+    cached: bool = False  # 시맨틱 답변 캐시에서 반환된 경우
 
-class RAGUtility:
-    """RAG(Retrieval Augmented Generation) 유틸리티 클래스"""
-    
-    def __init__(self, db: AsyncIOMotorDatabase):
-        self.db = db
-        self.embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        self.collections = {}
-        self.llm = ChatOpenAI(
-            temperature=0,
-            model_name="gpt-4-turbo-preview",
-            openai_api_key=OPENAI_API_KEY
+
+def chunk_id(document_id: str, text: str) -> str:
+    """문서 ID와 청크 내용 해시로 만든 청크 ID (내용이 같으면 다시 색인해도 같은 ID)"""
+    return f"{document_id}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:24]}"
+
+
+def split_into_chunks(documents: List["Document"], document_id: str) -> Tuple[List[str], List["Document"]]:
+    """문서를 청크로 분할하고 청크 ID 부여 (같은 문서 안의 중복 청크는 하나만 유지)"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    # 문서 청크로 분할
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=RAG_CHUNK_SIZE,
+        chunk_overlap=RAG_CHUNK_OVERLAP
+    )
+    chunks: Dict[str, "Document"] = {}
+    for split in text_splitter.split_documents(documents):
+        split_id = chunk_id(document_id, split.page_content)
+        split.metadata["chunk_id"] = split_id
+        chunks.setdefault(split_id, split)
+    return list(chunks), list(chunks.values())
+
+
+def _stored_chunk_ids(vectorstore: "VectorStore") -> set:
+    return set(vectorstore.get(include=[]).get("ids", []))
+
+
+def _apply_chunk_diff(vectorstore: "VectorStore", ids: List[str], chunks: List["Document"], existing: set) -> Tuple[int, int]:
+    """
+    벡터 스토어에 없는 청크만 임베딩하여 추가하고, 목록에 없는 기존 청크는 삭제
+
+    Returns:
+        (추가된 청크 수, 삭제된 청크 수)
+    """
+    wanted = set(ids)
+    new = [(i, chunk) for i, chunk in zip(ids, chunks) if i not in existing]
+    stale = [i for i in existing if i not in wanted]
+    if new:
+        vectorstore.add_texts(
+            texts=[chunk.page_content for _, chunk in new],
+            metadatas=[chunk.metadata for _, chunk in new],
+            ids=[i for i, _ in new]
         )
-    
-    async def init_collection(self, collection_name: str, force_reload: bool = False) -> None:
-        """벡터 스토어 컬렉션 초기화"""
-        if collection_name in self.collections and not force_reload:
-            return
-        
-        try:
-            # 컬렉션 설정 확인
-            collection_config = await self.db.rag_collections.find_one({"name": collection_name})
-            if not collection_config:
-                logger.error(f"컬렉션을 찾을 수 없음: {collection_name}")
-                raise ValueError(f"컬렉션 '{collection_name}'이 존재하지 않습니다")
-            
-            # 컬렉션에 대한 벡터 스토어 생성
-            persist_directory = os.path.join(CHROMA_PERSIST_DIRECTORY, collection_name)
-            
-            # 강제 리로드 또는 새로운 컬렉션인 경우 문서 로드 및 처리
-            if force_reload or not os.path.exists(persist_directory):
-                # 문서 로드
-                documents = await self._load_collection_documents(collection_name)
-                
-                # 문서 청크로 분할
-                text_splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=1000,
-                    chunk_overlap=100
-                )
-                splits = text_splitter.split_documents(documents)
-                
-                # 벡터 스토어 초기화 및 문서 저장
-                vectorstore = Chroma.from_documents(
-                    documents=splits,
-                    embedding=self.embeddings,
-                    persist_directory=persist_directory
-                )
-                vectorstore.persist()
-            else:
-                # 기존 벡터 스토어 로드
-                vectorstore = Chroma(
-                    persist_directory=persist_directory,
-                    embedding_function=self.embeddings
-                )
-            
-            # 검색기 생성
-            retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-            
-            # QA 체인 생성
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                chain_type="stuff",
-                retriever=retriever,
-                return_source_documents=True
+    if stale:
+        vectorstore.delete(ids=stale)
+    if new or stale:
+        vectorstore.persist()
+    return len(new), len(stale)
+
+
+async def _save_chunk_ids(db: AsyncIOMotorDatabase, chunk_ids_by_document: Dict[str, List[str]]) -> None:
+    """문서별 청크 ID 기록 (삭제 시 해당 청크만 지우기 위함)"""
+    if not chunk_ids_by_document:
+        return
+    now = datetime.utcnow()
+    await db.rag_documents.bulk_write([
+        UpdateOne({"_id": _document_object_id(document_id)}, {"$set": {"chunk_ids": ids, "indexed_at": now}})
+        for document_id, ids in chunk_ids_by_document.items()
+    ], ordered=False)
+
+
+def _format_sources(documents: List["Document"]) -> List[Dict[str, Any]]:
+    return [{"content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+
+
+def _document_object_id(document_id: Any) -> Any:
+    if isinstance(document_id, str) and ObjectId.is_valid(document_id):
+        return ObjectId(document_id)
+    return document_id
+
+
+class RAGCollectionRegistry:
+    """
+    프로세스 전역 RAG 컬렉션 레지스트리
+
+    요청마다 벡터 스토어와 QA 체인을 다시 만들지 않도록 로드된 컬렉션을 워커 수명 동안 공유합니다.
+    - 컬렉션별 asyncio.Lock으로 동시에 들어온 요청이 같은 컬렉션을 한 번만 로드
+    - 로드된 항목은 교체만 하고, 문서 추가/삭제는 같은 잠금 아래에서 벡터 스토어에 청크 단위로 반영
+    - invalidate() 이전에 시작된 로드 결과는 등록하지 않음 (무효화된 문서로 만든 스토어 방지)
+    """
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._embeddings = None
+        self._llm = None
+        self._warm_task: Optional[asyncio.Task] = None
+        self.loader = CollectionDocumentLoader()
+        self.answer_cache = SemanticAnswerCache()
+        self.stats = {"hits": 0, "loads": 0, "load_errors": 0, "invalidations": 0}
+
+    @property
+    def embeddings(self) -> "CachedEmbeddings":
+        """내용 해시 캐시를 거치는 임베딩 (RAG_EMBEDDING_BACKEND로 선택)"""
+        if self._embeddings is None:
+            from .rag_embeddings import create_embeddings
+
+            self._embeddings = create_embeddings()
+        return self._embeddings
+
+    def persist_directory(self, collection_name: str) -> str:
+        """
+        컬렉션의 벡터 스토어 저장 경로
+
+        임베딩 모델마다 벡터 공간이 다르므로 openai 외의 백엔드는 별도 디렉토리에 저장합니다.
+        (기존 openai Chroma 스토어 경로는 그대로 유지)
+        """
+        from .rag_embeddings import RAG_EMBEDDING_BACKEND
+
+        if RAG_VECTOR_BACKEND == "mmap":
+            return os.path.join(RAG_MMAP_INDEX_DIRECTORY, RAG_EMBEDDING_BACKEND, collection_name)
+        if RAG_EMBEDDING_BACKEND == "openai":
+            return os.path.join(CHROMA_PERSIST_DIRECTORY, collection_name)
+        return os.path.join(CHROMA_PERSIST_DIRECTORY, RAG_EMBEDDING_BACKEND, collection_name)
+
+    @property
+    def llm(self) -> "ChatOpenAI":
+        if self._llm is None:
+            from langchain.chat_models import ChatOpenAI
+
+            self._llm = ChatOpenAI(
+                temperature=0,
+                model_name=RAG_COMPLETION_MODEL,
+                openai_api_key=OPENAI_API_KEY
             )
-            
-            self.collections[collection_name] = {
-                "vectorstore": vectorstore,
-                "retriever": retriever,
-                "qa_chain": qa_chain,
-                "config": collection_config
-            }
-            
-            logger.info(f"컬렉션 초기화 완료: {collection_name}")
-        
-        except Exception as e:
-            logger.error(f"컬렉션 초기화 오류: {str(e)}")
-            raise
-    
-    async def _load_collection_documents(self, collection_name: str) -> List[Document]:
-        """컬렉션 문서 로드"""
-        documents = []
-        
-        # DB에서 문서 목록 가져오기
-        doc_cursors = self.db.rag_documents.find({"collection_name": collection_name})
-        doc_list = await doc_cursors.to_list(length=100)
-        
-        for doc in doc_list:
-            file_path = doc.get("file_path")
-            content_type = doc.get("content_type", "text")
-            
-            if not os.path.exists(file_path):
-                logger.warning(f"파일을 찾을 수 없음: {file_path}")
+        return self._llm
+
+    def _lock(self, collection_name: str) -> asyncio.Lock:
+        return self._locks.setdefault(collection_name, asyncio.Lock())
+
+    def _generation(self, collection_name: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(collection_name, 0)
+
+    async def get(self, db: AsyncIOMotorDatabase, collection_name: str, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        로드된 컬렉션 반환 (없으면 로드)
+
+        Args:
+            rebuild: 원본 파일에서 다시 임베딩하여 벡터 스토어 재생성
+        """
+        entry = self._collections.get(collection_name)
+        if entry is not None and not rebuild:
+            self.stats["hits"] += 1
+            return entry
+
+        async with self._lock(collection_name):
+            # 잠금을 기다리는 동안 다른 요청이 로드를 끝냈을 수 있음
+            entry = self._collections.get(collection_name)
+            if entry is not None and not rebuild:
+                self.stats["hits"] += 1
+                return entry
+
+            generation = self._generation(collection_name)
+            try:
+                entry = await self._load(db, collection_name, rebuild)
+            except Exception as e:
+                self.stats["load_errors"] += 1
+                logger.error(f"컬렉션 초기화 오류: {str(e)}")
+                raise
+
+            self.stats["loads"] += 1
+            if self._generation(collection_name) == generation:
+                self._collections[collection_name] = entry
+            return entry
+
+    async def _load(self, db: AsyncIOMotorDatabase, collection_name: str, rebuild: bool) -> Dict[str, Any]:
+        """벡터 스토어와 QA 체인 생성"""
+        # 컬렉션 설정 확인
+        collection_config = await db.rag_collections.find_one({"name": collection_name})
+        if not collection_config:
+            logger.error(f"컬렉션을 찾을 수 없음: {collection_name}")
+            raise ValueError(f"컬렉션 '{collection_name}'이 존재하지 않습니다")
+
+        # 컬렉션에 대한 벡터 스토어 생성
+        persist_directory = self.persist_directory(collection_name)
+        is_new = not os.path.exists(persist_directory)
+
+        # 새 노드: 스냅샷이 있으면 임베딩 없이 스토어를 만들고, 스냅샷 이후 바뀐 문서만 반영
+        snapshot_chunks = None
+        snapshot_path = self.snapshot_path(collection_name)
+        if is_new and snapshot_path and os.path.exists(snapshot_path):
+            try:
+                _, snapshot_chunks = await run_in_threadpool(
+                    install_snapshot, snapshot_path, persist_directory, self._open_vectorstore, self.embeddings.model_id
+                )
+                is_new = False
+            except SnapshotError as e:
+                logger.warning(f"스냅샷을 사용할 수 없어 원본 문서로 색인합니다 ({snapshot_path}): {e}")
+
+        # 임베딩과 Chroma 파일 I/O는 블로킹이므로 스레드에서 실행
+        vectorstore = await run_in_threadpool(self._open_vectorstore, persist_directory)
+        if snapshot_chunks is not None and not rebuild:
+            await self._reconcile_snapshot(db, collection_name, vectorstore, snapshot_chunks)
+
+        # 강제 리로드, 새로운 컬렉션, 모델이 바뀐 인덱스는 원본 문서와 동기화 (바뀐 청크만 임베딩)
+        if rebuild or is_new or getattr(vectorstore, "needs_rebuild", False):
+            await self._sync_collection(db, collection_name, vectorstore)
+
+        # 검색기 생성
+        retriever = vectorstore.as_retriever(search_kwargs={"k": RAG_RETRIEVER_K})
+
+        # QA 체인 생성
+        from langchain.chains import RetrievalQA
+
+        qa_chain = RetrievalQA.from_chain_type(
+            llm=self.llm,
+            chain_type="stuff",
+            retriever=retriever,
+            return_source_documents=True
+        )
+
+        logger.info(f"컬렉션 초기화 완료: {collection_name}")
+        return {
+            "vectorstore": vectorstore,
+            "retriever": retriever,
+            "qa_chain": qa_chain,
+            "config": collection_config,
+            "loaded_at": datetime.utcnow()
+        }
+
+    def _open_vectorstore(self, persist_directory: str) -> "VectorStore":
+        """설정된 백엔드의 벡터 스토어 열기 (없으면 생성)"""
+        if RAG_VECTOR_BACKEND == "mmap":
+            from .rag_vector_index import MmapVectorStore
+
+            return MmapVectorStore(persist_directory, self.embeddings)
+        from langchain.vectorstores import Chroma
+
+        return Chroma(
+            persist_directory=persist_directory,
+            embedding_function=self.embeddings
+        )
+
+    async def _sync_collection(self, db: AsyncIOMotorDatabase, collection_name: str, vectorstore: "VectorStore") -> None:
+        """컬렉션 전체 문서를 청크로 나누어 벡터 스토어와 맞춤 (없는 청크 추가, 남은 청크 삭제)"""
+        chunk_ids_by_document: Dict[str, List[str]] = {}
+        ids, chunks = [], []
+        async for doc, loaded in self.loader.iter_collection(db, collection_name):
+            if loaded is None:
                 continue
-            
+            doc_ids, doc_chunks = split_into_chunks(loaded, str(doc["_id"]))
+            chunk_ids_by_document[str(doc["_id"])] = doc_ids
+            ids.extend(doc_ids)
+            chunks.extend(doc_chunks)
+
+        existing = await run_in_threadpool(_stored_chunk_ids, vectorstore)
+        added, removed = await run_in_threadpool(_apply_chunk_diff, vectorstore, ids, chunks, existing)
+        await _save_chunk_ids(db, chunk_ids_by_document)
+        if added or removed:
+            self.answer_cache.invalidate(collection_name)
+        logger.info(f"컬렉션 동기화 ({collection_name}): 청크 {len(ids)}개 중 {added}개 추가, {removed}개 삭제")
+
+    async def _reconcile_snapshot(
+        self, db: AsyncIOMotorDatabase, collection_name: str, vectorstore: "VectorStore",
+        snapshot_chunks: Dict[str, List[str]]
+    ) -> None:
+        """스냅샷에 없는 문서는 색인하고, 이미 삭제된 문서의 청크는 제거"""
+        await _save_chunk_ids(db, snapshot_chunks)
+        current = set()
+        added = 0
+        async for doc in db.rag_documents.find({"collection_name": collection_name}):
+            document_id = str(doc["_id"])
+            current.add(document_id)
+            if document_id not in snapshot_chunks:
+                added += (await self._index_document(db, collection_name, vectorstore, doc))[0]
+        stale = [chunk for document_id, chunks in snapshot_chunks.items() if document_id not in current for chunk in chunks]
+        if stale:
+            await run_in_threadpool(_apply_chunk_diff, vectorstore, [], [], set(stale))
+        logger.info(f"스냅샷 이후 변경 반영 ({collection_name}): 청크 {added}개 추가, {len(stale)}개 삭제")
+
+    async def _index_document(
+        self, db: AsyncIOMotorDatabase, collection_name: str, vectorstore: "VectorStore", doc: Dict[str, Any]
+    ) -> Tuple[int, int]:
+        """문서 하나를 청크로 나누어 기존 청크와 비교 후 반영 (컬렉션 잠금 안에서 호출)"""
+        previous = await self._document_chunk_ids(vectorstore, doc)
+        loaded = await self.loader.load_document(doc, collection_name)
+        ids, chunks = split_into_chunks(loaded or [], str(doc["_id"]))
+        added, removed = await run_in_threadpool(_apply_chunk_diff, vectorstore, ids, chunks, set(previous))
+        await _save_chunk_ids(db, {str(doc["_id"]): ids})
+        return added, removed
+
+    async def upsert_document(self, db: AsyncIOMotorDatabase, collection_name: str, document_id: Any) -> Tuple[int, int]:
+        """
+        문서 하나만 다시 청크로 나누어 벡터 스토어에 반영
+
+        내용이 바뀌지 않은 청크는 ID(내용 해시)가 같으므로 다시 임베딩하지 않습니다.
+
+        Returns:
+            (추가된 청크 수, 삭제된 청크 수)
+        """
+        # 처음 로드되는 컬렉션은 이 문서까지 포함하여 동기화됨
+        entry = await self.get(db, collection_name)
+        async with self._lock(collection_name):
+            doc = await db.rag_documents.find_one({"_id": document_id})
+            if not doc:
+                return 0, 0
+            added, removed = await self._index_document(db, collection_name, entry["vectorstore"], doc)
+            if added or removed:
+                self.answer_cache.invalidate(collection_name)
+        logger.info(f"문서 색인 갱신 ({collection_name}/{doc['_id']}): 청크 {added}개 추가, {removed}개 삭제")
+        return added, removed
+
+    async def remove_document(self, db: AsyncIOMotorDatabase, collection_name: str, doc: Dict[str, Any]) -> int:
+        """삭제된 문서의 청크만 벡터 스토어에서 제거"""
+        if collection_name not in self._collections and not os.path.exists(self.persist_directory(collection_name)):
+            # 아직 만들어진 적 없는 스토어는 다음 로드 때 남은 문서만으로 생성됨
+            return 0
+        entry = await self.get(db, collection_name)
+        async with self._lock(collection_name):
+            vectorstore = entry["vectorstore"]
+            ids = await self._document_chunk_ids(vectorstore, doc)
+            if ids:
+                await run_in_threadpool(_apply_chunk_diff, vectorstore, [], [], set(ids))
+                self.answer_cache.invalidate(collection_name)
+        logger.info(f"문서 색인 삭제 ({collection_name}/{doc['_id']}): 청크 {len(ids)}개")
+        return len(ids)
+
+    async def _document_chunk_ids(self, vectorstore: "VectorStore", doc: Dict[str, Any]) -> List[str]:
+        """문서에 기록된 청크 ID (기록 이전에 색인된 문서는 메타데이터로 조회)"""
+        if "chunk_ids" in doc:
+            return list(doc["chunk_ids"])
+        result = await run_in_threadpool(vectorstore.get, where={"document_id": str(doc["_id"])}, include=[])
+        return list(result.get("ids", []))
+
+    def snapshot_path(self, collection_name: str) -> Optional[str]:
+        """새 노드가 시작할 때 찾는 스냅샷 파일 경로 (RAG_SNAPSHOT_DIRECTORY 미설정 시 None)"""
+        if not RAG_SNAPSHOT_DIRECTORY:
+            return None
+        return os.path.join(RAG_SNAPSHOT_DIRECTORY, f"{collection_name}{SNAPSHOT_EXTENSION}")
+
+    async def export_snapshot(self, db: AsyncIOMotorDatabase, collection_name: str, path: str) -> Dict[str, Any]:
+        """로드된 컬렉션을 스냅샷 파일로 저장 (저장 중에는 문서 변경을 막음)"""
+        entry = await self.get(db, collection_name)
+        async with self._lock(collection_name):
+            return await run_in_threadpool(
+                export_snapshot, entry["vectorstore"], path, collection_name, self.embeddings.model_id
+            )
+
+    async def import_snapshot(self, db: AsyncIOMotorDatabase, collection_name: str, path: str) -> Dict[str, Any]:
+        """
+        스냅샷으로 컬렉션 스토어 교체
+
+        검증에 실패하면 SnapshotError를 내고 기존 스토어는 그대로 둡니다.
+        로드된 스토어는 새 스토어가 완성될 때까지 요청을 처리하고, 디렉토리 교체 직전에 닫습니다.
+        """
+        def release_loaded_store() -> None:
+            entry = self._collections.pop(collection_name, None)
+            if entry is not None:
+                close_vectorstore(entry["vectorstore"])
+
+        async with self._lock(collection_name):
+            manifest, snapshot_chunks = await run_in_threadpool(
+                install_snapshot, path, self.persist_directory(collection_name),
+                self._open_vectorstore, self.embeddings.model_id, release_loaded_store
+            )
+            self.invalidate(collection_name)
+            await _save_chunk_ids(db, snapshot_chunks)
+        return manifest
+
+    def invalidate(self, collection_name: Optional[str] = None) -> None:
+        """
+        로드된 컬렉션 무효화 (다음 요청에서 다시 로드)
+
+        Args:
+            collection_name: 무효화할 컬렉션, None이면 전체
+        """
+        self.answer_cache.invalidate(collection_name)
+        if collection_name is None:
+            self._epoch += 1
+            self.stats["invalidations"] += len(self._collections)
+            self._collections.clear()
+            return
+        self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+        if self._collections.pop(collection_name, None) is not None:
+            self.stats["invalidations"] += 1
+
+    def start_warmup(self, db: AsyncIOMotorDatabase, collection_names: Optional[List[str]] = None) -> None:
+        """설정된 컬렉션을 백그라운드에서 미리 로드 (첫 쿼리가 로드 시간을 기다리지 않도록)"""
+        names = RAG_WARM_COLLECTIONS if collection_names is None else collection_names
+        if names and self._warm_task is None:
+            self._warm_task = asyncio.create_task(self._warm(db, names))
+
+    async def _warm(self, db: AsyncIOMotorDatabase, collection_names: List[str]) -> None:
+        for collection_name in collection_names:
+            started = time.perf_counter()
             try:
-                # 파일 타입에 따라 적절한 로더 사용
-                if content_type == "pdf" or file_path.endswith(".pdf"):
-                    loader = PyPDFLoader(file_path)
-                elif content_type == "csv" or file_path.endswith(".csv"):
-                    loader = CSVLoader(file_path)
-                else:
-                    # 기본은 텍스트 파일로 간주
-                    loader = TextLoader(file_path, encoding="utf-8")
-                
-                loaded_docs = loader.load()
-                
-                # 메타데이터 추가
-                for loaded_doc in loaded_docs:
-                    loaded_doc.metadata.update({
-                        "source": doc.get("source", file_path),
-                        "title": doc.get("title", os.path.basename(file_path)),
-                        "author": doc.get("author", ""),
-                        "date": doc.get("date", ""),
-                        "document_id": str(doc.get("_id")),
-                        "collection_name": collection_name
-                    })
-                
-                documents.extend(loaded_docs)
-                logger.info(f"문서 로드 완료: {file_path}")
-            
+                await self.get(db, collection_name)
+                logger.info(f"RAG 컬렉션 워밍업 완료: {collection_name} ({time.perf_counter() - started:.2f}초)")
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"문서 로드 오류 ({file_path}): {str(e)}")
-        
-        return documents
+                logger.error(f"RAG 컬렉션 워밍업 실패 ({collection_name}): {e}")
+
+    async def stop_warmup(self) -> None:
+        if self._warm_task is not None and not self._warm_task.done():
+            self._warm_task.cancel()
+            try:
+                await self._warm_task
+            except asyncio.CancelledError:
+                pass
+        self._warm_task = None
+
+    async def close(self) -> None:
+        """워밍업 중단, 문서 파싱 프로세스 풀 종료, 로드된 스토어와 클라이언트 해제 (앱 종료 시)"""
+        await self.stop_warmup()
+        self.loader.shutdown()
+        for entry in self._collections.values():
+            close_vectorstore(entry["vectorstore"])
+        self.invalidate()
+        self._embeddings = None
+        self._llm = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            **self.stats,
+            "loaded_collections": len(self._collections),
+            "loader": self.loader.get_stats(),
+            "answer_cache": self.answer_cache.get_stats(),
+        }
+        if self._embeddings is not None:
+            stats["embeddings"] = self._embeddings.get_stats()
+        return stats
+
+
+# 프로세스 전역 컬렉션 레지스트리
+rag_registry = RAGCollectionRegistry()
+
+
+def get_rag_registry() -> RAGCollectionRegistry:
+    return rag_registry
+
+
+class RAGUtility:
+    """
+    RAG(Retrieval Augmented Generation) 유틸리티 클래스
+
+    벡터 스토어, QA 체인, LLM 클라이언트는 레지스트리가 소유하므로 요청마다 생성해도 가볍습니다.
+    """
+    
+    def __init__(self, db: AsyncIOMotorDatabase, registry: Optional[RAGCollectionRegistry] = None):
+        self.db = db
+        self.registry = registry or rag_registry
+    
+    async def init_collection(self, collection_name: str, force_reload: bool = False) -> Dict[str, Any]:
+        """벡터 스토어 컬렉션 초기화 (이미 로드된 경우 공유 항목 반환)"""
+        return await self.registry.get(self.db, collection_name, rebuild=force_reload)
+    
+    async def _check_answer_cache(self, request: RAGRequest) -> Tuple[Any, Optional[List[float]], Optional[RAGResponse]]:
+        """
+        비슷한 질문의 답변이 있으면 검색과 LLM 호출 생략 (질문 임베딩은 임베딩 캐시를 거침)
+
+        Returns:
+            (캐시 버전, 질문 임베딩, 캐시된 응답 또는 None)
+        """
+        answer_cache = self.registry.answer_cache
+        cache_version = answer_cache.version(request.collection_name)
+        if not answer_cache.enabled:
+            return cache_version, None, None
+
+        query_vector = await run_in_threadpool(self.registry.embeddings.embed_query, request.query)
+        hit = answer_cache.lookup(request.collection_name, query_vector)
+        if hit is None:
+            return cache_version, query_vector, None
+        cached_answer, _ = hit
+        return cache_version, query_vector, RAGResponse(
+            answer=cached_answer["answer"],
+            sources=cached_answer["sources"][:request.max_docs],
+            query=request.query,
+            cached=True
+        )
+
+    async def _retrieve(self, collection: Dict[str, Any], query: str) -> List["Document"]:
+        # 벡터 검색(질문 임베딩 포함)은 블로킹이므로 스레드에서 실행
+        return await run_in_threadpool(collection["retriever"].get_relevant_documents, query)
+
+    def _prompt_messages(self, collection: Dict[str, Any], query: str, documents: List["Document"]) -> List[Any]:
+        """QA 체인("stuff")과 같은 프롬프트로 LLM 입력 메시지 구성"""
+        prompt = collection["qa_chain"].combine_documents_chain.llm_chain.prompt
+        context = "\n\n".join(doc.page_content for doc in documents)
+        return prompt.format_prompt(context=context, question=query).to_messages()
     
     async def query(self, request: RAGRequest) -> RAGResponse:
-        """RAG 쿼리 실행"""
+        """RAG 쿼리 실행 (검색은 스레드, 생성은 비동기 LLM 호출로 이벤트 루프를 막지 않음)"""
         collection_name = request.collection_name
         
         # 컬렉션 초기화 확인
-        if collection_name not in self.collections:
-            await self.init_collection(collection_name)
+        collection = await self.init_collection(collection_name)
+        
+        cache_version, query_vector, cached = await self._check_answer_cache(request)
+        if cached is not None:
+            return cached
         
         try:
-            # QA 체인 실행
-            qa_chain = self.collections[collection_name]["qa_chain"]
-            result = qa_chain({"query": request.query})
-            
-            # 결과 추출
-            answer = result.get("result", "")
-            source_documents = result.get("source_documents", [])
+            # 관련 문서 검색 후 답변 생성
+            source_documents = await self._retrieve(collection, request.query)
+            messages = self._prompt_messages(collection, request.query, source_documents)
+            result = await self.registry.llm.agenerate([messages])
+            answer = result.generations[0][0].text
             
             # 소스 정보 구성
-            sources = []
-            for doc in source_documents:
-                sources.append({
-                    "content": doc.page_content,
-                    "metadata": doc.metadata
-                })
+            sources = _format_sources(source_documents)
+            
+            if query_vector is not None:
+                self.registry.answer_cache.put(
+                    collection_name, query_vector, {"answer": answer, "sources": sources}, cache_version
+                )
             
             return RAGResponse(
                 answer=answer,
@@ -234,6 +592,43 @@ class RAGUtility:
         except Exception as e:
             logger.error(f"쿼리 실행 오류: {str(e)}")
             raise
+
+    async def query_stream(self, request: RAGRequest) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        RAG 쿼리 스트리밍 실행
+
+        (이벤트 이름, 데이터)를 순서대로 생성합니다.
+        - sources: 검색이 끝나는 즉시 출처 목록 (첫 바이트까지의 시간 ≈ 검색 시간)
+        - token: 생성되는 답변 조각
+        - done: 전체 답변
+        """
+        collection_name = request.collection_name
+        collection = await self.init_collection(collection_name)
+
+        cache_version, query_vector, cached = await self._check_answer_cache(request)
+        if cached is not None:
+            yield "sources", {"query": request.query, "sources": cached.sources, "cached": True}
+            yield "token", {"text": cached.answer}
+            yield "done", {"answer": cached.answer, "cached": True}
+            return
+
+        source_documents = await self._retrieve(collection, request.query)
+        sources = _format_sources(source_documents)
+        yield "sources", {"query": request.query, "sources": sources[:request.max_docs], "cached": False}
+
+        messages = self._prompt_messages(collection, request.query, source_documents)
+        parts = []
+        async for chunk in self.registry.llm.astream(messages):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield "token", {"text": chunk.content}
+
+        answer = "".join(parts)
+        if query_vector is not None:
+            self.registry.answer_cache.put(
+                collection_name, query_vector, {"answer": answer, "sources": sources}, cache_version
+            )
+        yield "done", {"answer": answer, "cached": False}
     
     async def add_document(self, collection_name: str, file_path: str, metadata: Dict[str, Any]) -> str:
         """문서를 컬렉션에 추가"""
@@ -253,23 +648,23 @@ class RAGUtility:
         result = await self.db.rag_documents.insert_one(doc_data)
         document_id = str(result.inserted_id)
         
-        # 벡터 스토어 갱신
-        await self.init_collection(collection_name, force_reload=True)
+        # 새 문서의 청크만 벡터 스토어에 추가
+        await self.registry.upsert_document(self.db, collection_name, result.inserted_id)
         
         return document_id
     
     async def delete_document(self, document_id: str) -> bool:
         """문서 삭제"""
         # 문서 정보 조회
-        doc = await self.db.rag_documents.find_one_and_delete({"_id": document_id})
+        doc = await self.db.rag_documents.find_one_and_delete({"_id": _document_object_id(document_id)})
         
         if not doc:
             return False
         
-        # 관련 컬렉션 갱신
+        # 관련 컬렉션에서 이 문서의 청크만 삭제
         collection_name = doc.get("collection_name")
         if collection_name:
-            await self.init_collection(collection_name, force_reload=True)
+            await self.registry.remove_document(self.db, collection_name, doc)
         
         return True
     
@@ -278,45 +673,6 @@ class RAGUtility:
         collections = await self.db.rag_collections.find().to_list(length=100)
         return collections
 
-# RAG 유틸리티 의존성
-async def get_rag_utility(db: AsyncIOMotorDatabase = Depends(get_database)) -> RAGUtility:
+# RAG 유틸리티 의존성 (컬렉션은 레지스트리에서 공유)
+async def get_rag_utility(db: AsyncIOMotorDatabase = Depends(get_async_db)) -> RAGUtility:
     return RAGUtility(db)
-
-async def initialize_rag(
-    db,
-    collection_name: str = "knowledge_base",
-    embedding_model: str = "text-embedding-3-small",
-    completion_model: str = "gpt-4-turbo"
-) -> RAGSystem:
-    """
-    RAG 시스템을 초기화하고 반환
-    
-    Parameters:
-    - db: 데이터베이스 연결
-    - collection_name: 컬렉션 이름
-    - embedding_model: 임베딩 모델 이름
-    - completion_model: 응답 생성 모델 이름
-    
-    Returns:
-    - 초기화된 RAG 시스템
-    """
-    collection = db[collection_name]
-    
-    # 벡터 인덱스 확인 및 생성
-    index_info = await collection.index_information()
-    if "content_embedding" not in index_info:
-        logger.info(f"컬렉션 {collection_name}에 벡터 인덱스 생성 중...")
-        await collection.create_index(
-            [("embedding", "vector")],
-            name="content_embedding",
-            dimensions=1536 if "3-small" in embedding_model else 3072
-        )
-    
-    return RAGSystem(
-        collection=collection,
-        embedding_model=embedding_model,
-        completion_model=completion_model
-    )
-
-# 싱글톤 인스턴스
-rag_system = initialize_rag(MongoClient(MONGODB_URI)[DB_NAME]) 
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+RAG 시맨틱 답변 캐시
+
+표현만 조금 다른 같은 질문이 반복되므로, 질문 임베딩의 코사인 유사도가 임계값 이상인
+이전 질문이 있으면 검색과 LLM 호출 없이 그 답변을 돌려줍니다.
+
+- 컬렉션마다 (정규화된 질문 벡터 행렬, 답변) 목록을 유지
+- 컬렉션 문서가 바뀌면 해당 컬렉션 항목을 모두 버리고 버전을 올림
+- 생성 중에 문서가 바뀐 답변은 버전이 달라 저장하지 않음
+"""
+
+import os
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 답변 캐시 설정
+RAG_ANSWER_CACHE_ENABLED = os.getenv("RAG_ANSWER_CACHE_ENABLED", "true").lower() == "true"
+RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+RAG_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("RAG_ANSWER_CACHE_MAX_ENTRIES", "500"))  # 컬렉션당
+RAG_ANSWER_CACHE_TTL_SECONDS = float(os.getenv("RAG_ANSWER_CACHE_TTL_SECONDS", "86400"))
+
+
+class _CollectionAnswers:
+    def __init__(self):
+        self.vectors: Optional[np.ndarray] = None  # (항목 수, 차원), 행은 단위 벡터
+        self.answers: List[Dict[str, Any]] = []
+        self.created_at: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def drop(self, indices: List[int]) -> None:
+        dropped = set(indices)
+        keep = [i for i in range(len(self.answers)) if i not in dropped]
+        self.vectors = self.vectors[keep] if keep else None
+        self.answers = [self.answers[i] for i in keep]
+        self.created_at = [self.created_at[i] for i in keep]
+
+
+def _normalize(vector: Any) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+class SemanticAnswerCache:
+    """컬렉션별 질문 임베딩 유사도 기반 답변 캐시 (이벤트 루프에서만 사용)"""
+
+    def __init__(
+        self,
+        threshold: float = RAG_ANSWER_CACHE_THRESHOLD,
+        max_entries: int = RAG_ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RAG_ANSWER_CACHE_TTL_SECONDS,
+        enabled: bool = RAG_ANSWER_CACHE_ENABLED,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._collections: Dict[str, _CollectionAnswers] = {}
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "stale_discards": 0, "invalidations": 0}
+
+    def version(self, collection_name: str) -> Tuple[int, int]:
+        """답변 생성 전에 받아 두었다가 put()에 넘기는 컬렉션 버전"""
+        return self._epoch, self._versions.get(collection_name, 0)
+
+    def lookup(self, collection_name: str, query_vector: Any) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        유사한 이전 질문의 답변 검색
+
+        Returns:
+            (저장된 답변, 코사인 유사도), 없으면 None
+        """
+        if not self.enabled:
+            return None
+        self.stats["lookups"] += 1
+        entries = self._collections.get(collection_name)
+        if entries is not None and len(entries):
+            self._expire(entries)
+        if entries is None or not len(entries):
+            self.stats["misses"] += 1
+            return None
+
+        query = _normalize(query_vector)
+        if entries.vectors.shape[1] != query.shape[0]:
+            # 임베딩 모델이 바뀐 경우
+            self.invalidate(collection_name)
+            self.stats["misses"] += 1
+            return None
+
+        similarities = entries.vectors @ query
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entries.answers[best], similarity
+
+    def put(self, collection_name: str, query_vector: Any, answer: Dict[str, Any], version: Tuple[int, int]) -> None:
+        """답변 저장 (생성 중 컬렉션이 바뀌었으면 버림)"""
+        if not self.enabled:
+            return
+        if version != self.version(collection_name):
+            self.stats["stale_discards"] += 1
+            return
+
+        entries = self._collections.setdefault(collection_name, _CollectionAnswers())
+        query = _normalize(query_vector)[np.newaxis, :]
+        if entries.vectors is not None and entries.vectors.shape[1] != query.shape[1]:
+            entries = self._collections[collection_name] = _CollectionAnswers()
+        if len(entries) >= self.max_entries:
+            # 가장 오래된 항목부터 제거
+            entries.drop(list(range(len(entries) - self.max_entries + 1)))
+
+        entries.vectors = query if entries.vectors is None else np.vstack([entries.vectors, query])
+        entries.answers.append(answer)
+        entries.created_at.append(time.monotonic())
+        self.stats["stores"] += 1
+
+    def _expire(self, entries: _CollectionAnswers) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [i for i, created in enumerate(entries.created_at) if created < cutoff]
+        if expired:
+            entries.drop(expired)
+
+    def invalidate(self, collection_name: Optional[str] = None) -> None:
+        """컬렉션 문서가 바뀌었을 때 호출 (None이면 전체)"""
+        if collection_name is None:
+            self._epoch += 1
+            self.stats["invalidations"] += len(self._collections)
+            self._collections.clear()
+            return
+        self._versions[collection_name] = self._versions.get(collection_name, 0) + 1
+        if self._collections.pop(collection_name, None) is not None:
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["lookups"]
+        return {
+            **self.stats,
+            "entries": sum(len(entries) for entries in self._collections.values()),
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
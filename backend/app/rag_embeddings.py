@@ -0,0 +1,225 @@
+"""
+RAG 임베딩 계층
+
+청크 내용 해시와 모델 이름을 키로 임베딩 벡터를 로컬 SQLite에 저장합니다.
+내용이 바뀌지 않은 청크는 다시 색인해도 임베딩 API를 호출하지 않습니다.
+
+백엔드 (RAG_EMBEDDING_BACKEND)
+- openai: OpenAI 임베딩 API (기존 동작)
+- local: SentenceTransformer를 CPU에서 큰 배치로 실행 (네트워크 없이 동작)
+"""
+
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 임베딩 설정
+RAG_EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "openai")  # openai / local
+RAG_OPENAI_EMBEDDING_MODEL = os.getenv("RAG_OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+RAG_LOCAL_EMBEDDING_MODEL = os.getenv(
+    "RAG_LOCAL_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+)
+RAG_LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("RAG_LOCAL_EMBEDDING_BATCH_SIZE", "256"))
+RAG_LOCAL_EMBEDDING_DEVICE = os.getenv("RAG_LOCAL_EMBEDDING_DEVICE", "cpu")
+RAG_EMBEDDING_CACHE_PATH = os.getenv("RAG_EMBEDDING_CACHE_PATH", "./rag_cache/embeddings.sqlite")  # 비우면 캐시 끔
+
+# SQLite IN 절 변수 개수 제한보다 작게 나누어 조회
+_LOOKUP_BATCH = 500
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    (모델, 내용 해시) → float32 벡터 저장소
+
+    같은 호스트의 워커들이 파일 하나를 공유하며, 연결은 스레드마다 따로 엽니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash)) WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(hashes)
+        found: Dict[str, np.ndarray] = {}
+        conn = self._connection()
+        for start in range(0, len(hashes), _LOOKUP_BATCH):
+            batch = hashes[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                (model, *batch),
+            )
+            for key, vector in rows:
+                found[key] = np.frombuffer(vector, dtype="<f4")
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]) -> None:
+        if not vectors:
+            return
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model, key, np.asarray(vector, dtype="<f4").tobytes()) for key, vector in vectors.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def count(self, model: str) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM embeddings WHERE model = ?", (model,)
+        ).fetchone()[0]
+
+
+class LocalBatchEmbedder:
+    """SentenceTransformer 로컬 임베딩 (모델은 처음 사용할 때 로드)"""
+
+    def __init__(
+        self,
+        model_name: str = RAG_LOCAL_EMBEDDING_MODEL,
+        batch_size: int = RAG_LOCAL_EMBEDDING_BATCH_SIZE,
+        device: str = RAG_LOCAL_EMBEDDING_DEVICE,
+    ):
+        self.model_id = f"local:{model_name}"
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                self._model = SentenceTransformer(self.model_name, device=self.device)
+                logger.info(f"로컬 임베딩 모델 로드 완료: {self.model_name}")
+            return self._model
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        ).astype(np.float32)
+
+
+class OpenAIEmbedder:
+    """OpenAI 임베딩 API"""
+
+    def __init__(self, model_name: str = RAG_OPENAI_EMBEDDING_MODEL, api_key: Optional[str] = None):
+        from langchain.embeddings.openai import OpenAIEmbeddings
+
+        self.model_id = f"openai:{model_name}"
+        self._client = OpenAIEmbeddings(model=model_name, openai_api_key=api_key or os.getenv("OPENAI_API_KEY", ""))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self._client.embed_documents(texts), dtype=np.float32)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    내용 해시 캐시를 거치는 langchain 임베딩
+
+    캐시에 없는 고유 텍스트만 모아 한 번에 백엔드로 보냅니다.
+    """
+
+    def __init__(self, embedder, store: Optional[EmbeddingStore] = None):
+        self.embedder = embedder
+        self.store = store
+        self._memory: Dict[str, np.ndarray] = {}  # 캐시 파일을 끈 경우 프로세스 내 캐시
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "backend_calls": 0}
+
+    @property
+    def model_id(self) -> str:
+        return self.embedder.model_id
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        if self.store is None:
+            return {key: self._memory[key] for key in hashes if key in self._memory}
+        return self.store.get_many(self.model_id, hashes)
+
+    def _save(self, vectors: Dict[str, np.ndarray]) -> None:
+        if self.store is None:
+            self._memory.update(vectors)
+        else:
+            self.store.put_many(self.model_id, vectors)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """텍스트 목록의 임베딩 행렬 (행 순서는 입력과 같음)"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        hashes = [content_hash(text) for text in texts]
+        vectors = self._lookup(list(dict.fromkeys(hashes)))
+
+        missing = {key: text for key, text in zip(hashes, texts) if key not in vectors}
+        if missing:
+            embedded = self.embedder.embed(list(missing.values()))
+            computed = dict(zip(missing.keys(), embedded))
+            self._save(computed)
+            vectors.update(computed)
+
+        with self._stats_lock:
+            self.stats["hits"] += len(texts) - len(missing)
+            self.stats["misses"] += len(missing)
+            self.stats["backend_calls"] += 1 if missing else 0
+        return np.vstack([vectors[key] for key in hashes])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+
+def create_embeddings(backend: str = RAG_EMBEDDING_BACKEND) -> CachedEmbeddings:
+    """설정된 백엔드와 캐시 파일로 임베딩 객체 생성"""
+    if backend == "local":
+        embedder = LocalBatchEmbedder()
+    elif backend == "openai":
+        embedder = OpenAIEmbedder()
+    else:
+        raise ValueError(f"지원하지 않는 임베딩 백엔드: {backend}")
+    store = EmbeddingStore(RAG_EMBEDDING_CACHE_PATH) if RAG_EMBEDDING_CACHE_PATH else None
+    return CachedEmbeddings(embedder, store)
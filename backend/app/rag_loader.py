@@ -0,0 +1,205 @@
+"""
+RAG 문서 로더
+
+rag_documents 커서를 끝까지 스트리밍하면서 파일 파싱을 프로세스 풀에 나누어 맡깁니다.
+PDF 파싱은 CPU 작업이라 스레드로는 병렬화되지 않으므로 별도 프로세스에서 실행합니다.
+추출한 텍스트는 (경로, 수정 시각, 크기)를 키로 SQLite에 저장하여, 바뀌지 않은 파일은 다시 파싱하지 않습니다.
+"""
+
+import os
+import pickle
+import sqlite3
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 로더 설정
+RAG_LOADER_WORKERS = int(os.getenv("RAG_LOADER_WORKERS", str(os.cpu_count() or 1)))
+RAG_LOADER_CURSOR_BATCH_SIZE = int(os.getenv("RAG_LOADER_CURSOR_BATCH_SIZE", "200"))
+RAG_TEXT_CACHE_PATH = os.getenv("RAG_TEXT_CACHE_PATH", "./rag_cache/texts.sqlite")  # 비우면 캐시 끔
+
+# 파싱 결과: (페이지 텍스트, 로더 메타데이터) 목록 - 프로세스 간 전달이 가벼운 형태
+ParsedPages = List[Tuple[str, Dict[str, Any]]]
+
+
+class ExtractedTextCache:
+    """(파일 경로, mtime, 크기) → 추출 텍스트 저장소 (여러 프로세스가 같은 파일을 공유)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, pages BLOB NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, path: str, mtime_ns: int, size: int) -> Optional[ParsedPages]:
+        row = self._connection().execute(
+            "SELECT pages FROM texts WHERE path = ? AND mtime_ns = ? AND size = ?", (path, mtime_ns, size)
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, path: str, mtime_ns: int, size: int, pages: ParsedPages) -> None:
+        # 경로당 한 행만 유지 (파일이 바뀌면 이전 텍스트를 덮어씀)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO texts (path, mtime_ns, size, pages) VALUES (?, ?, ?, ?)",
+            (path, mtime_ns, size, pickle.dumps(pages, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+
+
+_text_cache: Optional[ExtractedTextCache] = None
+
+
+def _get_text_cache() -> Optional[ExtractedTextCache]:
+    """프로세스(워커)마다 하나의 캐시 연결"""
+    global _text_cache
+    if _text_cache is None and RAG_TEXT_CACHE_PATH:
+        _text_cache = ExtractedTextCache(RAG_TEXT_CACHE_PATH)
+    return _text_cache
+
+
+def parse_file(file_path: str, content_type: str) -> ParsedPages:
+    """파일 타입에 맞는 langchain 로더로 텍스트 추출"""
+    from langchain.document_loaders import CSVLoader, PyPDFLoader, TextLoader
+
+    if content_type == "pdf" or file_path.endswith(".pdf"):
+        loader = PyPDFLoader(file_path)
+    elif content_type == "csv" or file_path.endswith(".csv"):
+        loader = CSVLoader(file_path)
+    else:
+        # 기본은 텍스트 파일로 간주
+        loader = TextLoader(file_path, encoding="utf-8")
+    return [(page.page_content, dict(page.metadata)) for page in loader.load()]
+
+
+def load_file(file_path: str, content_type: str) -> Tuple[ParsedPages, bool]:
+    """
+    캐시를 거쳐 파일 텍스트 추출 (프로세스 풀에서 실행)
+
+    Returns:
+        (페이지 목록, 캐시 적중 여부)
+    """
+    stat = os.stat(file_path)
+    path = os.path.abspath(file_path)
+    cache = _get_text_cache()
+    if cache is not None:
+        pages = cache.get(path, stat.st_mtime_ns, stat.st_size)
+        if pages is not None:
+            return pages, True
+
+    pages = parse_file(file_path, content_type)
+    if cache is not None:
+        cache.set(path, stat.st_mtime_ns, stat.st_size, pages)
+    return pages, False
+
+
+def to_documents(doc: Dict[str, Any], collection_name: str, pages: ParsedPages) -> List["Document"]:
+    """파싱 결과에 rag_documents의 메타데이터를 붙여 Document로 변환"""
+    from langchain.schema import Document
+
+    file_path = doc.get("file_path")
+    metadata = {
+        "source": doc.get("source", file_path),
+        "title": doc.get("title", os.path.basename(file_path)),
+        "author": doc.get("author", ""),
+        "date": doc.get("date", ""),
+        "document_id": str(doc.get("_id")),
+        "collection_name": collection_name
+    }
+    return [Document(page_content=text, metadata={**page_metadata, **metadata}) for text, page_metadata in pages]
+
+
+class CollectionDocumentLoader:
+    """컬렉션 문서를 병렬로 파싱하는 로더 (프로세스 풀은 처음 사용할 때 생성)"""
+
+    def __init__(self, workers: int = RAG_LOADER_WORKERS):
+        self.workers = max(1, workers)
+        self._executor: Optional[Executor] = None
+        self.stats = {"parsed": 0, "cache_hits": 0, "missing": 0, "errors": 0}
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        # 워커가 1개면 기본 스레드 풀에서 파싱 (프로세스 생성 비용 없음)
+        if self._executor is None and self.workers > 1:
+            # 이벤트 루프 스레드와 드라이버 스레드가 있는 프로세스를 fork하지 않도록 spawn 사용
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def load_document(self, doc: Dict[str, Any], collection_name: str) -> Optional[List["Document"]]:
+        """문서 파일 하나를 파싱하여 메타데이터를 붙인 Document 목록 반환 (실패 시 None)"""
+        file_path = doc.get("file_path")
+        if not file_path or not os.path.exists(file_path):
+            logger.warning(f"파일을 찾을 수 없음: {file_path}")
+            self.stats["missing"] += 1
+            return None
+
+        try:
+            loop = asyncio.get_running_loop()
+            pages, cached = await loop.run_in_executor(
+                self.executor, load_file, file_path, doc.get("content_type", "text")
+            )
+        except Exception as e:
+            logger.error(f"문서 로드 오류 ({file_path}): {str(e)}")
+            self.stats["errors"] += 1
+            return None
+
+        self.stats["cache_hits" if cached else "parsed"] += 1
+        return to_documents(doc, collection_name, pages)
+
+    async def iter_collection(
+        self, db: AsyncIOMotorDatabase, collection_name: str
+    ) -> AsyncIterator[Tuple[Dict[str, Any], Optional[List["Document"]]]]:
+        """
+        컬렉션의 모든 문서를 (rag_documents 문서, 파싱 결과) 순서로 반환
+
+        커서는 개수 제한 없이 스트리밍하고, 동시에 파싱 중인 파일 수는 워커 수의 몇 배로 제한합니다.
+        """
+        window = self.workers * 4
+        pending: List[Tuple[Dict[str, Any], asyncio.Task]] = []
+        cursor = db.rag_documents.find(
+            {"collection_name": collection_name}, batch_size=RAG_LOADER_CURSOR_BATCH_SIZE
+        )
+        try:
+            async for doc in cursor:
+                pending.append((doc, asyncio.ensure_future(self.load_document(doc, collection_name))))
+                if len(pending) >= window:
+                    doc, task = pending.pop(0)
+                    yield doc, await task
+            for doc, task in pending:
+                yield doc, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
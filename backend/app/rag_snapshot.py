@@ -0,0 +1,258 @@
+"""
+RAG 인덱스 스냅샷
+
+색인이 끝난 컬렉션을 하나의 파일로 내보내고 다른 노드에서 그대로 불러옵니다.
+새 복제본이 원본 파일을 다시 파싱하고 임베딩하지 않고 몇 초 안에 준비됩니다.
+
+스냅샷 파일(zip, 압축 없음)
+- manifest.json: 형식 버전, 컬렉션, 임베딩 모델 ID, 차원, 청크 수, 구성 파일별 SHA-256
+- vectors.npy: (청크 수, 차원) float32 행렬
+- chunks.jsonl: 줄마다 청크 ID, 텍스트, 메타데이터
+
+불러올 때는 체크섬과 임베딩 모델을 확인한 뒤 임시 디렉토리에 스토어를 만들고,
+완성된 디렉토리를 기존 디렉토리와 교체합니다. (실패하면 기존 스토어는 그대로)
+
+사용법 (backend 디렉토리에서):
+    python -m app.rag_snapshot export --collection knowledge_base --path kb.ragsnap
+    python -m app.rag_snapshot import --collection knowledge_base --path kb.ragsnap
+"""
+
+import io
+import os
+import json
+import shutil
+import hashlib
+import logging
+import zipfile
+import argparse
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_EXTENSION = ".ragsnap"
+_MANIFEST = "manifest.json"
+_VECTORS = "vectors.npy"
+_CHUNKS = "chunks.jsonl"
+_CHROMA_BATCH_SIZE = 4000  # chromadb 한 번 추가 최대 개수보다 작게
+
+
+class SnapshotError(ValueError):
+    """스냅샷 파일이 손상되었거나 현재 설정과 맞지 않음"""
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def export_snapshot(vectorstore: Any, path: str, collection_name: str, model_id: str) -> Dict[str, Any]:
+    """
+    벡터 스토어 전체를 스냅샷 파일로 저장 (임시 파일에 쓴 뒤 교체)
+
+    Returns:
+        manifest
+    """
+    data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+    ids = list(data["ids"])
+    vectors = np.asarray(data["embeddings"] or [], dtype=np.float32)
+    if ids and vectors.shape[0] != len(ids):
+        raise SnapshotError("벡터 수와 청크 수가 일치하지 않습니다")
+
+    buffer = io.BytesIO()
+    np.save(buffer, vectors.reshape(len(ids), -1) if ids else vectors.reshape(0, 0))
+    vectors_bytes = buffer.getvalue()
+    chunks_bytes = "".join(
+        json.dumps({"id": chunk_id, "text": text, "metadata": metadata}, ensure_ascii=False, default=str) + "\n"
+        for chunk_id, text, metadata in zip(ids, data["documents"], data["metadatas"])
+    ).encode("utf-8")
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "collection": collection_name,
+        "model": model_id,
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 and ids else 0,
+        "count": len(ids),
+        "created_at": datetime.utcnow().isoformat(),
+        "checksums": {_VECTORS: _sha256(vectors_bytes), _CHUNKS: _sha256(chunks_bytes)},
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        archive.writestr(_MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2))
+        archive.writestr(_VECTORS, vectors_bytes)
+        archive.writestr(_CHUNKS, chunks_bytes)
+    with open(tmp_path, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logger.info(f"RAG 스냅샷 저장 ({collection_name}): 청크 {len(ids)}개 → {path}")
+    return manifest
+
+
+def read_snapshot(path: str, expected_model: str) -> Tuple[Dict[str, Any], List[str], np.ndarray, List[str], List[Dict]]:
+    """
+    스냅샷 파일 읽기 및 검증
+
+    Returns:
+        (manifest, 청크 ID, 벡터, 텍스트, 메타데이터)
+
+    Raises:
+        SnapshotError: 형식/체크섬/임베딩 모델이 맞지 않을 때
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            manifest = json.loads(archive.read(_MANIFEST))
+            vectors_bytes = archive.read(_VECTORS)
+            chunks_bytes = archive.read(_CHUNKS)
+    except (KeyError, zipfile.BadZipFile, json.JSONDecodeError) as e:
+        raise SnapshotError(f"스냅샷 파일을 읽을 수 없습니다: {e}")
+
+    if manifest.get("format") != SNAPSHOT_FORMAT_VERSION:
+        raise SnapshotError(f"지원하지 않는 스냅샷 형식: {manifest.get('format')}")
+    if manifest.get("model") != expected_model:
+        raise SnapshotError(f"임베딩 모델이 다릅니다: 스냅샷 {manifest.get('model')}, 현재 {expected_model}")
+    checksums = manifest.get("checksums", {})
+    for name, content in ((_VECTORS, vectors_bytes), (_CHUNKS, chunks_bytes)):
+        if checksums.get(name) != _sha256(content):
+            raise SnapshotError(f"체크섬 불일치: {name}")
+
+    vectors = np.load(io.BytesIO(vectors_bytes), allow_pickle=False)
+    chunks = [json.loads(line) for line in chunks_bytes.decode("utf-8").splitlines() if line]
+    if len(chunks) != manifest["count"] or vectors.shape[0] != manifest["count"]:
+        raise SnapshotError("청크 수가 manifest와 일치하지 않습니다")
+    return (
+        manifest,
+        [chunk["id"] for chunk in chunks],
+        vectors,
+        [chunk["text"] for chunk in chunks],
+        [chunk["metadata"] for chunk in chunks],
+    )
+
+
+def _write_vectors(vectorstore: Any, ids: List[str], vectors: np.ndarray, texts: List[str],
+                   metadatas: List[Dict]) -> None:
+    """임베딩을 다시 계산하지 않고 벡터를 그대로 스토어에 기록"""
+    if hasattr(vectorstore, "add_vectors"):
+        vectorstore.add_vectors(ids, vectors, texts, metadatas)
+        return
+    # Chroma: langchain 래퍼는 벡터를 직접 받지 않으므로 chromadb 컬렉션에 기록
+    for start in range(0, len(ids), _CHROMA_BATCH_SIZE):
+        end = start + _CHROMA_BATCH_SIZE
+        vectorstore._collection.upsert(
+            ids=ids[start:end],
+            embeddings=vectors[start:end].tolist(),
+            documents=texts[start:end],
+            metadatas=metadatas[start:end],
+        )
+    vectorstore.persist()
+
+
+def close_vectorstore(vectorstore: Any) -> None:
+    """스토어가 잡고 있는 파일 핸들, 메모리 맵, 클라이언트 해제"""
+    close = getattr(vectorstore, "close", None)
+    if close is not None:
+        close()
+        return
+    # Chroma: langchain 래퍼에는 close가 없고, chromadb는 경로별로 클라이언트 시스템을 캐시하므로
+    # 시스템을 멈추고 캐시에서 빼야 같은 경로의 새 디렉토리를 다시 열 수 있음
+    client = getattr(vectorstore, "_client", None)
+    if client is None:
+        return
+    try:
+        from chromadb.api.client import SharedSystemClient
+
+        SharedSystemClient._identifer_to_system.pop(getattr(client, "_identifier", None), None)
+    except (ImportError, AttributeError):
+        pass
+    system = getattr(client, "_system", None)
+    if system is not None:
+        system.stop()
+
+
+def install_snapshot(
+    path: str,
+    directory: str,
+    open_store: Callable[[str], Any],
+    expected_model: str,
+    before_swap: Optional[Callable[[], None]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+    """
+    스냅샷을 검증하고 새 스토어를 만들어 directory와 교체
+
+    Args:
+        open_store: 디렉토리 경로를 받아 빈 벡터 스토어를 여는 함수
+        before_swap: 교체 직전에 호출 (기존 디렉토리를 열고 있는 스토어를 닫는 용도)
+
+    Returns:
+        (manifest, 문서 ID별 청크 ID)
+    """
+    manifest, ids, vectors, texts, metadatas = read_snapshot(path, expected_model)
+
+    staging = f"{directory}.importing-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.dirname(os.path.abspath(directory)), exist_ok=True)
+    try:
+        store = open_store(staging)
+        if ids:
+            _write_vectors(store, ids, vectors, texts, metadatas)
+        close_vectorstore(store)
+        del store
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # 완성된 디렉토리로 교체 (기존 디렉토리는 옆으로 옮긴 뒤 삭제)
+    if before_swap is not None:
+        before_swap()
+    retired = f"{directory}.retired-{os.getpid()}"
+    if os.path.exists(directory):
+        os.replace(directory, retired)
+    os.replace(staging, directory)
+    shutil.rmtree(retired, ignore_errors=True)
+
+    chunk_ids_by_document: Dict[str, List[str]] = {}
+    for chunk_id, metadata in zip(ids, metadatas):
+        document_id = metadata.get("document_id")
+        if document_id:
+            chunk_ids_by_document.setdefault(document_id, []).append(chunk_id)
+    logger.info(f"RAG 스냅샷 적용 ({manifest['collection']}): 청크 {len(ids)}개 ← {path}")
+    return manifest, chunk_ids_by_document
+
+
+def main() -> None:
+    import asyncio
+
+    from .db import mongo
+    from .rag import get_rag_registry
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="RAG 인덱스 스냅샷 내보내기/불러오기")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--path", required=True)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        registry = get_rag_registry()
+        try:
+            if args.command == "export":
+                manifest = await registry.export_snapshot(mongo.async_db, args.collection, args.path)
+            else:
+                manifest = await registry.import_snapshot(mongo.async_db, args.collection, args.path)
+            logger.info(f"완료: {json.dumps({k: v for k, v in manifest.items() if k != 'checksums'}, ensure_ascii=False)}")
+        finally:
+            await registry.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        mongo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,510 @@
+"""
+메모리 맵 벡터 인덱스
+
+작은 CPU 노드에서 수만 개 청크 규모의 컬렉션을 Chroma 없이 검색하기 위한 내장 벡터 스토어입니다.
+
+- 벡터: 연속된 float32 또는 int8(행별 스케일) 행렬 파일을 np.memmap으로 매핑 (시작 = mmap 한 번)
+- 메타데이터: 같은 디렉토리의 SQLite 사이드카 (행 번호, 청크 ID, 텍스트, 메타데이터)
+- 검색: 정규화된 벡터의 내적(코사인) top-k, 행이 많으면 IVF(구면 k-means 역색인)로 일부 목록만 탐색
+- 삭제는 표시만 하고, 삭제 비율이 커지면 살아 있는 행만 다시 써서 압축
+
+Chroma와 같은 langchain VectorStore 인터페이스(as_retriever, add_texts, delete, get, persist)를 제공하므로
+레지스트리에서 그대로 바꿔 쓸 수 있습니다. 한 디렉토리는 한 프로세스만 쓰는 것을 전제로 합니다.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain.embeddings.base import Embeddings
+from langchain.vectorstores.base import VectorStore
+
+from .rag_embeddings import content_hash
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 인덱스 설정
+RAG_VECTOR_DTYPE = os.getenv("RAG_VECTOR_DTYPE", "float32")  # float32 / int8
+RAG_IVF_MIN_ROWS = int(os.getenv("RAG_IVF_MIN_ROWS", "20000"))  # 이보다 적으면 전체 탐색
+RAG_IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "8"))
+RAG_VECTOR_COMPACT_RATIO = float(os.getenv("RAG_VECTOR_COMPACT_RATIO", "0.25"))
+
+INDEX_FORMAT_VERSION = 1
+_HEADER_FILE = "header.json"
+_VECTORS_FILE = "vectors.bin"
+_SCALES_FILE = "scales.bin"
+_CHUNKS_FILE = "chunks.sqlite"
+_IVF_FILES = ("ivf_centroids.npy", "ivf_order.npy", "ivf_offsets.npy")
+_SEARCH_BLOCK_ROWS = 65536  # 점수 계산 시 한 번에 읽는 행 수 (메모리 사용 제한)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """행별 대칭 양자화: v ≈ q * scale"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def train_ivf(matrix: np.ndarray, scales: Optional[np.ndarray], nlist: int, iterations: int = 8,
+              seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    구면 k-means로 IVF 목록 생성
+
+    Returns:
+        (중심 벡터, 목록 순서로 정렬한 행 번호, 목록별 시작 오프셋)
+    """
+    rows = matrix.shape[0]
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(rows, size=min(rows, nlist * 64), replace=False))
+    sample = _dequantize(matrix[sample_rows], None if scales is None else scales[sample_rows])
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        filled = counts > 0
+        centroids[filled] = normalize_rows(sums[filled])
+
+    assign = np.empty(rows, dtype=np.int32)
+    for start in range(0, rows, _SEARCH_BLOCK_ROWS):
+        block = _dequantize(matrix[start:start + _SEARCH_BLOCK_ROWS],
+                            None if scales is None else scales[start:start + _SEARCH_BLOCK_ROWS])
+        assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    order = np.argsort(assign, kind="stable").astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+    return centroids.astype(np.float32), order, offsets
+
+
+def _dequantize(block: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    if scales is None:
+        return np.asarray(block, dtype=np.float32)
+    return block.astype(np.float32) * scales[:, None]
+
+
+class _IndexState:
+    """검색이 잠금 없이 읽는 불변 스냅샷 (변경 시 새 객체로 교체)"""
+
+    __slots__ = ("matrix", "scales", "rows", "deleted", "ids", "id_rows", "ivf")
+
+    def __init__(self, matrix, scales, rows, deleted, ids, id_rows, ivf):
+        self.matrix: Optional[np.ndarray] = matrix
+        self.scales: Optional[np.ndarray] = scales
+        self.rows: int = rows
+        self.deleted: np.ndarray = deleted
+        self.ids: List[str] = ids
+        self.id_rows: Dict[str, int] = id_rows
+        self.ivf: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = ivf
+
+    @property
+    def live_rows(self) -> int:
+        return self.rows - int(self.deleted[:self.rows].sum())
+
+
+class MmapVectorStore(VectorStore):
+    """memmap 행렬 + SQLite 사이드카 벡터 스토어"""
+
+    def __init__(
+        self,
+        directory: str,
+        embedding_function: Embeddings,
+        dtype: str = RAG_VECTOR_DTYPE,
+        model_id: Optional[str] = None,
+    ):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"지원하지 않는 벡터 형식: {dtype}")
+        self.directory = directory
+        self._embedding = embedding_function
+        self.model_id = model_id or getattr(embedding_function, "model_id", None)
+        self._write_lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(os.path.join(directory, _CHUNKS_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, document_id TEXT, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL, deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_document_id ON chunks (document_id)")
+        self._conn.commit()
+
+        self.header = self._read_header()
+        self.needs_rebuild = False
+        if self.header is None:
+            self.header = {"format": INDEX_FORMAT_VERSION, "dtype": dtype, "dim": 0, "rows": 0,
+                           "model": self.model_id, "ivf_rows": 0}
+        elif self.model_id and self.header.get("model") and self.header["model"] != self.model_id:
+            # 다른 모델의 벡터와 섞이지 않도록 비우고 재색인 필요 표시
+            logger.warning(f"벡터 인덱스 모델 불일치 ({self.header['model']} → {self.model_id}), 인덱스를 비웁니다: {directory}")
+            self._reset(dtype)
+            self.needs_rebuild = True
+        self._state = self._open_state()
+
+    # ---- 파일 / 상태 ----
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_header(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(_HEADER_FILE), encoding="utf-8") as f:
+                header = json.load(f)
+        except FileNotFoundError:
+            return None
+        if header.get("format") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 벡터 인덱스 형식: {header.get('format')}")
+        return header
+
+    def _reset(self, dtype: str) -> None:
+        for name in (_VECTORS_FILE, _SCALES_FILE, *_IVF_FILES):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        with self._db_lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+        self.header = {"format": INDEX_FORMAT_VERSION, "dtype": dtype, "dim": 0, "rows": 0,
+                       "model": self.model_id, "ivf_rows": 0}
+        _write_json_atomic(self._path(_HEADER_FILE), self.header)
+
+    @property
+    def _is_int8(self) -> bool:
+        return self.header["dtype"] == "int8"
+
+    def _open_state(self) -> _IndexState:
+        rows, dim = self.header["rows"], self.header["dim"]
+        matrix = scales = None
+        if rows and dim:
+            matrix = np.memmap(self._path(_VECTORS_FILE), mode="r",
+                               dtype=np.int8 if self._is_int8 else np.float32, shape=(rows, dim))
+            if self._is_int8:
+                scales = np.memmap(self._path(_SCALES_FILE), mode="r", dtype=np.float32, shape=(rows,))
+
+        ids: List[str] = [""] * rows
+        deleted = np.ones(rows, dtype=bool)  # 헤더에 없는 행(쓰기 중단)은 삭제로 취급
+        with self._db_lock:
+            # 헤더보다 뒤의 행은 쓰기가 끝나지 않은 것이므로 버림
+            self._conn.execute("DELETE FROM chunks WHERE row >= ?", (rows,))
+            self._conn.commit()
+            for row, chunk_id, is_deleted in self._conn.execute("SELECT row, id, deleted FROM chunks"):
+                ids[row] = chunk_id
+                deleted[row] = bool(is_deleted)
+        id_rows = {chunk_id: row for row, chunk_id in enumerate(ids) if chunk_id and not deleted[row]}
+
+        ivf = None
+        ivf_rows = self.header.get("ivf_rows", 0)
+        if ivf_rows and all(os.path.exists(self._path(name)) for name in _IVF_FILES):
+            ivf = tuple(np.load(self._path(name), mmap_mode="r") for name in _IVF_FILES)
+        return _IndexState(matrix, scales, rows, deleted, ids, id_rows, ivf)
+
+    def _write_header(self, **changes: Any) -> None:
+        self.header = {**self.header, **changes}
+        _write_json_atomic(self._path(_HEADER_FILE), self.header)
+
+    # ---- 쓰기 ----
+
+    def add_vectors(self, ids: List[str], vectors: np.ndarray, texts: List[str],
+                    metadatas: List[Dict[str, Any]]) -> List[str]:
+        """임베딩이 끝난 벡터 추가 (같은 ID가 있으면 교체)"""
+        if not ids:
+            return []
+        vectors = normalize_rows(vectors)
+        with self._write_lock:
+            state = self._state
+            if self.header["dim"] and vectors.shape[1] != self.header["dim"]:
+                raise ValueError(f"벡터 차원 불일치: {vectors.shape[1]} != {self.header['dim']}")
+            replaced = [state.id_rows[i] for i in ids if i in state.id_rows]
+            if replaced:
+                self._mark_deleted(replaced)
+
+            start = self.header["rows"]
+            self._truncate_to_header(start, vectors.shape[1])
+            if self._is_int8:
+                quantized, scales = quantize_int8(vectors)
+                with open(self._path(_VECTORS_FILE), "ab") as f:
+                    f.write(quantized.tobytes())
+                with open(self._path(_SCALES_FILE), "ab") as f:
+                    f.write(scales.tobytes())
+            else:
+                with open(self._path(_VECTORS_FILE), "ab") as f:
+                    f.write(vectors.astype(np.float32).tobytes())
+
+            with self._db_lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (row, id, document_id, text, metadata, deleted) VALUES (?, ?, ?, ?, ?, 0)",
+                    [
+                        (start + offset, chunk_id, str(metadata.get("document_id", "")), text,
+                         json.dumps(metadata, ensure_ascii=False, default=str))
+                        for offset, (chunk_id, text, metadata) in enumerate(zip(ids, texts, metadatas))
+                    ],
+                )
+                self._conn.commit()
+            self._write_header(dim=vectors.shape[1], rows=start + len(ids))
+            self._state = self._open_state()
+            self._maybe_train_ivf()
+        return list(ids)
+
+    def _truncate_to_header(self, rows: int, dim: int) -> None:
+        """헤더에 기록되기 전에 중단된 쓰기의 꼬리 바이트 제거 (새 행이 어긋나지 않도록)"""
+        itemsize = 1 if self._is_int8 else 4
+        for name, size in ((_VECTORS_FILE, rows * dim * itemsize), (_SCALES_FILE, rows * 4)):
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            ids = [content_hash(text) for text in texts]
+        if not texts:
+            return []
+        vectors = np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)
+        return self.add_vectors(list(ids), vectors, texts, metadatas)
+
+    def _mark_deleted(self, rows: List[int]) -> None:
+        with self._db_lock:
+            self._conn.executemany("UPDATE chunks SET deleted = 1 WHERE row = ?", [(row,) for row in rows])
+            self._conn.commit()
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._write_lock:
+            rows = [self._state.id_rows[i] for i in ids if i in self._state.id_rows]
+            if not rows:
+                return False
+            self._mark_deleted(rows)
+            self._state = self._open_state()
+            state = self._state
+            if state.rows and 1 - state.live_rows / state.rows >= RAG_VECTOR_COMPACT_RATIO:
+                self.compact()
+        return True
+
+    def compact(self) -> None:
+        """삭제된 행을 제거하고 파일을 다시 씀 (기존 memmap은 이전 파일을 계속 참조하므로 검색 중에도 안전)"""
+        with self._write_lock:
+            state = self._state
+            live = np.flatnonzero(~state.deleted[:state.rows])
+            if state.matrix is not None:
+                np.asarray(state.matrix[live]).tofile(self._path(_VECTORS_FILE + ".tmp"))
+                if state.scales is not None:
+                    np.asarray(state.scales[live]).tofile(self._path(_SCALES_FILE + ".tmp"))
+            with self._db_lock:
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "CREATE TABLE chunks_compact AS SELECT ROW_NUMBER() OVER (ORDER BY row) - 1 AS new_row, "
+                    "id, document_id, text, metadata FROM chunks WHERE deleted = 0"
+                )
+                self._conn.execute("DELETE FROM chunks")
+                self._conn.execute(
+                    "INSERT INTO chunks (row, id, document_id, text, metadata, deleted) "
+                    "SELECT new_row, id, document_id, text, metadata, 0 FROM chunks_compact"
+                )
+                self._conn.execute("DROP TABLE chunks_compact")
+                if state.matrix is not None:
+                    os.replace(self._path(_VECTORS_FILE + ".tmp"), self._path(_VECTORS_FILE))
+                    if state.scales is not None:
+                        os.replace(self._path(_SCALES_FILE + ".tmp"), self._path(_SCALES_FILE))
+                self._conn.commit()
+            self._write_header(rows=int(len(live)), ivf_rows=0)
+            self._state = self._open_state()
+            self._maybe_train_ivf()
+            logger.info(f"벡터 인덱스 압축: {state.rows}행 → {len(live)}행 ({self.directory})")
+
+    def _maybe_train_ivf(self) -> None:
+        """행이 충분히 많고, 학습 이후 추가된 행이 25%를 넘으면 IVF 다시 학습"""
+        state = self._state
+        ivf_rows = self.header.get("ivf_rows", 0)
+        if state.rows < RAG_IVF_MIN_ROWS or (ivf_rows and state.rows - ivf_rows <= ivf_rows * 0.25):
+            return
+        nlist = max(1, int(np.sqrt(state.rows)))
+        centroids, order, offsets = train_ivf(state.matrix, state.scales, nlist)
+        for name, array in zip(_IVF_FILES, (centroids, order, offsets)):
+            np.save(self._path(name + ".tmp.npy"), array)
+            os.replace(self._path(name + ".tmp.npy"), self._path(name))
+        self._write_header(ivf_rows=state.rows)
+        self._state = self._open_state()
+
+    def close(self) -> None:
+        """SQLite 연결을 닫고 memmap 참조를 놓음 (진행 중인 검색이 끝나면 매핑 해제)"""
+        with self._write_lock:
+            self._state = _IndexState(None, None, 0, np.ones(0, dtype=bool), [], {}, None)
+            with self._db_lock:
+                self._conn.close()
+
+    def persist(self) -> None:
+        """쓰기는 즉시 파일에 반영되므로 할 일 없음 (Chroma 인터페이스 호환)"""
+
+    # ---- 읽기 ----
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        """Chroma.get()과 같은 형식으로 살아 있는 청크 조회 (where는 메타데이터 일치 조건)"""
+        include = ["documents", "metadatas"] if include is None else include
+        where = dict(where or {})
+        query = "SELECT row, id, text, metadata FROM chunks WHERE deleted = 0"
+        params: List[Any] = []
+        if "document_id" in where:
+            query += " AND document_id = ?"
+            params.append(str(where.pop("document_id")))
+        query += " ORDER BY row"
+        with self._db_lock:
+            rows = self._conn.execute(query, params).fetchall()
+        if ids is not None:
+            wanted = set(ids)
+            rows = [row for row in rows if row[1] in wanted]
+
+        result: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        state = self._state
+        for row, chunk_id, text, metadata_json in rows:
+            metadata = json.loads(metadata_json)
+            if any(metadata.get(key) != value for key, value in where.items()):
+                continue
+            result["ids"].append(chunk_id)
+            result["documents"].append(text)
+            result["metadatas"].append(metadata)
+            if "embeddings" in include and row < state.rows:
+                vector = _dequantize(state.matrix[row:row + 1], None if state.scales is None else state.scales[row:row + 1])
+                result["embeddings"].append(vector[0].tolist())
+        for key in ("documents", "metadatas", "embeddings"):
+            if key not in include:
+                result[key] = None
+        return result
+
+    def __len__(self) -> int:
+        return self._state.live_rows
+
+    def _candidate_rows(self, state: _IndexState, query: np.ndarray, nprobe: int) -> Optional[np.ndarray]:
+        """IVF 탐색 대상 행 (IVF가 없으면 None = 전체)"""
+        if state.ivf is None:
+            return None
+        centroids, order, offsets = state.ivf
+        probes = np.argsort(-(centroids @ query))[:nprobe]
+        parts = [np.asarray(order[offsets[p]:offsets[p + 1]]) for p in probes]
+        # 학습 이후 추가된 행은 목록에 없으므로 항상 탐색
+        ivf_rows = int(offsets[-1])
+        if state.rows > ivf_rows:
+            parts.append(np.arange(ivf_rows, state.rows))
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def search_vector(self, query_vector: Any, k: int = 4, nprobe: int = RAG_IVF_NPROBE) -> List[Tuple[int, float]]:
+        """정규화된 질문 벡터로 (행 번호, 코사인 유사도) top-k"""
+        state = self._state
+        if state.matrix is None or k <= 0:
+            return []
+        query = normalize_rows(np.asarray(query_vector, dtype=np.float32)[np.newaxis, :])[0]
+        candidates = self._candidate_rows(state, query, nprobe)
+
+        best_rows: List[np.ndarray] = []
+        best_scores: List[np.ndarray] = []
+        total = state.rows if candidates is None else len(candidates)
+        for start in range(0, total, _SEARCH_BLOCK_ROWS):
+            if candidates is None:
+                rows = np.arange(start, min(start + _SEARCH_BLOCK_ROWS, total))
+                block = state.matrix[rows[0]:rows[-1] + 1]
+                scales = None if state.scales is None else state.scales[rows[0]:rows[-1] + 1]
+            else:
+                rows = candidates[start:start + _SEARCH_BLOCK_ROWS]
+                block = state.matrix[rows]
+                scales = None if state.scales is None else state.scales[rows]
+            scores = np.asarray(block, dtype=np.float32) @ query
+            if scales is not None:
+                scores *= scales
+            scores[state.deleted[rows]] = -np.inf
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+                rows, scores = rows[top], scores[top]
+            best_rows.append(rows)
+            best_scores.append(scores)
+
+        if not best_rows:
+            return []
+        rows = np.concatenate(best_rows)
+        scores = np.concatenate(best_scores)
+        order = np.argsort(-scores)[:k]
+        return [(int(rows[i]), float(scores[i])) for i in order if np.isfinite(scores[i])]
+
+    def _documents_for_rows(self, rows: List[int]) -> Dict[int, Document]:
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        with self._db_lock:
+            fetched = self._conn.execute(
+                f"SELECT row, text, metadata FROM chunks WHERE row IN ({placeholders})", rows
+            ).fetchall()
+        return {row: Document(page_content=text, metadata=json.loads(metadata)) for row, text, metadata in fetched}
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        # 필터가 있으면 더 많이 찾은 뒤 메타데이터로 거름
+        hits = self.search_vector(embedding, k * 4 if filter else k)
+        documents = self._documents_for_rows([row for row, _ in hits])
+        results = []
+        for row, score in hits:
+            document = documents.get(row)
+            if document is None:
+                continue
+            if filter and any(document.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            results.append((document, score))
+        return results[:k]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, kwargs.get("filter"))]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, kwargs.get("filter"))]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # 코사인 유사도 [-1, 1] → [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, directory: str = "./rag_index", **kwargs: Any) -> "MmapVectorStore":
+        store = cls(directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    def get_stats(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "rows": state.rows,
+            "live_rows": state.live_rows,
+            "dim": self.header["dim"],
+            "ivf_lists": 0 if state.ivf is None else int(len(state.ivf[0])),
+        }
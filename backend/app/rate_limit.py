@@ -0,0 +1,281 @@
+"""
+분석 요청 허용 제어(admission control) 모듈
+
+사용자 ID와 API 키(기기)별 토큰 버킷으로 분석 엔드포인트의 처리량을 제한합니다.
+요청 비용은 레코딩 길이에 비례하므로 24시간 레코딩은 10초 스트립보다 많은 토큰을 소모합니다.
+
+- 인메모리 백엔드: 워커 하나일 때
+- SQLite 백엔드: 같은 호스트의 여러 워커가 버킷을 공유할 때 (예: /dev/shm 경로)
+  잠금 대기가 있을 수 있으므로 이벤트 루프를 막지 않도록 스레드 풀에서 호출
+"""
+
+import os
+import math
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from .api_keys import hash_api_key
+from .metrics import registry
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 허용 제어 설정
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_CAPACITY = float(os.getenv("RATE_LIMIT_CAPACITY", "120"))  # 버킷 최대 토큰 (버스트 허용량)
+RATE_LIMIT_REFILL_PER_SECOND = float(os.getenv("RATE_LIMIT_REFILL_PER_SECOND", "0.5"))
+RATE_LIMIT_REQUEST_COST = float(os.getenv("RATE_LIMIT_REQUEST_COST", "1"))  # 요청당 기본 비용
+RATE_LIMIT_SECONDS_PER_TOKEN = float(os.getenv("RATE_LIMIT_SECONDS_PER_TOKEN", "600"))  # 레코딩 10분당 1토큰
+RATE_LIMIT_SHARED_PATH = os.getenv("RATE_LIMIT_SHARED_PATH", "")  # 예: /dev/shm/nottoday-ratelimit.sqlite
+
+# 인메모리 백엔드가 가득 찬(유휴) 버킷을 정리하기 시작하는 버킷 수
+_PRUNE_THRESHOLD = 10000
+
+admission_decisions = registry.counter(
+    "ecg_admission_decisions_total",
+    "분석 요청 허용 제어 결과",
+    ("outcome",),
+)
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _plan(
+    buckets: Dict[str, Tuple[float, float]],
+    keys: Sequence[str],
+    cost: float,
+    now: float,
+    capacity: float,
+    rate: float,
+) -> Tuple[float, Dict[str, float]]:
+    """
+    모든 버킷에서 cost만큼 차감할 수 있는지 계산
+
+    Returns:
+        (대기 시간(초), 버킷별 갱신된 토큰 수) - 대기 시간이 0이면 허용
+    """
+    refilled = {}
+    wait = 0.0
+    for key in keys:
+        tokens, updated = buckets.get(key, (capacity, now))
+        tokens = _refill(tokens, updated, now, capacity, rate)
+        refilled[key] = tokens
+        if tokens < cost:
+            wait = max(wait, (cost - tokens) / rate if rate > 0 else math.inf)
+    return wait, refilled
+
+
+class MemoryBucketBackend:
+    """프로세스 내 토큰 버킷 저장소"""
+
+    # consume()이 I/O 없이 끝나므로 이벤트 루프에서 바로 호출
+    blocking = False
+
+    def __init__(self):
+        # key -> (토큰 수, 갱신 시각(monotonic))
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, keys: Sequence[str], cost: float, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            wait, refilled = _plan(self._buckets, keys, cost, now, capacity, rate)
+            if wait > 0:
+                for key, tokens in refilled.items():
+                    self._buckets[key] = (tokens, now)
+                return wait
+            for key, tokens in refilled.items():
+                self._buckets[key] = (tokens - cost, now)
+            if len(self._buckets) > _PRUNE_THRESHOLD:
+                self._prune(now, capacity, rate)
+            return 0.0
+
+    def _prune(self, now: float, capacity: float, rate: float) -> None:
+        """다시 가득 찬 버킷은 새 버킷과 같으므로 제거"""
+        full = [
+            key for key, (tokens, updated) in self._buckets.items()
+            if _refill(tokens, updated, now, capacity, rate) >= capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+
+
+class SQLiteBucketBackend:
+    """
+    같은 호스트의 워커들이 공유하는 SQLite 기반 토큰 버킷 저장소
+
+    BEGIN IMMEDIATE 트랜잭션으로 여러 버킷의 확인과 차감을 원자적으로 수행합니다.
+    다른 워커가 잠금을 잡고 있으면 최대 1초까지 기다리므로 스레드 풀에서 호출합니다.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def consume(self, keys: Sequence[str], cost: float, capacity: float, rate: float) -> float:
+        conn = self._connection()
+        # 워커 간 공유를 위해 벽시계 시간 사용
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" for _ in keys)
+            rows = conn.execute(
+                f"SELECT key, tokens, updated FROM buckets WHERE key IN ({placeholders})", tuple(keys)
+            ).fetchall()
+            buckets = {key: (tokens, updated) for key, tokens, updated in rows}
+            wait, refilled = _plan(buckets, keys, cost, now, capacity, rate)
+            remaining = refilled if wait > 0 else {key: tokens - cost for key, tokens in refilled.items()}
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                [(key, tokens, now) for key, tokens in remaining.items()],
+            )
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class RateLimitExceeded(Exception):
+    """토큰이 부족하여 요청이 거부됨"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"요청 한도를 초과했습니다. {retry_after_header(retry_after)}초 후 다시 시도하세요.")
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After 헤더 값 (정수 초, 올림)"""
+    return str(max(1, math.ceil(seconds)))
+
+
+class TokenBucketLimiter:
+    """레코딩 길이로 비용을 매기는 토큰 버킷 허용 제어기"""
+
+    def __init__(
+        self,
+        backend=None,
+        capacity: float = RATE_LIMIT_CAPACITY,
+        refill_per_second: float = RATE_LIMIT_REFILL_PER_SECOND,
+        request_cost: float = RATE_LIMIT_REQUEST_COST,
+        seconds_per_token: float = RATE_LIMIT_SECONDS_PER_TOKEN,
+        enabled: bool = RATE_LIMIT_ENABLED,
+    ):
+        self.backend = backend or MemoryBucketBackend()
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.request_cost = request_cost
+        self.seconds_per_token = seconds_per_token
+        self.enabled = enabled
+
+    def cost_for(self, recording_seconds: float) -> float:
+        """
+        레코딩 길이(초)에 따른 요청 비용
+
+        버킷 용량보다 큰 요청도 가득 찬 버킷으로는 받아들일 수 있도록 용량으로 제한합니다.
+        """
+        cost = self.request_cost + max(0.0, recording_seconds) / self.seconds_per_token
+        return min(cost, self.capacity)
+
+    async def acquire(self, keys: Sequence[str], cost: float) -> float:
+        """
+        모든 키의 버킷에서 cost만큼 토큰을 차감
+
+        Returns:
+            0이면 허용, 양수이면 다시 시도할 수 있을 때까지의 시간(초)
+        """
+        if not self.enabled or not keys:
+            return 0.0
+        try:
+            if getattr(self.backend, "blocking", True):
+                wait = await asyncio.to_thread(
+                    self.backend.consume, list(keys), cost, self.capacity, self.refill_per_second
+                )
+            else:
+                wait = self.backend.consume(list(keys), cost, self.capacity, self.refill_per_second)
+        except Exception as e:
+            # 저장소 오류로 서비스 전체를 막지 않음
+            logger.warning(f"허용 제어 저장소 오류 (요청 허용): {e}")
+            admission_decisions.inc(outcome="error")
+            return 0.0
+        admission_decisions.inc(outcome="rejected" if wait > 0 else "admitted")
+        return wait
+
+    async def check(self, keys: Sequence[str], recording_seconds: float) -> None:
+        """토큰이 부족하면 RateLimitExceeded 발생"""
+        wait = await self.acquire(keys, self.cost_for(recording_seconds))
+        if wait > 0:
+            raise RateLimitExceeded(wait)
+
+
+def _create_backend():
+    if RATE_LIMIT_SHARED_PATH:
+        try:
+            return SQLiteBucketBackend(RATE_LIMIT_SHARED_PATH)
+        except Exception as e:
+            logger.warning(f"공유 허용 제어 저장소를 열 수 없어 인메모리 버킷을 사용합니다 ({RATE_LIMIT_SHARED_PATH}): {e}")
+    return MemoryBucketBackend()
+
+
+# 글로벌 허용 제어기
+admission_limiter = TokenBucketLimiter(_create_backend())
+
+
+def get_admission_limiter() -> TokenBucketLimiter:
+    return admission_limiter
+
+
+def recording_seconds(sample_count: int, sampling_rate: float) -> float:
+    """샘플 수와 샘플링 레이트로 레코딩 길이(초) 계산"""
+    return sample_count / sampling_rate if sampling_rate > 0 else 0.0
+
+
+def admission_keys(request: Request, user_id: Optional[str]) -> List[str]:
+    """요청의 사용자 ID와 API 키(기기)별 버킷 키"""
+    keys = []
+    if user_id:
+        keys.append(f"user:{user_id}")
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        keys.append(f"apikey:{hash_api_key(api_key)}")
+    return keys
+
+
+async def enforce_admission(request: Request, user_id: Optional[str], recording_secs: float) -> None:
+    """
+    분석 요청 허용 여부 확인
+
+    Raises:
+        HTTPException: 토큰이 부족하면 Retry-After 헤더와 함께 429
+    """
+    try:
+        await admission_limiter.check(admission_keys(request, user_id), recording_secs)
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": retry_after_header(e.retry_after)},
+        )
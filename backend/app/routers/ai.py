@@ -1,10 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import httpx
-import os
+import logging
+
+from ..llm_client import LLMBackend, get_llm_backend
+from ..sse import SSE_HEADERS, format_sse_event
 
 router = APIRouter(tags=["ai"])
 
+logger = logging.getLogger(__name__)
+
 
 class AskRequest(BaseModel):
     question: str
@@ -15,26 +20,37 @@ class AskResponse(BaseModel):
     answer: str
 
 
-HF_TOKEN = os.getenv("HF_TOKEN")
-HF_MODEL_URL = "https://api-inference.huggingface.co/models/johnsnowlabs/JSL-MedLlama-3-8B-v2.0"
-
-
-async def call_medllama_remote(prompt: str) -> str:
-    headers = {"Authorization": f"Bearer {HF_TOKEN}", "Content-Type": "application/json"}
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(HF_MODEL_URL, json={"inputs": prompt}, headers=headers)
-        resp.raise_for_status()
-        data = resp.json()
-        if isinstance(data, list) and len(data) > 0 and "generated_text" in data[0]:
-            return data[0]["generated_text"]
-        return "No answer generated."
+def build_prompt(req: AskRequest) -> str:
+    return f"Context: {req.context}\nQuestion: {req.question}\nAnswer:"
 
 
 @router.post("/ask", response_model=AskResponse)
-async def ask(req: AskRequest):
-    prompt = f"Context: {req.context}\nQuestion: {req.question}\nAnswer:"
+async def ask(req: AskRequest, llm: LLMBackend = Depends(get_llm_backend)):
     try:
-        answer = await call_medllama_remote(prompt)
+        answer = await llm.generate(build_prompt(req))
         return AskResponse(answer=answer)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/ask/stream")
+async def ask_stream(req: AskRequest, llm: LLMBackend = Depends(get_llm_backend)):
+    """
+    답변을 Server-Sent Events로 스트리밍합니다.
+
+    생성 슬롯이 모두 사용 중이면 자리가 날 때까지 기다린 뒤, 답변을 `token` 이벤트로 생성되는 대로,
+    마지막에 `done` 이벤트로 전체 답변을 보냅니다. 생성 중 오류는 `error` 이벤트로 전달됩니다.
+    """
+
+    async def events():
+        parts = []
+        try:
+            async for token in llm.stream(build_prompt(req)):
+                parts.append(token)
+                yield format_sse_event("token", {"text": token})
+            yield format_sse_event("done", {"answer": "".join(parts).strip() or "No answer generated."})
+        except Exception as e:
+            logger.error(f"/ask 스트리밍 오류: {str(e)}")
+            yield format_sse_event("error", {"detail": "답변 생성 중 오류가 발생했습니다"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
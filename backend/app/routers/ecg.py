@@ -1,5 +1,7 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Body, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Body, BackgroundTasks, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import numpy as np
@@ -10,8 +12,15 @@ import tempfile
 import os
 import time
 import uuid
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from ..models.ecg import process_ecg_signal, detect_arrhythmia, extract_ecg_features
-from ..deps import get_current_user, get_db, get_async_db, get_current_active_user
+from ..deps import get_current_user, get_async_db, get_current_active_user, get_current_active_superuser
+from ..ml.ecg_cache import ECGResultCache, get_ecg_result_cache
+from ..ml.ecg_stream import StreamingECGAnalyzer
+from ..ml.waveform_pyramid import as_signal, save_waveform, read_waveform_range
+from ..metrics import timed_phase
+from ..rate_limit import RateLimitExceeded, admission_keys, enforce_admission, get_admission_limiter, recording_seconds
 import json
 import logging
 from ..services.ecg_analysis import (
@@ -23,7 +32,17 @@ from ..services.ecg_analysis import (
     detect_anomalies
 )
 from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
 from ..models.user import User
+from ..models.packed import (
+    ECG_ANALYSIS_PACKED_FIELDS,
+    ECG_RECORD_PACKED_FIELDS,
+    PackedFloatList,
+    decode_document,
+    encode_document,
+)
 from scipy import signal
 
 router = APIRouter(
@@ -34,6 +53,30 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
+# 일괄 분석 설정
+ECG_BATCH_WORKERS = int(os.getenv("ECG_BATCH_WORKERS", str(os.cpu_count() or 2)))
+ECG_BATCH_MAX_INFLIGHT = int(os.getenv("ECG_BATCH_MAX_INFLIGHT", str(ECG_BATCH_WORKERS * 2)))
+ECG_BATCH_WRITE_SIZE = int(os.getenv("ECG_BATCH_WRITE_SIZE", "100"))
+
+# 일괄 분석용 프로세스 풀 (첫 사용 시 생성)
+_batch_executor: Optional[ProcessPoolExecutor] = None
+
+# 실시간 스트리밍 설정
+ECG_STREAM_MAX_SESSIONS = int(os.getenv("ECG_STREAM_MAX_SESSIONS", "50"))
+ECG_STREAM_SEND_QUEUE = int(os.getenv("ECG_STREAM_SEND_QUEUE", "16"))
+ECG_STREAM_MAX_FRAME_SECONDS = int(os.getenv("ECG_STREAM_MAX_FRAME_SECONDS", "10"))
+ECG_STREAM_DTYPES = {"float32": "<f4", "int16": "<i2"}
+
+# 현재 워커에서 열려 있는 스트리밍 세션 수
+_active_stream_sessions = 0
+
+def get_batch_executor() -> ProcessPoolExecutor:
+    """ECG 일괄 분석에 사용하는 프로세스 풀 반환"""
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ProcessPoolExecutor(max_workers=ECG_BATCH_WORKERS)
+    return _batch_executor
+
 class ECGDataPoint(BaseModel):
     value: float
     timestamp: datetime
@@ -65,18 +108,79 @@ class ECGAnalysisResult(BaseModel):
     user_id: str = Field(..., description="사용자 ID")
     timestamp: datetime = Field(..., description="분석 시간")
     heart_rate: float = Field(..., description="심박수(BPM)")
-    rr_intervals: List[float] = Field(..., description="RR 간격(초)")
+    rr_intervals: PackedFloatList = Field(..., description="RR 간격(초)")
     analysis_result: Dict[str, Any] = Field(..., description="분석 결과")
     arrhythmia_detected: bool = Field(..., description="부정맥 탐지 여부")
     confidence: float = Field(..., description="분석 신뢰도")
     risk_level: str = Field(..., description="위험 수준")
     recommendation: str = Field(..., description="권장 사항")
 
+def parse_ecg_file(filename: str, contents: bytes) -> np.ndarray:
+    """
+    업로드된 ECG 파일(CSV, JSON, TXT)을 1차원 신호 배열로 변환합니다.
+    
+    파싱에 실패하면 파일 형식이 포함된 메시지와 함께 ValueError를 발생시킵니다.
+    """
+    if filename.endswith('.csv'):
+        try:
+            # CSV 파일을 pandas DataFrame으로 변환
+            df = pd.read_csv(io.BytesIO(contents))
+            return df['ecg'].values if 'ecg' in df.columns else df.iloc[:, 0].values
+        except Exception as e:
+            raise ValueError(f"CSV 파싱 오류: {str(e)}")
+    
+    if filename.endswith('.json'):
+        try:
+            # JSON 파일 파싱
+            data = json.loads(contents)
+            return np.array(data.get('ecg_data', data.get('data', [])))
+        except Exception as e:
+            raise ValueError(f"JSON 파싱 오류: {str(e)}")
+    
+    if filename.endswith('.txt'):
+        try:
+            # TXT 파일은 한 줄에 하나의 ECG 값이 있다고 가정
+            lines = contents.decode('utf-8').strip().split('\n')
+            return np.array([float(line.strip()) for line in lines if line.strip()])
+        except Exception as e:
+            raise ValueError(f"TXT 파싱 오류: {str(e)}")
+    
+    raise ValueError("지원되지 않는 파일 형식입니다. CSV, JSON 또는 TXT 파일만 지원합니다.")
+
+def analyze_ecg_upload(ecg_data: np.ndarray) -> Dict[str, Any]:
+    """/analyze 업로드 분석 파이프라인 (전처리 → QRS 검출 → 심박수 → 부정맥 → 분류)"""
+    # ECG 데이터 전처리
+    processed_data = preprocess_ecg_data(ecg_data)
+    
+    # QRS 복합체 검출
+    qrs_peaks = detect_qrs_complex(processed_data)
+    
+    # 심박수 계산
+    heart_rate = calculate_heart_rate(qrs_peaks, sampling_rate=250)  # 샘플링 레이트는 데이터에 따라 조정
+    
+    # 부정맥 검출
+    arrhythmia_results = detect_arrhythmia(processed_data, qrs_peaks)
+    
+    # ECG 신호 분류
+    classification_result = classify_ecg_signal(processed_data)
+    
+    return {
+        "heart_rate": heart_rate,
+        "arrhythmia_detected": arrhythmia_results["arrhythmia_detected"],
+        "arrhythmia_type": arrhythmia_results["arrhythmia_type"],
+        "classification": classification_result["classification"],
+        "confidence": classification_result["confidence"],
+        "risk_level": classification_result["risk_level"],
+        "recommendation": classification_result["recommendation"]
+    }
+
 @router.post("/analyze", response_model=Dict[str, Any])
 async def analyze_ecg_data(
+    request: Request,
     file: UploadFile = File(...),
     current_user = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db),
+    cache: ECGResultCache = Depends(get_ecg_result_cache)
 ):
     """
     업로드된 ECG 데이터를 분석하여 심박수, 부정맥 여부 등의 정보를 반환합니다.
@@ -93,64 +197,33 @@ async def analyze_ecg_data(
         contents = await file.read()
         
         # 파일 형식에 따라 데이터 파싱
-        ecg_data = None
-        if file.filename.endswith('.csv'):
-            try:
-                # CSV 파일을 pandas DataFrame으로 변환
-                df = pd.read_csv(pd.io.common.BytesIO(contents))
-                ecg_data = df['ecg'].values if 'ecg' in df.columns else df.iloc[:, 0].values
-            except Exception as e:
-                logger.error(f"CSV 파싱 오류: {str(e)}")
-                raise HTTPException(status_code=400, detail=f"CSV 파싱 오류: {str(e)}")
+        try:
+            ecg_data = parse_ecg_file(file.filename, contents)
+        except ValueError as e:
+            logger.error(str(e))
+            raise HTTPException(status_code=400, detail=str(e))
         
-        elif file.filename.endswith('.json'):
-            try:
-                # JSON 파일 파싱
-                data = json.loads(contents)
-                ecg_data = np.array(data.get('ecg_data', data.get('data', [])))
-            except Exception as e:
-                logger.error(f"JSON 파싱 오류: {str(e)}")
-                raise HTTPException(status_code=400, detail=f"JSON 파싱 오류: {str(e)}")
-        
-        elif file.filename.endswith('.txt'):
-            try:
-                # TXT 파일은 한 줄에 하나의 ECG 값이 있다고 가정
-                lines = contents.decode('utf-8').strip().split('\n')
-                ecg_data = np.array([float(line.strip()) for line in lines if line.strip()])
-            except Exception as e:
-                logger.error(f"TXT 파싱 오류: {str(e)}")
-                raise HTTPException(status_code=400, detail=f"TXT 파싱 오류: {str(e)}")
-        
-        # ECG 데이터 전처리
-        processed_data = preprocess_ecg_data(ecg_data)
-        
-        # QRS 복합체 검출
-        qrs_peaks = detect_qrs_complex(processed_data)
+        # 레코딩 길이에 비례한 요청 한도 확인
+        await enforce_admission(request, current_user.id, recording_seconds(len(ecg_data), 250))
         
-        # 심박수 계산
-        heart_rate = calculate_heart_rate(qrs_peaks, sampling_rate=250)  # 샘플링 레이트는 데이터에 따라 조정
+        # 동일한 레코딩의 이전 분석 결과 확인
+        cache_key = cache.key_for(ecg_data, 250, pipeline="analyze")
+        cached_result = await cache.get(cache_key)
         
-        # 부정맥 검출
-        arrhythmia_results = detect_arrhythmia(processed_data, qrs_peaks)
-        
-        # ECG 신호 분류
-        classification_result = classify_ecg_signal(processed_data)
+        if cached_result is None:
+            with timed_phase("analysis"):
+                cached_result = analyze_ecg_upload(ecg_data)
+            await cache.set(cache_key, cached_result)
         
         # 분석 결과 저장 (사용자와 연결)
         analysis_result = {
             "user_id": current_user.id,
             "timestamp": datetime.now().isoformat(),
-            "heart_rate": heart_rate,
-            "arrhythmia_detected": arrhythmia_results["arrhythmia_detected"],
-            "arrhythmia_type": arrhythmia_results["arrhythmia_type"],
-            "classification": classification_result["classification"],
-            "confidence": classification_result["confidence"],
-            "risk_level": classification_result["risk_level"],
-            "recommendation": classification_result["recommendation"]
+            **cached_result
         }
         
-        # 데이터베이스에 결과 저장
-        db.ecg_analysis.insert_one(analysis_result)
+        # 데이터베이스에 결과 저장 (긴 배열은 압축 바이너리로)
+        await db.ecg_analysis.insert_one(encode_document(analysis_result, ECG_ANALYSIS_PACKED_FIELDS))
         
         # 결과에서 MongoDB ObjectId 제거
         analysis_result.pop("_id", None)
@@ -166,31 +239,42 @@ async def analyze_ecg_data(
             detail=f"ECG 분석 중 오류가 발생했습니다: {str(e)}"
         )
 
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_ecg_cache_stats(
+    current_user: User = Depends(get_current_active_superuser),
+    cache: ECGResultCache = Depends(get_ecg_result_cache)
+):
+    """
+    ECG 분석 결과 캐시의 적중/미스 통계를 반환합니다. (관리자 전용)
+    """
+    return cache.get_stats()
+
 @router.get("/history", response_model=List[Dict[str, Any]])
 async def get_ecg_history(
     limit: int = 10,
     skip: int = 0,
     current_user = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
     """
     사용자의 ECG 분석 기록을 반환합니다.
     """
     try:
         # 사용자의 ECG 분석 기록 조회
-        history = list(
+        history = await (
             db.ecg_analysis
             .find({"user_id": current_user.id})
             .sort("timestamp", -1)
             .skip(skip)
             .limit(limit)
+            .to_list(length=limit)
         )
         
         # MongoDB ObjectId를 문자열로 변환
         for item in history:
             item["_id"] = str(item["_id"])
         
-        return history
+        return decode_document(history)
     except Exception as e:
         logger.error(f"ECG 기록 조회 중 오류 발생: {str(e)}")
         raise HTTPException(
@@ -203,7 +287,7 @@ async def get_ecg_stats(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     current_user = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
     """
     사용자의 ECG 분석 통계를 반환합니다.
@@ -219,8 +303,11 @@ async def get_ecg_stats(
             else:
                 query["timestamp"] = {"$lte": end_date}
         
-        # 통계 계산을 위한 데이터 조회
-        ecg_records = list(db.ecg_analysis.find(query))
+        # 통계 계산을 위한 데이터 조회 (필요한 필드만)
+        ecg_records = await db.ecg_analysis.find(
+            query,
+            {"heart_rate": 1, "arrhythmia_detected": 1, "arrhythmia_type": 1, "risk_level": 1}
+        ).to_list(length=None)
         
         if not ecg_records:
             return {
@@ -272,7 +359,7 @@ async def get_ecg_stats(
 async def delete_ecg_record(
     record_id: str,
     current_user = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
     """
     특정 ECG 분석 기록을 삭제합니다.
@@ -288,7 +375,7 @@ async def delete_ecg_record(
             )
         
         # 기록 삭제
-        result = db.ecg_analysis.delete_one({
+        result = await db.ecg_analysis.delete_one({
             "_id": ObjectId(record_id),
             "user_id": current_user.id
         })
@@ -311,8 +398,10 @@ async def delete_ecg_record(
 
 @router.post("/upload", response_model=Dict[str, Any])
 async def upload_ecg_data(
+    request: Request,
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    sampling_rate: int = Query(250, ge=50, le=2000, description="샘플링 레이트(Hz)"),
     current_user: User = Depends(get_current_active_user),
     db = Depends(get_async_db)
 ):
@@ -336,11 +425,20 @@ async def upload_ecg_data(
         elif file.filename.endswith('.npy'):
             data = np.load(io.BytesIO(contents))
         
+        # 레코딩 길이에 비례한 요청 한도 확인
+        try:
+            ecg_signal = as_signal(data)
+            sample_count = ecg_signal.size if ecg_signal is not None else 0
+        except (TypeError, ValueError):
+            sample_count = 0
+        await enforce_admission(request, current_user.id, recording_seconds(sample_count, sampling_rate))
+        
         # ECG 메타데이터 생성
         ecg_record = {
             "user_id": current_user.id,
             "filename": file.filename,
             "upload_date": datetime.utcnow(),
+            "sampling_rate": sampling_rate,
             "processed": False,
             "analysis_results": None,
             "anomalies_detected": False
@@ -360,7 +458,8 @@ async def upload_ecg_data(
             db, 
             record_id,
             file_path,
-            current_user.id
+            current_user.id,
+            sampling_rate
         )
         
         return {
@@ -368,13 +467,15 @@ async def upload_ecg_data(
             "record_id": record_id
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"데이터 처리 중 오류가 발생했습니다: {str(e)}"
         )
 
-async def process_ecg_data(data, db, record_id, file_path, user_id):
+async def process_ecg_data(data, db, record_id, file_path, user_id, sampling_rate: int = 250):
     """
     ECG 데이터 분석 백그라운드 작업
     """
@@ -385,16 +486,27 @@ async def process_ecg_data(data, db, record_id, file_path, user_id):
         # 이상 징후 탐지
         anomalies = detect_anomalies(data, analysis_results)
         
+        # 플롯용 다중 해상도 파형 생성 (실패해도 분석 결과는 저장)
+        waveform = None
+        try:
+            ecg_signal = as_signal(data)
+            if ecg_signal is not None and ecg_signal.size > 0:
+                waveform = await run_in_threadpool(save_waveform, os.path.splitext(file_path)[0], ecg_signal)
+                waveform["sampling_rate"] = sampling_rate
+        except Exception as e:
+            logger.warning(f"ECG 파형 피라미드 생성 오류 ({record_id}): {str(e)}")
+        
         # 분석 결과 업데이트
         await db.ecg_records.update_one(
             {"_id": ObjectId(record_id)},
-            {"$set": {
+            {"$set": encode_document({
                 "processed": True,
                 "analysis_results": analysis_results,
                 "anomalies_detected": len(anomalies) > 0,
                 "anomalies": anomalies,
+                "waveform": waveform,
                 "processed_date": datetime.utcnow()
-            }}
+            }, ECG_RECORD_PACKED_FIELDS)}
         )
         
         # 심각한 이상 징후가 발견되면 알림 발송
@@ -437,7 +549,7 @@ async def get_ecg_records(
     records = []
     async for record in cursor:
         record["id"] = str(record.pop("_id"))
-        records.append(record)
+        records.append(decode_document(record))
     
     return records
 
@@ -466,14 +578,89 @@ async def get_ecg_record(
             )
         
         record["id"] = str(record.pop("_id"))
-        return record
+        return decode_document(record)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"레코드 조회 중 오류가 발생했습니다: {str(e)}"
         )
 
+@router.get("/records/{record_id}/waveform", response_model=Dict[str, Any])
+async def get_ecg_waveform(
+    record_id: str,
+    start: float = Query(0.0, ge=0, description="구간 시작(초)"),
+    end: Optional[float] = Query(None, gt=0, description="구간 끝(초), 생략 시 레코딩 끝"),
+    width: int = Query(1000, ge=10, le=10000, description="플롯 너비(픽셀)"),
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_async_db)
+):
+    """
+    ECG 레코드의 파형을 요청 구간과 화면 너비에 맞는 해상도로 반환
+    
+    넓은 구간은 미리 계산된 최소/최대 엔벨로프 레벨에서 읽고,
+    충분히 확대된 구간만 원본 샘플을 반환합니다.
+    """
+    if not ObjectId.is_valid(record_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="유효하지 않은 기록 ID입니다."
+        )
+    
+    record = await db.ecg_records.find_one(
+        {"_id": ObjectId(record_id)},
+        {"user_id": 1, "waveform": 1}
+    )
+    
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="요청한 ECG 레코드를 찾을 수 없습니다."
+        )
+    
+    if record["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="이 레코드에 접근할 권한이 없습니다."
+        )
+    
+    waveform = record.get("waveform")
+    if not waveform:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="이 레코드의 파형 데이터가 아직 준비되지 않았습니다."
+        )
+    
+    sampling_rate = waveform["sampling_rate"]
+    num_samples = waveform["num_samples"]
+    start_sample = min(int(start * sampling_rate), num_samples)
+    end_sample = num_samples if end is None else min(int(end * sampling_rate), num_samples)
+    
+    if end_sample <= start_sample:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="구간 끝은 시작보다 커야 합니다."
+        )
+    
+    data = await run_in_threadpool(
+        read_waveform_range,
+        waveform["path"],
+        start_sample,
+        end_sample,
+        width,
+        waveform["levels"]
+    )
+    
+    return {
+        "record_id": record_id,
+        "sampling_rate": sampling_rate,
+        "start": start_sample / sampling_rate,
+        "end": end_sample / sampling_rate,
+        **data
+    }
+
 @router.delete("/records/{record_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_ecg_record(
     record_id: str,
@@ -508,6 +695,7 @@ async def delete_ecg_record(
 
 @router.post("/data", response_model=dict, status_code=status.HTTP_201_CREATED)
 async def upload_ecg_data(
+    request: Request,
     data: ECGDataInput,
     background_tasks: BackgroundTasks,
     db: AsyncIOMotorDatabase = Depends(get_async_db),
@@ -522,6 +710,9 @@ async def upload_ecg_data(
             detail="다른 사용자의 데이터에 접근할 권한이 없습니다"
         )
     
+    # 레코딩 길이에 비례한 요청 한도 확인
+    await enforce_admission(request, current_user["id"], recording_seconds(len(data.data), data.sampling_rate))
+    
     # 데이터 저장
     ecg_raw_data = {
         "user_id": data.user_id,
@@ -540,6 +731,388 @@ async def upload_ecg_data(
     
     return {"status": "success", "message": "ECG 데이터가 업로드되었으며 분석이 진행 중입니다"}
 
+@router.post("/batch")
+async def batch_analyze_ecg_data(
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncIOMotorDatabase = Depends(get_async_db),
+    cache: ECGResultCache = Depends(get_ecg_result_cache),
+):
+    """
+    여러 ECG 레코딩을 한 번에 업로드하여 병렬로 분석합니다.
+    
+    요청 본문은 NDJSON(한 줄에 레코딩 하나) 또는 여러 파일을 담은 multipart 형식입니다.
+    각 항목의 처리 결과는 분석이 끝나는 대로 NDJSON 스트림으로 반환되며,
+    개별 항목의 실패는 나머지 항목의 처리에 영향을 주지 않습니다.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        items = _iter_multipart_batch_items(request)
+    elif content_type.startswith(("application/x-ndjson", "application/jsonl", "application/json")):
+        items = _iter_ndjson_batch_items(request)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="NDJSON 또는 multipart/form-data 형식만 지원합니다."
+        )
+    
+    batch_id = str(uuid.uuid4())
+    return StreamingResponse(
+        _run_ecg_batch(items, batch_id, current_user.id, db, cache, admission_keys(request, current_user.id)),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Id": batch_id},
+    )
+
+async def _iter_ndjson_batch_items(request: Request):
+    """NDJSON 본문을 줄 단위로 읽어 (항목 ID, 기기 ID, 샘플링 레이트, 신호 또는 오류) 생성"""
+    buffer = b""
+    index = 0
+    
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_ndjson_batch_item(line, index)
+                index += 1
+    
+    if buffer.strip():
+        yield _parse_ndjson_batch_item(buffer, index)
+
+def _parse_ndjson_batch_item(line: bytes, index: int):
+    try:
+        item = json.loads(line)
+    except Exception as e:
+        return str(index), None, 250, ValueError(f"JSON 파싱 오류: {str(e)}")
+    
+    item_id = str(item.get("id", index))
+    device_id = item.get("device_id")
+    sampling_rate = int(item.get("sampling_rate", 250))
+    values = item.get("ecg_data", item.get("data"))
+    if not values:
+        return item_id, device_id, sampling_rate, ValueError("ECG 데이터가 비어 있습니다.")
+    
+    try:
+        return item_id, device_id, sampling_rate, np.asarray(values, dtype=np.float64)
+    except Exception as e:
+        return item_id, device_id, sampling_rate, ValueError(f"ECG 데이터 변환 오류: {str(e)}")
+
+class _MultipartPartCollector:
+    """python-multipart 콜백으로 완성된 파트를 (헤더, 본문) 단위로 모음 (한 번에 한 파트만 메모리에 보관)"""
+    
+    def __init__(self):
+        self.completed: List[tuple] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+        self._data = bytearray()
+    
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+        }
+    
+    def _on_part_begin(self):
+        self._headers = {}
+        self._data = bytearray()
+    
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self._data += data[start:end]
+    
+    def _on_part_end(self):
+        self.completed.append((self._headers, bytes(self._data)))
+        self._data = bytearray()
+    
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+    
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+    
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = b""
+        self._value = b""
+
+async def _iter_multipart_batch_items(request: Request):
+    """
+    multipart 본문의 각 파일을 (항목 ID, 기기 ID, 샘플링 레이트, 신호 또는 오류)로 생성
+    
+    본문 전체를 버퍼링하지 않고 받은 만큼 파싱하여 완성된 파일부터 처리합니다.
+    device_id, sampling_rate 폼 필드는 그 뒤에 오는 파일에 적용되므로 파일보다 앞에 보내야 합니다.
+    """
+    _, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise ValueError("multipart 경계(boundary)가 없습니다.")
+    
+    collector = _MultipartPartCollector()
+    parser = MultipartParser(boundary, collector.callbacks())
+    device_id = None
+    sampling_rate = 250
+    
+    async for chunk in request.stream():
+        parser.write(chunk)
+        parts, collector.completed = collector.completed, []
+        for headers, contents in parts:
+            _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+            name = disposition.get(b"name", b"").decode("utf-8", "replace")
+            filename = disposition.get(b"filename")
+            
+            # 파일이 아닌 폼 필드(device_id 등)는 이후 파일에 적용
+            if filename is None:
+                if name == "device_id":
+                    device_id = contents.decode("utf-8", "replace")
+                elif name == "sampling_rate":
+                    sampling_rate = int(contents)
+                continue
+            
+            filename = filename.decode("utf-8", "replace")
+            try:
+                # pandas 파싱은 이벤트 루프 밖에서
+                yield filename, device_id, sampling_rate, await run_in_threadpool(parse_ecg_file, filename, contents)
+            except ValueError as e:
+                yield filename, device_id, sampling_rate, e
+    parser.finalize()
+
+async def _run_ecg_batch(
+    items,
+    batch_id: str,
+    user_id: str,
+    db: AsyncIOMotorDatabase,
+    cache: ECGResultCache,
+    rate_limit_keys: Optional[List[str]] = None,
+):
+    """
+    배치 항목을 프로세스 풀에서 병렬 분석하고 결과를 순서 없는 bulk_write로 저장
+    
+    동시에 처리 중인 항목 수를 ECG_BATCH_MAX_INFLIGHT로 제한하여
+    본문을 끝까지 읽지 않고도 스트리밍 방식으로 처리합니다.
+    요청 한도는 항목별로 적용되며, 한도를 넘은 항목만 오류로 반환됩니다.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_batch_executor()
+    limiter = get_admission_limiter()
+    semaphore = asyncio.Semaphore(ECG_BATCH_MAX_INFLIGHT)
+    # 루프는 태스크를 약한 참조로만 보관하므로 끝날 때까지 직접 보관
+    tasks: set = set()
+    results: asyncio.Queue = asyncio.Queue()
+    pending_writes: List[InsertOne] = []
+    pending_ids: List[str] = []
+    summary = {"total": 0, "succeeded": 0, "failed": 0, "stored": 0}
+    
+    async def analyze_item(item_id, device_id, sampling_rate, ecg_signal):
+        try:
+            cache_key = cache.key_for(ecg_signal, sampling_rate, pipeline="batch")
+            analysis_result = await cache.get(cache_key)
+            if analysis_result is None:
+                analysis_result = await loop.run_in_executor(
+                    executor, analyze_ecg, ecg_signal, sampling_rate
+                )
+                await cache.set(cache_key, analysis_result)
+            await results.put((item_id, device_id, analysis_result, None))
+        except Exception as e:
+            await results.put((item_id, device_id, None, e))
+        finally:
+            semaphore.release()
+    
+    async def produce():
+        try:
+            async for item_id, device_id, sampling_rate, parsed in items:
+                summary["total"] += 1
+                if isinstance(parsed, Exception):
+                    await results.put((item_id, device_id, None, parsed))
+                    continue
+                try:
+                    await limiter.check(rate_limit_keys or [], recording_seconds(len(parsed), sampling_rate))
+                except RateLimitExceeded as e:
+                    await results.put((item_id, device_id, None, e))
+                    continue
+                await semaphore.acquire()
+                task = asyncio.create_task(analyze_item(item_id, device_id, sampling_rate, parsed))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except Exception as e:
+            # 본문 읽기 자체가 실패한 경우 (이미 시작된 항목은 계속 처리)
+            await results.put((None, None, None, e))
+        finally:
+            # 모든 분석 작업이 끝날 때까지 대기
+            for _ in range(ECG_BATCH_MAX_INFLIGHT):
+                await semaphore.acquire()
+            await results.put(None)
+    
+    async def flush():
+        if not pending_writes:
+            return None
+        
+        requests, ids = list(pending_writes), list(pending_ids)
+        pending_writes.clear()
+        pending_ids.clear()
+        
+        failed_ids = []
+        try:
+            result = await db.ecg_analysis.bulk_write(requests, ordered=False)
+            inserted = result.inserted_count
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            failed_ids = [ids[error["index"]] for error in e.details.get("writeErrors", [])]
+            logger.error(f"ECG 배치 저장 일부 실패 ({batch_id}): {len(failed_ids)}건")
+        except Exception as e:
+            inserted = 0
+            failed_ids = ids
+            logger.error(f"ECG 배치 저장 오류 ({batch_id}): {str(e)}")
+        
+        summary["stored"] += inserted
+        return {"type": "stored", "inserted": inserted, "failed_ids": failed_ids}
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            entry = await results.get()
+            if entry is None:
+                break
+            
+            item_id, device_id, analysis_result, error = entry
+            if error is not None:
+                summary["failed"] += 1
+                line = {"id": item_id, "status": "error", "error": str(error)}
+                if isinstance(error, RateLimitExceeded):
+                    line["retry_after"] = round(error.retry_after, 1)
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+                continue
+            
+            summary["succeeded"] += 1
+            pending_writes.append(InsertOne(encode_document({
+                "user_id": user_id,
+                "device_id": device_id,
+                "batch_id": batch_id,
+                "item_id": item_id,
+                "timestamp": datetime.utcnow(),
+                **analysis_result,
+            }, ECG_ANALYSIS_PACKED_FIELDS)))
+            pending_ids.append(item_id)
+            yield json.dumps({"id": item_id, "status": "ok", "result": analysis_result}, ensure_ascii=False, default=float) + "\n"
+            
+            if len(pending_writes) >= ECG_BATCH_WRITE_SIZE:
+                stored = await flush()
+                yield json.dumps(stored, ensure_ascii=False) + "\n"
+        
+        stored = await flush()
+        if stored is not None:
+            yield json.dumps(stored, ensure_ascii=False) + "\n"
+        
+        yield json.dumps({"type": "summary", "batch_id": batch_id, **summary}) + "\n"
+        logger.info(f"ECG 배치 분석 완료 ({batch_id}): {summary}")
+    
+    except Exception as e:
+        logger.error(f"ECG 배치 처리 오류 ({batch_id}): {str(e)}")
+        yield json.dumps({"type": "error", "batch_id": batch_id, "error": str(e)}, ensure_ascii=False) + "\n"
+    finally:
+        if not producer.done():
+            producer.cancel()
+        # 클라이언트가 연결을 끊은 경우 남은 분석 작업 취소
+        for task in list(tasks):
+            task.cancel()
+
+@router.websocket("/stream")
+async def stream_ecg_data(
+    websocket: WebSocket,
+    token: str = Query(..., description="JWT 액세스 토큰"),
+    sampling_rate: int = Query(250, ge=50, le=2000, description="샘플링 레이트(Hz)"),
+    dtype: str = Query("float32", description="바이너리 프레임 샘플 형식 (float32, int16)")
+):
+    """
+    실시간 ECG 스트리밍 분석
+    
+    클라이언트는 리틀 엔디언 샘플 배열을 바이너리 프레임으로 전송하고,
+    서버는 심박수, 리듬, 경보 상태가 바뀔 때마다 JSON 업데이트를 보냅니다.
+    클라이언트가 느려 전송 대기열이 가득 차면 오래된 업데이트부터 버립니다.
+    """
+    global _active_stream_sessions
+    
+    # 워커당 동시 세션 수 제한 (동시 연결이 한도를 넘지 않도록 첫 await 전에 자리 예약)
+    if _active_stream_sessions >= ECG_STREAM_MAX_SESSIONS:
+        await websocket.close(code=1013, reason="스트리밍 세션 수가 한도에 도달했습니다")
+        return
+    _active_stream_sessions += 1
+    try:
+        await _run_ecg_stream(websocket, token, sampling_rate, dtype)
+    finally:
+        _active_stream_sessions -= 1
+
+async def _run_ecg_stream(websocket: WebSocket, token: str, sampling_rate: int, dtype: str):
+    """인증 후 프레임을 받아 분석 업데이트를 보내는 스트리밍 세션 본문 (세션 자리는 호출자가 관리)"""
+    if dtype not in ECG_STREAM_DTYPES:
+        await websocket.close(code=1003, reason="지원되지 않는 샘플 형식입니다")
+        return
+    
+    try:
+        current_user = await get_current_user(token, await get_async_db())
+    except HTTPException:
+        await websocket.close(code=1008, reason="인증 정보를 확인할 수 없습니다")
+        return
+    
+    await websocket.accept()
+    
+    sample_dtype = np.dtype(ECG_STREAM_DTYPES[dtype])
+    max_frame_bytes = ECG_STREAM_MAX_FRAME_SECONDS * sampling_rate * sample_dtype.itemsize
+    analyzer = StreamingECGAnalyzer(sampling_rate=sampling_rate)
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=ECG_STREAM_SEND_QUEUE)
+    dropped = 0
+    
+    def offer(message: Dict[str, Any]):
+        nonlocal dropped
+        # 대기열이 가득 차면 가장 오래된 업데이트를 버림 (최신 상태가 우선)
+        if outbox.full():
+            outbox.get_nowait()
+            dropped += 1
+        message["dropped"] = dropped
+        outbox.put_nowait(message)
+    
+    async def sender():
+        while True:
+            message = await outbox.get()
+            await websocket.send_json(message)
+    
+    sender_task = asyncio.create_task(sender())
+    logger.info(f"ECG 스트리밍 시작: 사용자 {current_user.id}, 활성 세션 {_active_stream_sessions}")
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            frame = message.get("bytes")
+            if frame is None:
+                # 텍스트 프레임은 연결 유지용으로만 사용
+                continue
+            
+            if len(frame) > max_frame_bytes or len(frame) % sample_dtype.itemsize:
+                offer({"type": "error", "error": "잘못된 프레임 크기입니다"})
+                continue
+            
+            # 필터링/R 피크 검출은 CPU 작업이므로 다른 연결을 막지 않도록 스레드 풀에서
+            update = await run_in_threadpool(analyzer.push, np.frombuffer(frame, dtype=sample_dtype))
+            if update is not None:
+                offer(update)
+            
+            if sender_task.done():
+                break
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"ECG 스트리밍 오류: {str(e)}")
+    finally:
+        sender_task.cancel()
+        logger.info(f"ECG 스트리밍 종료: 사용자 {current_user.id}, 수신 심박 {analyzer.beats}")
+
 @router.get("/data/{user_id}", response_model=List[ECGDataOutput])
 async def get_ecg_data(
     user_id: str,
@@ -570,7 +1143,9 @@ async def get_ecg_data(
         query["timestamp"] = {"$lte": end_date}
     
     # 데이터 조회
-    cursor = db.ecg_analysis.find(query).sort("timestamp", -1).skip(skip).limit(limit)
+    # 출력 모델 필드만 조회 (패킹된 배열 등 큰 필드는 읽지 않음)
+    projection = {field: 1 for field in ECGDataOutput.model_fields if field != "id"}
+    cursor = db.ecg_analysis.find(query, projection).sort("timestamp", -1).skip(skip).limit(limit)
     results = []
     
     async for doc in cursor:
@@ -602,7 +1177,7 @@ async def get_risk_assessment(
         "timestamp": {"$gte": start_date}
     }
     
-    cursor = db.ecg_analysis.find(query).sort("timestamp", 1)
+    cursor = db.ecg_analysis.find(query, {"timestamp": 1, "risk_level": 1, "risk_factors": 1}).sort("timestamp", 1)
     
     # 위험도 데이터 집계
     risk_data = []
@@ -667,7 +1242,8 @@ async def analyze_and_save_ecg_data(ecg_data: dict, db: AsyncIOMotorDatabase):
         sampling_rate = ecg_data["sampling_rate"]
         
         # 분석 수행
-        analysis_result = analyze_ecg(ecg_signal, sampling_rate)
+        with timed_phase("analysis"):
+            analysis_result = analyze_ecg(ecg_signal, sampling_rate)
         
         # 분석 결과 저장
         analysis_doc = {
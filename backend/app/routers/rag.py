@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+import logging
+
+from ..deps import get_current_active_user
+from ..rag import RAGRequest, RAGResponse, RAGUtility, get_rag_utility
+from ..sse import SSE_HEADERS, format_sse_event
+
+router = APIRouter(
+    prefix="/rag",
+    tags=["RAG"],
+    responses={404: {"description": "찾을 수 없음"}},
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def _ensure_collection(rag: RAGUtility, collection_name: str) -> None:
+    """컬렉션 로드 (없는 컬렉션은 스트림을 열기 전에 404)"""
+    try:
+        await rag.init_collection(collection_name)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.post("/query", response_model=RAGResponse)
+async def query_rag(
+    request: RAGRequest,
+    current_user = Depends(get_current_active_user),
+    rag: RAGUtility = Depends(get_rag_utility),
+):
+    """
+    컬렉션 문서를 검색하여 질문에 답변합니다.
+    """
+    await _ensure_collection(rag, request.collection_name)
+    try:
+        return await rag.query(request)
+    except Exception as e:
+        logger.error(f"RAG 쿼리 오류: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="답변 생성 중 오류가 발생했습니다"
+        )
+
+
+@router.post("/query/stream")
+async def stream_rag_query(
+    request: RAGRequest,
+    current_user = Depends(get_current_active_user),
+    rag: RAGUtility = Depends(get_rag_utility),
+):
+    """
+    답변을 Server-Sent Events로 스트리밍합니다.
+    
+    검색이 끝나면 `sources` 이벤트로 출처를 먼저 보내고, 답변은 `token` 이벤트로 생성되는 대로,
+    마지막에 `done` 이벤트로 전체 답변을 보냅니다. 생성 중 오류는 `error` 이벤트로 전달됩니다.
+    """
+    await _ensure_collection(rag, request.collection_name)
+
+    async def events():
+        try:
+            async for event, data in rag.query_stream(request):
+                yield format_sse_event(event, data)
+        except Exception as e:
+            logger.error(f"RAG 스트리밍 오류: {str(e)}")
+            yield format_sse_event("error", {"detail": "답변 생성 중 오류가 발생했습니다"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
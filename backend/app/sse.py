@@ -0,0 +1,18 @@
+"""
+Server-Sent Events 도우미
+"""
+
+import json
+from typing import Any
+
+# 프록시(nginx) 버퍼링과 캐시를 끄고 이벤트를 바로 흘려보내기 위한 헤더
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse_event(event: str, data: Any) -> str:
+    """SSE 이벤트 한 건 (data는 JSON 직렬화)"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
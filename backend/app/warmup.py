@@ -0,0 +1,196 @@
+"""
+앱 시작 워밍업 모듈
+
+워커가 트래픽을 받기 전에 첫 요청이 느려지는 원인을 미리 처리합니다.
+1. MongoDB 연결 풀 열기
+2. 합성 ECG 신호로 실제 요청 경로의 분석을 한 번씩 실행 (필터 설계, 라이브러리 지연 초기화)
+   - /analyze 업로드 파이프라인, 실시간 저장 경로(routers.ecg.analyze_ecg), 스트리밍 분석기
+3. ECG 일괄 분석 프로세스 풀의 워커를 모두 띄우고 합성 신호를 한 번씩 분석
+4. 캐시/인덱스 준비 (ECG 결과 캐시, API 키 인덱스)
+
+readiness 엔드포인트는 워밍업 완료 여부와 의존성 상태를 함께 보고합니다.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from .db import mongo
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+
+# 워밍업 설정
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_SAMPLING_RATES = [int(rate) for rate in os.getenv("WARMUP_SAMPLING_RATES", "250").split(",") if rate.strip()]
+WARMUP_SIGNAL_SECONDS = float(os.getenv("WARMUP_SIGNAL_SECONDS", "10"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "15"))
+READINESS_DB_TIMEOUT_SECONDS = float(os.getenv("READINESS_DB_TIMEOUT_SECONDS", "2"))
+
+# 실패해도 readiness를 막지 않는 단계 (캐시는 없어도 요청 처리는 가능)
+OPTIONAL_STEPS = ("caches",)
+
+
+def synthetic_ecg(sampling_rate: int, seconds: float = WARMUP_SIGNAL_SECONDS, heart_rate: float = 72.0) -> np.ndarray:
+    """가우시안 QRS 파형을 반복한 합성 ECG 신호 (워밍업 전용)"""
+    t = np.arange(int(seconds * sampling_rate)) / sampling_rate
+    beat = 60.0 / heart_rate
+    phase = np.mod(t, beat) - beat / 2
+    qrs = np.exp(-(phase / 0.012) ** 2)
+    t_wave = 0.25 * np.exp(-((phase - 0.25) / 0.05) ** 2)
+    return qrs + t_wave + 0.02 * np.sin(2 * np.pi * 0.3 * t)
+
+
+class WarmupState:
+    """워밍업 진행 상태"""
+
+    def __init__(self):
+        self.status = "pending"  # pending / running / ready / failed
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    async def _step(self, name: str, func: Callable[[], Awaitable[None]]) -> bool:
+        started = time.perf_counter()
+        try:
+            await func()
+            self.steps[name] = {"ok": True, "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.steps[name] = {
+                "ok": False,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": str(e),
+            }
+            logger.error(f"워밍업 단계 실패 ({name}): {e}")
+            return False
+
+    async def run(self) -> None:
+        """모든 워밍업 단계 실행"""
+        self.status = "running"
+        self.started_at = datetime.utcnow()
+        steps: List = [
+            ("mongodb", _warm_mongodb),
+            ("analyzers", _warm_analyzers),
+            ("batch_workers", _warm_batch_workers),
+            ("caches", _warm_caches),
+        ]
+        failed = []
+        for name, func in steps:
+            if not await self._step(name, func) and name not in OPTIONAL_STEPS:
+                failed.append(name)
+        self.finished_at = datetime.utcnow()
+        self.status = "failed" if failed else "ready"
+        elapsed = (self.finished_at - self.started_at).total_seconds()
+        logger.info(f"워밍업 {'완료' if not failed else '실패'} ({elapsed:.2f}초): {self.steps}")
+
+    def start(self) -> None:
+        """워밍업을 백그라운드에서 시작 (liveness는 워밍업 중에도 응답)"""
+        if not WARMUP_ENABLED:
+            self.status = "ready"
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def retry_if_failed(self) -> None:
+        """실패한 워밍업을 일정 간격으로 다시 시도 (DB가 늦게 뜬 경우)"""
+        if self.status != "failed" or self._task is None or not self._task.done():
+            return
+        if (datetime.utcnow() - self.finished_at).total_seconds() >= WARMUP_RETRY_SECONDS:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "steps": self.steps,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+async def _warm_mongodb() -> None:
+    await mongo.connect()
+
+
+async def _warm_analyzers() -> None:
+    from .ml.ecg_stream import StreamingECGAnalyzer
+    from .routers import ecg as ecg_router
+
+    def run() -> None:
+        # /analyze는 샘플링 레이트 250 고정
+        ecg_router.analyze_ecg_upload(synthetic_ecg(250))
+        for sampling_rate in WARMUP_SAMPLING_RATES:
+            ecg_signal = synthetic_ecg(sampling_rate)
+            ecg_router.analyze_ecg(ecg_signal, sampling_rate)
+            StreamingECGAnalyzer(sampling_rate=sampling_rate).push(ecg_signal)
+
+    # CPU 작업이므로 이벤트 루프(liveness 응답)를 막지 않도록 스레드에서 실행
+    await run_in_threadpool(run)
+
+
+async def _warm_batch_workers() -> None:
+    from .routers import ecg as ecg_router
+
+    # 워커 수만큼 동시에 제출해야 풀이 워커 프로세스를 모두 띄움
+    # (각 워커가 numpy/scipy import와 필터 설계를 미리 마침)
+    loop = asyncio.get_running_loop()
+    executor = ecg_router.get_batch_executor()
+    sampling_rate = WARMUP_SAMPLING_RATES[0] if WARMUP_SAMPLING_RATES else 250
+    ecg_signal = synthetic_ecg(sampling_rate)
+    await asyncio.gather(*(
+        loop.run_in_executor(executor, ecg_router.analyze_ecg, ecg_signal, sampling_rate)
+        for _ in range(ecg_router.ECG_BATCH_WORKERS)
+    ))
+
+
+async def _warm_caches() -> None:
+    from .ml.ecg_cache import get_ecg_result_cache
+    from .api_keys import api_key_index
+
+    await get_ecg_result_cache().warm()
+    await api_key_index.refresh(mongo.async_db)
+    api_key_index.start_watching(mongo.async_db)
+
+
+async def check_readiness(state: "WarmupState") -> Dict[str, Any]:
+    """워밍업 완료 여부와 의존성 상태"""
+    state.retry_if_failed()
+    dependencies = {}
+    if state.ready:
+        try:
+            # 프로브 타임아웃보다 오래 걸리지 않도록 제한
+            dependencies["mongodb"] = await asyncio.wait_for(mongo.ping(), READINESS_DB_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            dependencies["mongodb"] = False
+    ready = state.ready and all(dependencies.values())
+    return {
+        "status": "ready" if ready else "not_ready",
+        "warmup": state.get_status(),
+        "dependencies": dependencies,
+    }
+
+
+# 글로벌 워밍업 상태
+warmup_state = WarmupState()
@@ -0,0 +1,56 @@
+"""
+app.rag 임포트 비용 테스트
+
+langchain, chromadb, 임베딩 모델, LLM 클라이언트는 처음 사용할 때 불러오므로
+모듈을 임포트만 하는 프로세스(워커 시작, CLI, 테스트)는 빨리 뜨고 메모리를 적게 씁니다.
+
+backend 디렉토리에서 실행:
+    python -m pytest tests/test_rag_import.py
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("langchain", "chromadb", "torch", "openai")
+MAX_IMPORT_SECONDS = float(os.getenv("RAG_IMPORT_MAX_SECONDS", "5"))
+MAX_IMPORT_RSS_MB = float(os.getenv("RAG_IMPORT_MAX_RSS_MB", "250"))
+
+# 최대 RSS는 자식 프로세스 자신이 측정 (ru_maxrss: Linux는 KB 단위)
+_SCRIPT = (
+    "import sys, json, time, resource\n"
+    "started = time.perf_counter()\n"
+    "import app.rag\n"
+    "elapsed = time.perf_counter() - started\n"
+    "heavy = sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[1:]))\n"
+    "max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+    "print(json.dumps({'seconds': elapsed, 'heavy': heavy, 'max_rss_kb': max_rss_kb}))\n"
+)
+
+
+def test_import_rag_is_lightweight():
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _SCRIPT, *HEAVY_MODULES],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    wall_seconds = time.perf_counter() - started
+    assert result.returncode == 0, result.stderr
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    max_rss_mb = report["max_rss_kb"] / 1024
+
+    assert report["heavy"] == [], f"app.rag 임포트 시 무거운 모듈을 불러옴: {report['heavy']}"
+    assert wall_seconds < MAX_IMPORT_SECONDS, f"임포트 시간 {wall_seconds:.2f}초 (한도 {MAX_IMPORT_SECONDS}초)"
+    assert max_rss_mb < MAX_IMPORT_RSS_MB, f"최대 RSS {max_rss_mb:.0f}MB (한도 {MAX_IMPORT_RSS_MB}MB)"
@@ -0,0 +1,106 @@
+"""
+실행 중인 레지스트리에 스냅샷을 불러온 뒤 같은 컬렉션을 다시 조회하는 테스트 (mmap 벡터 스토어)
+
+backend 디렉토리에서 실행:
+    python -m pytest tests/test_rag_snapshot.py
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("fastapi")
+
+from langchain.embeddings.base import Embeddings  # noqa: E402
+from langchain.llms.fake import FakeListLLM  # noqa: E402
+
+from app import rag  # noqa: E402
+from app.rag_snapshot import export_snapshot  # noqa: E402
+from app.rag_vector_index import MmapVectorStore  # noqa: E402
+
+COLLECTION = "knowledge_base"
+WORDS = ["alpha", "beta", "gamma", "delta"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """텍스트에 들어 있는 단어 위치만 1인 벡터 (검색 결과를 예측할 수 있도록)"""
+
+    model_id = "test:keywords"
+
+    def _embed(self, text: str):
+        return [1.0 if word in text else 0.0 for word in WORDS]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def find_one(self, query, *args, **kwargs):
+        return next((doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())), None)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.rag_collections = FakeCollection([{"name": COLLECTION}])
+
+
+def make_snapshot(directory, path, texts):
+    embeddings = KeywordEmbeddings()
+    store = MmapVectorStore(str(directory), embeddings)
+    store.add_vectors(
+        [f"chunk-{text}" for text in texts],
+        np.asarray(embeddings.embed_documents(texts), dtype=np.float32),
+        texts,
+        [{"source": text} for text in texts],
+    )
+    export_snapshot(store, str(path), COLLECTION, embeddings.model_id)
+    store.close()
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "RAG_VECTOR_BACKEND", "mmap")
+    monkeypatch.setattr(rag, "RAG_MMAP_INDEX_DIRECTORY", str(tmp_path / "index"))
+    monkeypatch.setattr(rag, "RAG_SNAPSHOT_DIRECTORY", "")
+    registry = rag.RAGCollectionRegistry()
+    registry._embeddings = KeywordEmbeddings()
+    registry._llm = FakeListLLM(responses=["ok"])
+    yield registry
+    asyncio.run(registry.close())
+
+
+def test_import_snapshot_into_running_registry(tmp_path, registry):
+    first = tmp_path / "first.ragsnap"
+    second = tmp_path / "second.ragsnap"
+    make_snapshot(tmp_path / "src-first", first, ["alpha notes"])
+    make_snapshot(tmp_path / "src-second", second, ["beta notes", "gamma notes"])
+    db = FakeDatabase()
+
+    async def scenario():
+        await registry.import_snapshot(db, COLLECTION, str(first))
+        old_store = (await registry.get(db, COLLECTION))["vectorstore"]
+        assert [doc.page_content for doc in old_store.similarity_search("alpha", k=1)] == ["alpha notes"]
+
+        # 컬렉션이 로드된 상태에서 교체
+        await registry.import_snapshot(db, COLLECTION, str(second))
+
+        entry = await registry.get(db, COLLECTION)
+        assert entry["vectorstore"] is not old_store
+        assert [doc.page_content for doc in entry["vectorstore"].similarity_search("gamma", k=1)] == ["gamma notes"]
+        docs = await asyncio.to_thread(entry["retriever"].get_relevant_documents, "beta")
+        assert docs[0].page_content == "beta notes"
+        assert sorted(entry["vectorstore"].get(include=[])["ids"]) == ["chunk-beta notes", "chunk-gamma notes"]
+        # 교체 전에 이전 스토어의 SQLite 연결과 memmap을 놓았는지
+        assert old_store._state.matrix is None
+        with pytest.raises(Exception):
+            old_store._conn.execute("SELECT 1")
+
+    asyncio.run(scenario())